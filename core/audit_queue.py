@@ -0,0 +1,146 @@
+"""
+Background writer for security audit events.
+
+Request handlers hand audit events to a bounded queue instead of writing
+them synchronously; a single daemon thread drains the queue and stores the
+events in batches, keeping audit I/O off the request path. Events can also
+be queued as LazyAuthEvent, deferring their construction to that thread.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from typing import Any, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentinel that tells the writer thread to exit
+_STOP = object()
+
+
+class LazyAuthEvent:
+    """
+    Deferred audit event, built by the writer thread rather than the request.
+    
+    Holds a factory and the raw values it needs; ``build()`` creates the
+    actual event, including any string formatting and metadata dicts.
+    """
+    
+    __slots__ = ('factory', 'args')
+    
+    def __init__(self, factory: Callable[..., Any], *args: Any):
+        self.factory = factory
+        self.args = args
+    
+    def build(self) -> Any:
+        """Construct the audit event."""
+        return self.factory(*self.args)
+
+
+class AuditQueue:
+    """
+    Bounded queue of audit events drained by a background writer thread.
+    
+    Events are never allowed to back-pressure requests: when the queue is
+    full the event is dropped and counted in ``dropped_events``.
+    """
+    
+    def __init__(self, sink: Callable[[List[Any]], None],
+                 maxsize: int = 10000, batch_size: int = 100):
+        """
+        Initialize the queue and start the writer thread.
+        
+        Args:
+            sink: Callable that persists a list of events.
+            maxsize: Maximum number of events waiting to be written.
+            batch_size: Maximum number of events passed to one sink call.
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.dropped_events = 0
+        
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def put(self, event: Any) -> bool:
+        """
+        Queue an event for writing without blocking.
+        
+        Args:
+            event: Audit event to write.
+        
+        Returns:
+            True if the event was queued, False if it was dropped.
+        """
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped_events += 1
+            return False
+    
+    def flush(self) -> None:
+        """Block until every queued event has been written."""
+        self._queue.join()
+    
+    def close(self) -> None:
+        """Write the remaining events and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+    
+    def _run(self) -> None:
+        """Writer loop: wait for one event, then drain up to a full batch."""
+        while True:
+            event = self._queue.get()
+            batch = [event]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stop = any(item is _STOP for item in batch)
+            events = []
+            for item in batch:
+                if item is _STOP:
+                    continue
+                if isinstance(item, LazyAuthEvent):
+                    try:
+                        item = item.build()
+                    except Exception as e:
+                        logger.error(f"Failed to build audit event: {e}")
+                        continue
+                events.append(item)
+            if events:
+                try:
+                    self.sink(events)
+                except Exception as e:
+                    logger.error(f"Failed to write {len(events)} audit events: {e}")
+            
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+
+# Global audit queue instance
+_audit_queue: Optional[AuditQueue] = None
+_audit_queue_lock = threading.Lock()
+
+
+def get_audit_queue() -> AuditQueue:
+    """Get the global audit queue, writing to the security manager's audit log."""
+    global _audit_queue
+    if _audit_queue is None:
+        with _audit_queue_lock:
+            if _audit_queue is None:
+                from utils.security_manager import get_security_manager
+                _audit_queue = AuditQueue(get_security_manager()._log_audit_events)
+    return _audit_queue
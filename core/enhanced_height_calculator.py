@@ -19,7 +19,7 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, parent_dir)
 
 try:
-    from height_measure.gdi_measure import PrinterTextMeasurer, FontSpec
+    from height_measure.gdi_measure import PrinterTextMeasurerPool, FontSpec
     GDI_AVAILABLE = True
 except ImportError as e:
     logging.warning(f"GDI方案不可用: {e}")
@@ -49,7 +49,8 @@ class HeightCalculator:
         # 初始化GDI组件
         if GDI_AVAILABLE:
             try:
-                self.gdi_measurer = PrinterTextMeasurer()
+                # 复用已打开的打印机DC，避免每次计算都重新打开打印机
+                self.gdi_measurer = PrinterTextMeasurerPool()
                 self.font_spec = FontSpec(name="SimSun", size_pt=11.0, weight=400, italic=False)
                 # GDI方案初始化成功，生产环境不显示详细信息
             except Exception as e:
@@ -103,8 +104,9 @@ class HeightCalculator:
         
         try:
             # 使用GDI测量器的excel列宽方法，避免二次放大            
-            with self.gdi_measurer:
-                height_pt, lines = self.gdi_measurer.measure_for_excel_col(
+            measurer = self.gdi_measurer.acquire()
+            try:
+                height_pt, lines = measurer.measure_for_excel_col(
                     text=text,
                     col_width_chars=column_width,
                     spec=self.font_spec,
@@ -112,6 +114,8 @@ class HeightCalculator:
                     debug=False,  # 生产环境关闭调试输出
                     row_info=row_info  # 传递行号信息
                 )
+            finally:
+                self.gdi_measurer.release(measurer)
             
             # 记录性能
             elapsed = time.perf_counter() - start_time
@@ -215,8 +219,8 @@ class HeightCalculator:
     def cleanup(self):
         """清理资源"""
         if self.gdi_measurer:
-            # GDI使用上下文管理器，不需要手动清理
-            pass
+            # 关闭测量器池中已打开的打印机DC
+            self.gdi_measurer.close()
         logging.info("行高计算器资源已清理")
 
 # 全局实例
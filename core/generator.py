@@ -12,6 +12,7 @@ from openpyxl.utils.cell import get_column_letter
 from .transform_excel import xls2xlsx
 from openpyxl.worksheet.pagebreak import Break
 from .enhanced_height_calculator import get_height_calculator
+from .template_cache import load_template_bytes
 
 # --- 框架核心：通用工具函数 ---
 
@@ -246,11 +247,11 @@ def load_data(excel_path):
 
 def prepare_template(template_path):
     """
-    以内存流方式加载模板文件。
+    以内存流方式加载模板文件。模板字节经 template_cache 缓存，
+    未修改的模板在多次运行之间不会重复读取磁盘。
     """
     try:
-        with open(template_path, "rb") as file:
-            stream = BytesIO(file.read())
+        stream = BytesIO(load_template_bytes(template_path))
         stream.seek(0)
         return stream
     except FileNotFoundError:
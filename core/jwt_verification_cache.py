@@ -0,0 +1,119 @@
+"""
+Short-lived caches of verified credentials.
+
+Signature verification is the most expensive step of authenticating an API
+request, and session validation costs a storage round trip. This module
+keeps recent successful results in bounded LRUs so repeated requests
+carrying the same token skip that work.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class TokenCache:
+    """
+    Thread-safe LRU cache of values verified for a credential token.
+    
+    Entries are keyed by the SHA-256 digest of the token, so raw tokens are
+    never held in memory. Each entry expires at the earlier of its own
+    expiry and ``ttl`` seconds after it was cached, which bounds how long a
+    revoked credential can keep being accepted. Only successful results
+    should be cached.
+    """
+    
+    def __init__(self, maxsize: int = 10000, ttl: float = 5.0):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of cached tokens.
+            ttl: Maximum lifetime of an entry in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token: str) -> bytes:
+        """Hash a token into its cache key."""
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def get(self, token: str) -> Optional[Any]:
+        """
+        Get the cached value for a token.
+        
+        Args:
+            token: Raw token string.
+        
+        Returns:
+            The cached value, or None if the token is not cached or expired.
+        """
+        key = self._key(token)
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            
+            self._entries.move_to_end(key)
+            return value
+    
+    def put(self, token: str, value: Any, expires_at: Optional[float] = None) -> None:
+        """
+        Cache the verified value for a token.
+        
+        Args:
+            token: Raw token string.
+            value: Value to return for the token.
+            expires_at: Optional epoch time after which the value is invalid.
+        """
+        now = time.time()
+        deadline = now + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+        
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (value, deadline)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class JWTVerificationCache(TokenCache):
+    """Cache of verified JWT claims, expiring no later than the ``exp`` claim."""
+    
+    def put(self, token: str, claims: Dict[str, Any],
+            expires_at: Optional[float] = None) -> None:
+        """
+        Cache the claims of a successfully verified token.
+        
+        Args:
+            token: Raw JWT string.
+            claims: Claims returned by signature verification.
+            expires_at: Optional earlier expiry; defaults to the ``exp`` claim.
+        """
+        if expires_at is None and claims.get('exp') is not None:
+            expires_at = float(claims['exp'])
+        super().put(token, claims, expires_at)
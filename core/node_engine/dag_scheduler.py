@@ -262,8 +262,10 @@ class DAGScheduler:
         self.active_workflows[workflow_def.workflow_id] = context
         
         # Create tasks for all nodes
+        task_ids = {node_id: create_task_id() for node_id in workflow_def.nodes}
+        tasks = []
         for node_id, node_def in workflow_def.nodes.items():
-            task_id = create_task_id()
+            task_id = task_ids[node_id]
             
             # Create input data with workflow context
             input_data = NodeInput(
@@ -281,11 +283,13 @@ class DAGScheduler:
                 node_id=node_id,
                 workflow_id=workflow_def.workflow_id,
                 input_data=input_data,
-                dependencies=[f"{workflow_def.workflow_id}:{dep}" for dep in node_def.dependencies],
+                dependencies=[task_ids[dep] for dep in node_def.dependencies],
                 priority=node_def.priority
             )
-            
-            self.task_queue.add_task(task)
+            tasks.append(task)
+        
+        # Insert the whole workflow and its topological levels in one transaction
+        self.task_queue.add_workflow(tasks)
         
         logger.info(f"Submitted workflow {workflow_def.workflow_id} with {len(workflow_def.nodes)} nodes")
         return workflow_def.workflow_id
@@ -296,7 +300,7 @@ class DAGScheduler:
         if not context:
             return None
         
-        tasks = self.task_queue.get_workflow_tasks(workflow_id)
+        tasks = self.task_queue.get_workflow_tasks(workflow_id, include_payloads=False)
         task_statuses = {}
         
         for task in tasks:
@@ -392,10 +396,10 @@ class DAGScheduler:
     
     def _check_workflow_completion(self, workflow_id: str) -> None:
         """Check if a workflow has completed and update its status."""
-        tasks = self.task_queue.get_workflow_tasks(workflow_id)
+        statuses = [status for _, status in self.task_queue.get_workflow_task_statuses(workflow_id)]
         
-        all_completed = all(task.status in [NodeStatus.COMPLETED, NodeStatus.FAILED] for task in tasks)
-        any_failed = any(task.status == NodeStatus.FAILED for task in tasks)
+        all_completed = all(status in [NodeStatus.COMPLETED, NodeStatus.FAILED] for status in statuses)
+        any_failed = any(status == NodeStatus.FAILED for status in statuses)
         
         if all_completed:
             context = self.active_workflows.get(workflow_id)
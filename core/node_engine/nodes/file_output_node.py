@@ -6,12 +6,16 @@ the existing generator.py functionality, ensuring compatibility with
 the legacy system while providing node-based interface.
 """
 
+import copy
 import os
+import stat
 import logging
 import time
 import shutil
+from functools import lru_cache
+from dataclasses import dataclass, asdict
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union
+from typing import Dict, Any, List, Optional, Union, ClassVar, Tuple, Callable
 import pandas as pd
 
 from core.node_interfaces import (
@@ -24,6 +28,89 @@ from utils.validation_schemas import get_validator
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class _Stats:
+    """Per-run output statistics."""
+
+    records_written: int = 0
+    files_created: int = 0
+    bytes_written: int = 0
+
+
+@lru_cache(maxsize=1)
+def _load_template_generator() -> Optional[Tuple[Callable[..., Any], Callable[..., Any]]]:
+    """
+    Import the legacy template generator once per process.
+    
+    Returns:
+        ``(generate_directory_excel, get_height_calculator)`` or ``None`` when
+        the generator is not available.
+    """
+    try:
+        from core.generator import generate_directory_excel
+        from core.enhanced_height_calculator import get_height_calculator
+    except ImportError:
+        logger.warning("Core generator not available, template-based Excel generation disabled")
+        return None
+    return generate_directory_excel, get_height_calculator
+
+
+def _fs_probe(paths: List[Path]) -> Dict[Path, Optional[bool]]:
+    """
+    Probe several paths with as few filesystem round-trips as possible.
+    
+    Paths sharing a parent directory are resolved from a single ``os.scandir``
+    of that parent; a scanned parent that is itself requested is reported from
+    the same listing. Remaining paths get one ``os.stat`` each.
+    
+    Args:
+        paths: Paths to probe.
+        
+    Returns:
+        Mapping of path to ``True`` (regular file), ``False`` (exists but is
+        not a file) or ``None`` (does not exist).
+    """
+    results: Dict[Path, Optional[bool]] = {}
+    requested = set(paths)
+    by_parent: Dict[Path, List[Path]] = {}
+    for path in paths:
+        if path.name:
+            by_parent.setdefault(path.parent, []).append(path)
+    
+    for parent, children in by_parent.items():
+        if len(children) < 2 and parent not in requested:
+            continue
+        try:
+            with os.scandir(parent) as it:
+                entries = {entry.name: entry for entry in it}
+        except FileNotFoundError:
+            parent_kind, entries = None, {}
+        except NotADirectoryError:
+            parent_kind, entries = True, {}
+        except OSError:
+            continue
+        else:
+            parent_kind = False
+        
+        if parent in requested:
+            results[parent] = parent_kind
+        for child in children:
+            entry = entries.get(child.name)
+            results[child] = entry.is_file() if entry is not None else None
+    
+    for path in paths:
+        if path in results:
+            continue
+        try:
+            mode = os.stat(path).st_mode
+        except OSError:
+            results[path] = None
+        else:
+            results[path] = stat.S_ISREG(mode)
+    
+    return results
+
+
 class FileOutputNode(ProcessingNode):
     """
     Node for generating Excel files from data using the existing generator.
@@ -34,6 +121,9 @@ class FileOutputNode(ProcessingNode):
     
     SUPPORTED_FORMATS = ['excel', 'csv', 'json']
     
+    # Schema only depends on class constants and the shared validator
+    _SCHEMA_CACHE: ClassVar[Optional[Dict[str, Any]]] = None
+    
     def __init__(self, node_id: str, config: Optional[Dict[str, Any]] = None):
         """
         Initialize the file output node.
@@ -55,11 +145,56 @@ class FileOutputNode(ProcessingNode):
         self.validator = get_validator()
         
         # Statistics tracking
-        self.stats = {
-            'records_written': 0,
-            'files_created': 0,
-            'bytes_written': 0
-        }
+        self.stats = _Stats()
+    
+    @property
+    def output_path(self) -> str:
+        """Configured output file path."""
+        return self._output_path
+    
+    @output_path.setter
+    def output_path(self, value: str) -> None:
+        # Resolve once here so process() does not rebuild Path objects per call
+        self._output_path = value
+        self._output_path_obj = Path(value).absolute() if value else None
+        self._output_path_str = str(self._output_path_obj) if value else ''
+    
+    @property
+    def format(self) -> str:
+        """Configured output format."""
+        return self._format
+    
+    @format.setter
+    def format(self, value: str) -> None:
+        # The writer depends on the format; resolve it again on next use
+        self._format = value
+        self._writer = None
+    
+    @property
+    def template_path(self) -> Optional[str]:
+        """Configured Excel template path."""
+        return self._template_path
+    
+    @template_path.setter
+    def template_path(self, value: Optional[str]) -> None:
+        # The writer depends on the template; resolve it again on next use
+        self._template_path = value
+        self._writer = None
+    
+    def _probe_paths(self) -> Dict[Path, Optional[bool]]:
+        """
+        Probe template, output directory and output file in one batch.
+        
+        Not memoized across calls: the filesystem may change between
+        validations (validate_input itself creates the output directory).
+        """
+        paths = []
+        if self._output_path_obj is not None:
+            paths += [self._output_path_obj.parent, self._output_path_obj]
+        if self.template_path:
+            paths.append(Path(self.template_path))
+        
+        return _fs_probe(paths)
     
     def validate_input(self, input_data: NodeInput) -> List[ValidationResult]:
         """
@@ -105,9 +240,11 @@ class FileOutputNode(ProcessingNode):
             ))
         
         # Validate template path for Excel format
+        probe = self._probe_paths()
+        
         if self.format == 'excel' and self.template_path:
-            template_path = Path(self.template_path)
-            if not template_path.exists():
+            template_kind = probe[Path(self.template_path)]
+            if template_kind is None:
                 results.append(ValidationResult(
                     is_valid=False,
                     severity=ValidationSeverity.ERROR,
@@ -115,7 +252,7 @@ class FileOutputNode(ProcessingNode):
                     field_name="template_path",
                     error_code="TEMPLATE_NOT_FOUND"
                 ))
-            elif not template_path.is_file():
+            elif not template_kind:
                 results.append(ValidationResult(
                     is_valid=False,
                     severity=ValidationSeverity.ERROR,
@@ -125,10 +262,10 @@ class FileOutputNode(ProcessingNode):
                 ))
         
         # Validate output directory
-        output_path = Path(self.output_path)
-        output_dir = output_path.parent
+        output_path = self._output_path_obj
+        output_dir = output_path.parent if output_path is not None else None
         
-        if not output_dir.exists():
+        if output_dir is not None and probe[output_dir] is None:
             try:
                 output_dir.mkdir(parents=True, exist_ok=True)
                 results.append(ValidationResult(
@@ -147,7 +284,7 @@ class FileOutputNode(ProcessingNode):
                 ))
         
         # Check if output file exists and overwrite setting
-        if output_path.exists() and not self.overwrite:
+        if output_path is not None and probe[output_path] is not None and not self.overwrite:
             results.append(ValidationResult(
                 is_valid=False,
                 severity=ValidationSeverity.ERROR,
@@ -190,11 +327,7 @@ class FileOutputNode(ProcessingNode):
         
         try:
             # Reset statistics
-            self.stats = {
-                'records_written': 0,
-                'files_created': 0,
-                'bytes_written': 0
-            }
+            self.stats = _Stats()
             
             # Get input data
             raw_data = input_data.get_value('data')
@@ -221,25 +354,21 @@ class FileOutputNode(ProcessingNode):
                 logger.warning("No data to write")
                 return self._create_empty_output(start_time)
             
-            self.stats['records_written'] = len(df)
+            self.stats.records_written = len(df)
             
             logger.info(f"Writing {len(df)} records to {self.format} format: {self.output_path}")
             
-            # Generate output based on format
-            if self.format == 'excel':
-                self._write_excel_file(df, input_data)
-            elif self.format == 'csv':
-                self._write_csv_file(df)
-            elif self.format == 'json':
-                self._write_json_file(df)
-            else:
-                raise ValueError(f"Unsupported format: {self.format}")
+            # Generate output with the writer for the current format and template
+            if self._writer is None:
+                self._writer = self._resolve_writer()
+            self._writer(df, input_data)
             
             # Calculate file size
-            output_path = Path(self.output_path)
-            if output_path.exists():
-                self.stats['bytes_written'] = output_path.stat().st_size
-                self.stats['files_created'] = 1
+            try:
+                self.stats.bytes_written = os.stat(self._output_path_str).st_size
+                self.stats.files_created = 1
+            except OSError:
+                pass
             
             # Calculate processing time and memory usage
             processing_time_ms = (time.perf_counter() - start_time) * 1000
@@ -252,12 +381,12 @@ class FileOutputNode(ProcessingNode):
             
             # Prepare output data
             output_data = {
-                'output_file': str(output_path.absolute()),
-                'statistics': self.stats.copy(),
+                'output_file': self._output_path_str,
+                'statistics': asdict(self.stats),
                 'file_info': {
                     'format': self.format,
-                    'size_bytes': self.stats['bytes_written'],
-                    'records_written': self.stats['records_written'],
+                    'size_bytes': self.stats.bytes_written,
+                    'records_written': self.stats.records_written,
                     'memory_used_mb': memory_used
                 }
             }
@@ -265,14 +394,14 @@ class FileOutputNode(ProcessingNode):
             # Create output with metadata
             output = self._create_output(output_data, processing_time_ms)
             output.metadata.update({
-                'output_file': str(output_path),
+                'output_file': self.output_path,
                 'format': self.format,
-                'records_written': self.stats['records_written'],
-                'file_size_bytes': self.stats['bytes_written'],
+                'records_written': self.stats.records_written,
+                'file_size_bytes': self.stats.bytes_written,
                 'memory_usage_mb': memory_used
             })
             
-            logger.info(f"Successfully wrote {self.stats['records_written']} records to {output_path}")
+            logger.info(f"Successfully wrote {self.stats.records_written} records to {self.output_path}")
             return output
             
         except Exception as e:
@@ -293,32 +422,37 @@ class FileOutputNode(ProcessingNode):
             error_message = f"File system error: {error_message}"
         
         return NodeOutput(
-            data={'statistics': self.stats},
+            data={'statistics': asdict(self.stats)},
             node_id=self.node_id,
             status=NodeStatus.FAILED,
             processing_time_ms=processing_time_ms,
             errors=[error_message]
         )
     
-    def _write_excel_file(self, df: pd.DataFrame, input_data: NodeInput) -> None:
-        """Write data to Excel file using existing generator functionality."""
-        try:
-            # If we have a template, use it
-            if self.template_path:
-                self._write_excel_with_template(df, input_data)
-            else:
-                self._write_excel_simple(df)
-        except Exception as e:
-            logger.error(f"Excel generation failed: {e}")
-            raise e
+    def _resolve_writer(self) -> Callable[[pd.DataFrame, NodeInput], None]:
+        """
+        Pick the writer for this node's configuration.
+        
+        Returns:
+            A callable taking the DataFrame and the node input.
+        """
+        if self.format == 'excel':
+            if self.template_path and _load_template_generator() is not None:
+                return self._write_excel_with_template
+            return lambda df, input_data: self._write_excel_simple(df)
+        if self.format == 'csv':
+            return lambda df, input_data: self._write_csv_file(df)
+        if self.format == 'json':
+            return lambda df, input_data: self._write_json_file(df)
+        
+        def _unsupported(df: pd.DataFrame, input_data: NodeInput) -> None:
+            raise ValueError(f"Unsupported format: {self.format}")
+        return _unsupported
     
     def _write_excel_with_template(self, df: pd.DataFrame, input_data: NodeInput) -> None:
         """Write Excel using template and existing generator logic."""
+        generate_directory_excel, get_height_calculator = _load_template_generator()
         try:
-            # Import the existing generator functionality
-            from core.generator import generate_directory_excel
-            from core.enhanced_height_calculator import get_height_calculator
-            
             # Prepare parameters for the generator
             generator_params = {
                 'template_path': self.template_path,
@@ -337,9 +471,6 @@ class FileOutputNode(ProcessingNode):
             logger.info(f"Using template-based Excel generation with {self.template_path}")
             generate_directory_excel(**generator_params)
             
-        except ImportError:
-            logger.warning("Core generator not available, falling back to simple Excel generation")
-            self._write_excel_simple(df)
         except Exception as e:
             logger.error(f"Template-based Excel generation failed: {e}")
             # Fallback to simple generation
@@ -420,7 +551,7 @@ class FileOutputNode(ProcessingNode):
         
         output_data = {
             'output_file': self.output_path,
-            'statistics': self.stats.copy(),
+            'statistics': asdict(self.stats),
             'file_info': {
                 'format': self.format,
                 'size_bytes': 0,
@@ -439,8 +570,15 @@ class FileOutputNode(ProcessingNode):
         Get the JSON schema for this node's configuration and input/output.
         
         Returns:
-            A dictionary containing the JSON schema definition.
+            A new copy of the JSON schema definition, safe for callers to modify.
         """
+        cls = type(self)
+        if cls._SCHEMA_CACHE is None:
+            cls._SCHEMA_CACHE = self._build_schema()
+        return copy.deepcopy(cls._SCHEMA_CACHE)
+    
+    def _build_schema(self) -> Dict[str, Any]:
+        """Build the schema dictionary returned by get_schema()."""
         return {
             "node_type": "FileOutputNode",
             "description": "Writes data to Excel, CSV, or JSON files with template support",
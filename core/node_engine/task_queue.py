@@ -5,20 +5,346 @@ This module implements a lightweight, WAL-mode SQLite task queue designed to sta
 within the 50MB memory budget while providing reliable task persistence and execution tracking.
 """
 
+import atexit
+import functools
 import sqlite3
 import json
+import struct
 import threading
 import time
+import weakref
 from contextlib import contextmanager
-from dataclasses import asdict
 from datetime import datetime, timedelta
+from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Generator
+from typing import Any, Dict, List, Optional, Generator, Tuple
 from uuid import uuid4
 
+import msgpack
+
 from core.node_interfaces import NodeStatus, WorkflowContext, NodeInput, NodeOutput
 
 
+# Extension type for naive datetimes: big-endian int64 microseconds since the epoch
+_EXT_NAIVE_DATETIME = 1
+_EXT_US = struct.Struct('>q')
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """Encode the non-native types found in node payloads."""
+    if isinstance(obj, datetime):
+        # Naive datetimes (node timestamps are naive UTC) come back naive;
+        # aware ones use the msgpack timestamp type and come back aware in UTC
+        if obj.tzinfo is None:
+            return msgpack.ExtType(_EXT_NAIVE_DATETIME, _EXT_US.pack(_to_us(obj)))
+        return msgpack.Timestamp.from_datetime(obj)
+    if isinstance(obj, Enum):
+        return obj.name
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+def _pack_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a node payload dictionary to a MessagePack BLOB."""
+    return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+
+
+def _serialize_input(node_input: NodeInput) -> bytes:
+    """
+    Serialize a NodeInput without ``dataclasses.asdict``.
+    
+    ``asdict`` deep-copies every nested dict and list before msgpack ever sees
+    them; referencing the fields directly lets msgpack walk the originals.
+    """
+    return _pack_payload({
+        'data': node_input.data,
+        'metadata': node_input.metadata,
+        'node_id': node_input.node_id,
+        'timestamp': node_input.timestamp,
+    })
+
+
+def _serialize_output(output: NodeOutput) -> bytes:
+    """Serialize a NodeOutput by direct field access (see _serialize_input)."""
+    return _pack_payload({
+        'data': output.data,
+        'metadata': output.metadata,
+        'node_id': output.node_id,
+        'timestamp': output.timestamp,
+        'status': output.status,
+        'processing_time_ms': output.processing_time_ms,
+        'errors': output.errors,
+        'warnings': output.warnings,
+    })
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    """Decode the extension types written by _msgpack_default."""
+    if code == _EXT_NAIVE_DATETIME:
+        return _from_us(_EXT_US.unpack(data)[0])
+    return msgpack.ExtType(code, data)
+
+
+def _unpack_payload(blob: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a MessagePack BLOB produced by _pack_payload.
+    
+    Non-str map keys (e.g. ``{0: 'a'}``) are kept as they were packed.
+    """
+    payload = msgpack.unpackb(blob, timestamp=3, strict_map_key=False,
+                              ext_hook=_msgpack_ext_hook)
+    # Older payloads stored the naive timestamp as a msgpack timestamp
+    timestamp = payload.get('timestamp')
+    if isinstance(timestamp, datetime) and timestamp.tzinfo is not None:
+        payload['timestamp'] = timestamp.replace(tzinfo=None)
+    return payload
+
+
+# Plain dict lookup is cheaper than Enum.__getitem__ on per-row paths
+_STATUS_BY_NAME = {status.name: status for status in NodeStatus}
+
+# Scheduling metadata, selected without the potentially large payload BLOBs
+_TASK_META_COLUMNS = (
+    "task_id, node_id, workflow_id, status, priority, max_retries, "
+    "retry_count, error_message, created_at, started_at, completed_at"
+)
+
+# Hot-path statements are kept as constant text so sqlite3's per-connection
+# statement cache can reuse their prepared plans.
+_SQL_INSERT_TASK = """
+    INSERT INTO tasks (
+        task_id, node_id, workflow_id, status, priority,
+        max_retries, retry_count, input_data, created_at, dep_level
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_INSERT_DEP = "INSERT OR IGNORE INTO task_deps (task_id, dep_id) VALUES (?, ?)"
+
+# Claims return the task's metadata, input and dependency list in one step,
+# so dispatch is a single statement
+_CLAIM_RETURNING = f"""
+    RETURNING {_TASK_META_COLUMNS}, input_data, (
+        SELECT json_group_array(dep_id) FROM task_deps
+        WHERE task_deps.task_id = tasks.task_id
+    ) AS dependencies
+"""
+
+# Claim the best candidate whose dependencies are all completed
+_SQL_CLAIM_NEXT = f"""
+    UPDATE tasks
+    SET status = 'RUNNING', started_at = ?
+    WHERE task_id = (
+        SELECT t.task_id FROM tasks t
+        WHERE t.status = 'PENDING'
+        AND NOT EXISTS (
+            SELECT 1 FROM task_deps d
+            JOIN tasks p ON p.task_id = d.dep_id
+            WHERE d.task_id = t.task_id
+            AND p.status != 'COMPLETED'
+        )
+        ORDER BY t.priority DESC, t.created_at ASC
+        LIMIT 1
+    )
+    {_CLAIM_RETURNING}
+"""
+
+# Level-gated claim for workflows added with add_workflow: a task is ready
+# once every task on a lower topological level has completed
+_SQL_CLAIM_NEXT_IN_WORKFLOW = f"""
+    UPDATE tasks
+    SET status = 'RUNNING', started_at = ?
+    WHERE task_id = (
+        SELECT task_id FROM tasks
+        WHERE workflow_id = ? AND status = 'PENDING'
+        AND dep_level = (
+            SELECT MIN(dep_level) FROM tasks
+            WHERE workflow_id = ? AND status != 'COMPLETED'
+        )
+        ORDER BY priority DESC, created_at ASC
+        LIMIT 1
+    )
+    {_CLAIM_RETURNING}
+"""
+
+_SQL_WORKFLOW_DEPS = """
+    SELECT d.task_id, d.dep_id FROM task_deps d
+    JOIN tasks t ON t.task_id = d.task_id
+    WHERE t.workflow_id = ?
+"""
+
+_SQL_WORKFLOW_TASKS = f"""
+    SELECT {_TASK_META_COLUMNS}, input_data, output_data
+    FROM tasks WHERE workflow_id = ? ORDER BY created_at
+"""
+
+_SQL_WORKFLOW_TASKS_META = f"""
+    SELECT {_TASK_META_COLUMNS}
+    FROM tasks WHERE workflow_id = ? ORDER BY created_at
+"""
+
+_SQL_WORKFLOW_STATUSES = (
+    "SELECT task_id, status FROM tasks WHERE workflow_id = ? ORDER BY created_at"
+)
+
+_SQL_COMPLETE = """
+    UPDATE tasks 
+    SET status = ?, output_data = ?, completed_at = ?
+    WHERE task_id = ?
+    RETURNING task_id
+"""
+
+_SQL_READY_DEPENDENTS = """
+    SELECT t.task_id FROM task_deps e
+    JOIN tasks t ON t.task_id = e.task_id
+    WHERE e.dep_id = ?
+    AND t.status = 'PENDING'
+    AND NOT EXISTS (
+        SELECT 1 FROM task_deps d
+        JOIN tasks p ON p.task_id = d.dep_id
+        WHERE d.task_id = t.task_id
+        AND p.status != 'COMPLETED'
+    )
+"""
+
+_SQL_RETRY_STATE = "SELECT retry_count, max_retries FROM tasks WHERE task_id = ?"
+
+_SQL_RETRY = """
+    UPDATE tasks 
+    SET status = ?, retry_count = ?, started_at = NULL,
+        error_message = ?
+    WHERE task_id = ?
+"""
+
+_SQL_FAIL = """
+    UPDATE tasks 
+    SET status = ?, error_message = ?, completed_at = ?
+    WHERE task_id = ?
+"""
+
+_SQL_SAVE_CONTEXT = """
+    INSERT OR REPLACE INTO workflow_contexts (
+        workflow_id, current_node_id, execution_state,
+        shared_data, started_at, completed_at, status
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+_SQL_GET_CONTEXT = """
+    SELECT workflow_id, current_node_id, execution_state, shared_data,
+           started_at, completed_at, status
+    FROM workflow_contexts WHERE workflow_id = ?
+"""
+
+# Cleanup statements pin the partial index so they touch only expired rows
+_SQL_DELETE_OLD_DEPS = """
+    DELETE FROM task_deps WHERE task_id IN (
+        SELECT task_id FROM tasks INDEXED BY idx_completed_status
+        WHERE status IN ('COMPLETED', 'FAILED')
+        AND completed_at < ?
+    )
+"""
+
+_SQL_DELETE_OLD_TASKS = """
+    DELETE FROM tasks INDEXED BY idx_completed_status
+    WHERE status IN ('COMPLETED', 'FAILED') 
+    AND completed_at < ?
+"""
+
+# Served entirely from the narrow status index
+_SQL_QUEUE_STATS = """
+    SELECT status, COUNT(*) as count 
+    FROM tasks INDEXED BY idx_status_only
+    GROUP BY status
+"""
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_us(value: datetime) -> int:
+    """Convert a naive UTC datetime to integer microseconds since the epoch."""
+    return (value - _EPOCH) // _ONE_MICROSECOND
+
+
+def _from_us(value: int) -> datetime:
+    """Convert integer microseconds since the epoch to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _parse_ts(value: str) -> datetime:
+    """
+    Parse a timestamp written by ``datetime.isoformat()``.
+    
+    Slices the fixed ``YYYY-MM-DDTHH:MM:SS[.ffffff]`` layout directly and only
+    falls back to ``datetime.fromisoformat`` for anything else (e.g. offsets).
+    """
+    length = len(value)
+    if length == 19 or (length == 26 and value[19] == '.'):
+        return datetime(
+            int(value[0:4]), int(value[5:7]), int(value[8:10]),
+            int(value[11:13]), int(value[14:16]), int(value[17:19]),
+            int(value[20:26]) if length == 26 else 0
+        )
+    return datetime.fromisoformat(value)
+
+
+def _decode_output(blob: bytes) -> NodeOutput:
+    """Rebuild a NodeOutput from its stored MessagePack payload."""
+    output_dict = _unpack_payload(blob)
+    # Reconstruct NodeOutput with proper enum handling
+    output_dict['status'] = _STATUS_BY_NAME[output_dict['status']]
+    return NodeOutput(**output_dict)
+
+
+@contextmanager
+def _write_transaction(conn: sqlite3.Connection) -> Generator[None, None, None]:
+    """
+    Run a block inside ``BEGIN IMMEDIATE`` on an autocommit connection.
+    
+    Taking the write lock up front means a multi-statement write never has
+    to upgrade a deferred read lock mid-way, which is where concurrent
+    writers would otherwise fail with ``database is locked``.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _optimize_loop(queue_ref: "weakref.ref[SqliteTaskQueue]",
+                   stop: threading.Event, interval: float) -> None:
+    """
+    Run PRAGMA optimize every ``interval`` seconds for a task queue.
+    
+    Holds the queue only weakly between runs and exits once ``stop`` is
+    set, which happens on close() or when the queue is garbage collected.
+    """
+    while not stop.wait(interval):
+        queue = queue_ref()
+        if queue is None:
+            return
+        queue._optimize()
+        del queue
+
+
+def _close_if_alive(close_ref: weakref.WeakMethod) -> None:
+    """atexit hook that closes a task queue unless it was already collected."""
+    close = close_ref()
+    if close is not None:
+        close()
+
+
+class _Connection(sqlite3.Connection):
+    """
+    sqlite3 connection that supports weak references.
+    
+    Lets the queue track per-thread connections without keeping the
+    connections of finished threads alive.
+    """
+
+
 class TaskQueueError(Exception):
     """Base exception for task queue operations."""
     pass
@@ -32,6 +358,13 @@ class TaskNotFoundError(TaskQueueError):
 class Task:
     """Represents a task in the execution queue."""
     
+    __slots__ = (
+        'task_id', 'node_id', 'workflow_id', 'input_data', 'dependencies',
+        'priority', 'max_retries', 'retry_count', 'status', 'created_at',
+        'started_at', 'completed_at', 'error_message', '_output_data',
+        '_output_raw'
+    )
+    
     def __init__(self, task_id: str, node_id: str, workflow_id: str, 
                  input_data: NodeInput, dependencies: Optional[List[str]] = None,
                  priority: int = 0, max_retries: int = 3):
@@ -49,6 +382,19 @@ class Task:
         self.completed_at: Optional[datetime] = None
         self.output_data: Optional[NodeOutput] = None
         self.error_message: Optional[str] = None
+    
+    @property
+    def output_data(self) -> Optional[NodeOutput]:
+        """Task output, decoded from the stored payload on first access."""
+        if self._output_raw is not None:
+            self._output_data = _decode_output(self._output_raw)
+            self._output_raw = None
+        return self._output_data
+    
+    @output_data.setter
+    def output_data(self, value: Optional[NodeOutput]) -> None:
+        self._output_data = value
+        self._output_raw: Optional[bytes] = None
 
 
 class SqliteTaskQueue:
@@ -59,6 +405,9 @@ class SqliteTaskQueue:
     task persistence and efficient dependency resolution.
     """
     
+    # Interval between background PRAGMA optimize runs (seconds)
+    OPTIMIZE_INTERVAL = 4 * 60 * 60
+    
     def __init__(self, db_path: str = "data/task_queue.db"):
         """
         Initialize the SQLite task queue.
@@ -68,73 +417,206 @@ class SqliteTaskQueue:
         """
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._lock = threading.RLock()
+        
+        # One long-lived connection per thread; WAL lets readers run alongside
+        # the single writer, so only writes are serialized in Python
+        self._tls = threading.local()
+        self._connections: "weakref.WeakSet[sqlite3.Connection]" = weakref.WeakSet()
+        self._connections_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        
         self._initialize_database()
         
+        # Keep planner statistics fresh as the tasks table grows. The thread
+        # and the atexit hook only hold weak references, so an unreferenced
+        # queue is still collected; collection stops the thread.
+        self._stop_optimize = threading.Event()
+        weakref.finalize(self, self._stop_optimize.set)
+        threading.Thread(
+            target=_optimize_loop,
+            args=(weakref.ref(self), self._stop_optimize, self.OPTIMIZE_INTERVAL),
+            name="task-queue-optimize", daemon=True
+        ).start()
+        self._atexit_close = functools.partial(_close_if_alive, weakref.WeakMethod(self.close))
+        atexit.register(self._atexit_close)
+    
     def _initialize_database(self) -> None:
         """Initialize the database schema with optimal WAL configuration."""
         with self._get_connection() as conn:
-            # Configure SQLite for optimal performance with memory constraints
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA synchronous=NORMAL")
-            conn.execute("PRAGMA cache_size=2000")  # ~8MB cache
-            conn.execute("PRAGMA temp_store=MEMORY")
-            conn.execute("PRAGMA mmap_size=268435456")  # 256MB memory mapping
-            conn.execute("PRAGMA busy_timeout=5000")  # 5 second timeout
-            
-            # Create tasks table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS tasks (
-                    task_id TEXT PRIMARY KEY,
-                    node_id TEXT NOT NULL,
-                    workflow_id TEXT NOT NULL,
-                    status TEXT NOT NULL,
-                    priority INTEGER DEFAULT 0,
-                    max_retries INTEGER DEFAULT 3,
-                    retry_count INTEGER DEFAULT 0,
-                    dependencies TEXT,  -- JSON array
-                    input_data TEXT,    -- JSON serialized NodeInput
-                    output_data TEXT,   -- JSON serialized NodeOutput
-                    error_message TEXT,
-                    created_at TEXT NOT NULL,
-                    started_at TEXT,
-                    completed_at TEXT,
-                    INDEX idx_status_priority (status, priority DESC),
-                    INDEX idx_workflow_id (workflow_id),
-                    INDEX idx_created_at (created_at)
-                )
-            """)
+            # auto_vacuum only takes effect before the first table is created
+            if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
             
-            # Create workflow contexts table
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS workflow_contexts (
-                    workflow_id TEXT PRIMARY KEY,
-                    current_node_id TEXT,
-                    execution_state TEXT,  -- JSON
-                    shared_data TEXT,      -- JSON
-                    started_at TEXT NOT NULL,
-                    completed_at TEXT,
-                    status TEXT NOT NULL
-                )
-            """)
+            # WAL mode is persistent in the database file, set it once here
+            conn.execute("PRAGMA journal_mode=WAL")
             
-            conn.commit()
+            with _write_transaction(conn):
+                self._create_schema(conn)
+    
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create tables and indexes and migrate older layouts."""
+        # Create tasks table
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                node_id TEXT NOT NULL,
+                workflow_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority INTEGER DEFAULT 0,
+                max_retries INTEGER DEFAULT 3,
+                retry_count INTEGER DEFAULT 0,
+                input_data BLOB,    -- MessagePack serialized NodeInput
+                output_data BLOB,   -- MessagePack serialized NodeOutput
+                error_message TEXT,
+                created_at INTEGER NOT NULL,  -- UTC microseconds since epoch
+                started_at INTEGER,
+                completed_at INTEGER,
+                dep_level INTEGER  -- topological level, set by add_workflow
+            )
+        """)
+        self._migrate_dep_level_column(conn)
+        
+        # SQLite has no inline INDEX clause; indexes are created separately
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_status_priority
+            ON tasks (status, priority DESC, created_at ASC)
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_workflow_id ON tasks (workflow_id)"
+        )
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_workflow_level
+            ON tasks (workflow_id, status, dep_level, priority DESC)
+        """)
+        # Partial index: cleanup only ever looks at finished tasks
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_completed_status
+            ON tasks (completed_at) WHERE status IN ('COMPLETED', 'FAILED')
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_status_only ON tasks (status)"
+        )
+        
+        # Normalized dependency edges, queried by the dispatch statement
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_deps (
+                task_id TEXT NOT NULL,
+                dep_id TEXT NOT NULL,
+                PRIMARY KEY (task_id, dep_id)
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_task_deps_dep ON task_deps (dep_id)"
+        )
+        self._migrate_dependency_column(conn)
+        
+        # Create workflow contexts table
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS workflow_contexts (
+                workflow_id TEXT PRIMARY KEY,
+                current_node_id TEXT,
+                execution_state TEXT,  -- JSON
+                shared_data TEXT,      -- JSON
+                started_at TEXT NOT NULL,
+                completed_at TEXT,
+                status TEXT NOT NULL
+            )
+        """)
+    
+    def _migrate_dep_level_column(self, conn: sqlite3.Connection) -> None:
+        """Add the dep_level column to task tables created before it existed."""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if 'dep_level' not in columns:
+            conn.execute("ALTER TABLE tasks ADD COLUMN dep_level INTEGER")
+    
+    def _migrate_dependency_column(self, conn: sqlite3.Connection) -> None:
+        """Move dependencies from the legacy JSON column into task_deps."""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+        if 'dependencies' not in columns:
+            return
+        
+        conn.execute("""
+            INSERT OR IGNORE INTO task_deps (task_id, dep_id)
+            SELECT t.task_id, j.value
+            FROM tasks t, json_each(t.dependencies) j
+            WHERE t.dependencies IS NOT NULL
+        """)
+        conn.execute("ALTER TABLE tasks DROP COLUMN dependencies")
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a new connection and apply the per-connection PRAGMAs."""
+        conn = sqlite3.connect(
+            str(self.db_path), timeout=5.0, check_same_thread=False,
+            cached_statements=256, factory=_Connection,
+            isolation_level=None  # autocommit; writes use _write_transaction
+        )
+        conn.row_factory = sqlite3.Row
+        
+        # Configure SQLite for optimal performance with memory constraints
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=2000")  # ~8MB cache
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")  # 256MB memory mapping
+        conn.execute("PRAGMA busy_timeout=5000")  # 5 second timeout
+        
+        # Bound the -wal file so bursty inserts stay within the memory budget
+        conn.execute("PRAGMA wal_autocheckpoint=1000")  # pages
+        conn.execute("PRAGMA journal_size_limit=67108864")  # 64MB
+        return conn
     
     @contextmanager
     def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """Get a database connection with proper error handling."""
-        conn = None
+        """Get this thread's database connection with proper error handling."""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            try:
+                conn = self._create_connection()
+            except sqlite3.Error as e:
+                raise TaskQueueError(f"Database operation failed: {e}")
+            self._tls.conn = conn
+            with self._connections_lock:
+                self._connections.add(conn)
+        
         try:
-            conn = sqlite3.connect(str(self.db_path), timeout=5.0)
-            conn.row_factory = sqlite3.Row
             yield conn
         except sqlite3.Error as e:
-            if conn:
-                conn.rollback()
+            conn.rollback()
             raise TaskQueueError(f"Database operation failed: {e}")
         finally:
-            if conn:
-                conn.close()
+            # Never leave a dangling transaction on the long-lived connection
+            if conn.in_transaction:
+                conn.rollback()
+    
+    @staticmethod
+    def _close_connection(conn: sqlite3.Connection) -> None:
+        """Run PRAGMA optimize and close the connection."""
+        try:
+            conn.execute("PRAGMA optimize")
+        except sqlite3.Error:
+            pass
+        conn.close()
+    
+    def _optimize(self) -> None:
+        """Run the periodic PRAGMA optimize."""
+        try:
+            with self._get_connection() as conn:
+                conn.execute("PRAGMA optimize")
+        except TaskQueueError:
+            pass
+    
+    def close(self) -> None:
+        """Stop background maintenance and close every thread's connection."""
+        self._stop_optimize.set()
+        atexit.unregister(self._atexit_close)
+        
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            # Threads that keep using the queue get fresh connections
+            self._tls = threading.local()
+        
+        for conn in connections:
+            self._close_connection(conn)
     
     def add_task(self, task: Task) -> None:
         """
@@ -143,27 +625,85 @@ class SqliteTaskQueue:
         Args:
             task: The task to add to the queue.
         """
-        with self._lock:
+        self.add_tasks([task])
+    
+    def add_tasks(self, tasks: List[Task]) -> None:
+        """
+        Add several tasks to the queue in a single transaction.
+        
+        Args:
+            tasks: The tasks to add to the queue.
+        """
+        self._insert_tasks(tasks, {})
+    
+    def add_workflow(self, tasks: List[Task]) -> None:
+        """
+        Add the tasks of one workflow together with their topological levels.
+        
+        Each task's level is the length of the longest dependency chain
+        leading to it, so ``get_next_ready_workflow_task`` can dispatch a whole
+        level at once without checking individual dependencies. Dependencies
+        on tasks outside ``tasks`` are ignored for levelling.
+        
+        Args:
+            tasks: All tasks of the workflow.
+            
+        Raises:
+            ValueError: If the dependencies contain a cycle.
+        """
+        task_ids = {task.task_id for task in tasks}
+        in_degree = {task.task_id: 0 for task in tasks}
+        dependents: Dict[str, List[str]] = {task_id: [] for task_id in task_ids}
+        for task in tasks:
+            for dep_id in set(task.dependencies):
+                if dep_id in task_ids:
+                    in_degree[task.task_id] += 1
+                    dependents[dep_id].append(task.task_id)
+        
+        # Kahn's algorithm, tracking the longest path from a root
+        levels = {task_id: 0 for task_id in task_ids}
+        ready = [task_id for task_id, degree in in_degree.items() if degree == 0]
+        visited = 0
+        while ready:
+            task_id = ready.pop()
+            visited += 1
+            for dependent in dependents[task_id]:
+                levels[dependent] = max(levels[dependent], levels[task_id] + 1)
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    ready.append(dependent)
+        
+        if visited != len(task_ids):
+            raise ValueError("Workflow tasks contain a dependency cycle")
+        
+        self._insert_tasks(tasks, levels)
+    
+    def _insert_tasks(self, tasks: List[Task], levels: Dict[str, int]) -> None:
+        """Insert tasks and their dependency edges in a single transaction."""
+        task_rows = [
+            (
+                task.task_id,
+                task.node_id,
+                task.workflow_id,
+                task.status.name,
+                task.priority,
+                task.max_retries,
+                task.retry_count,
+                _serialize_input(task.input_data),
+                _to_us(task.created_at),
+                levels.get(task.task_id)
+            )
+            for task in tasks
+        ]
+        dep_rows = [
+            (task.task_id, dep_id) for task in tasks for dep_id in task.dependencies
+        ]
+        
+        with self._write_lock:
             with self._get_connection() as conn:
-                conn.execute("""
-                    INSERT INTO tasks (
-                        task_id, node_id, workflow_id, status, priority,
-                        max_retries, retry_count, dependencies, input_data,
-                        created_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    task.task_id,
-                    task.node_id,
-                    task.workflow_id,
-                    task.status.name,
-                    task.priority,
-                    task.max_retries,
-                    task.retry_count,
-                    json.dumps(task.dependencies),
-                    json.dumps(asdict(task.input_data)),
-                    task.created_at.isoformat()
-                ))
-                conn.commit()
+                with _write_transaction(conn):
+                    conn.executemany(_SQL_INSERT_TASK, task_rows)
+                    conn.executemany(_SQL_INSERT_DEP, dep_rows)
     
     def get_next_ready_task(self) -> Optional[Task]:
         """
@@ -172,26 +712,51 @@ class SqliteTaskQueue:
         Returns the highest priority task whose dependencies are satisfied,
         or None if no tasks are ready.
         """
-        with self._lock:
+        return self._claim(_SQL_CLAIM_NEXT, (_to_us(datetime.utcnow()),))
+    
+    def get_next_ready_workflow_task(self, workflow_id: str) -> Optional[Task]:
+        """
+        Get the next ready task of a workflow added with ``add_workflow``.
+        
+        Uses the precomputed topological levels instead of per-task
+        dependency checks: only tasks on the lowest level that still has
+        unfinished work are dispatched.
+        
+        Args:
+            workflow_id: ID of the workflow.
+            
+        Returns:
+            The highest priority ready task, or None if no task is ready.
+        """
+        return self._claim(
+            _SQL_CLAIM_NEXT_IN_WORKFLOW,
+            (_to_us(datetime.utcnow()), workflow_id, workflow_id)
+        )
+    
+    def _claim(self, query: str, params: tuple) -> Optional[Task]:
+        """
+        Run a claim statement and build the claimed task from its RETURNING row.
+        
+        The task is decoded before the claim commits, so a payload that
+        cannot be decoded leaves the task PENDING instead of stuck RUNNING.
+        
+        Raises:
+            TaskQueueError: If the claimed task's payload cannot be decoded.
+        """
+        with self._write_lock:
             with self._get_connection() as conn:
-                # Get pending tasks ordered by priority
-                cursor = conn.execute("""
-                    SELECT * FROM tasks 
-                    WHERE status = 'PENDING'
-                    ORDER BY priority DESC, created_at ASC
-                """)
-                
-                for row in cursor:
-                    task = self._row_to_task(row)
-                    if self._are_dependencies_satisfied(task, conn):
-                        # Mark task as running
-                        task.status = NodeStatus.RUNNING
-                        task.started_at = datetime.utcnow()
-                        self._update_task_status(task, conn)
-                        conn.commit()
-                        return task
-                
-                return None
+                with _write_transaction(conn):
+                    rows = conn.execute(query, params).fetchall()
+                    if not rows:
+                        return None
+                    try:
+                        return self._row_to_task(
+                            rows[0], json.loads(rows[0]['dependencies']), with_output=False
+                        )
+                    except (ValueError, TypeError, msgpack.UnpackException) as e:
+                        raise TaskQueueError(
+                            f"Cannot decode input of task {rows[0]['task_id']}: {e}"
+                        ) from e
     
     def complete_task(self, task_id: str, output: NodeOutput) -> None:
         """
@@ -201,23 +766,44 @@ class SqliteTaskQueue:
             task_id: ID of the task to complete.
             output: The output data from task execution.
         """
-        with self._lock:
+        with self._write_lock:
             with self._get_connection() as conn:
-                conn.execute("""
-                    UPDATE tasks 
-                    SET status = ?, output_data = ?, completed_at = ?
-                    WHERE task_id = ?
-                """, (
-                    NodeStatus.COMPLETED.name,
-                    json.dumps(asdict(output)),
-                    datetime.utcnow().isoformat(),
-                    task_id
-                ))
-                
-                if conn.rowcount == 0:
-                    raise TaskNotFoundError(f"Task {task_id} not found")
-                
-                conn.commit()
+                self._mark_completed(conn, task_id, output)
+    
+    def complete_and_get_ready(self, task_id: str, output: NodeOutput) -> List[str]:
+        """
+        Complete a task and report which of its dependents became ready.
+        
+        Completion and the dependent lookup share one transaction, so the
+        scheduler learns about newly runnable tasks without another round-trip.
+        
+        Args:
+            task_id: ID of the task to complete.
+            output: The output data from task execution.
+            
+        Returns:
+            IDs of PENDING tasks depending on this task whose dependencies are
+            now all completed.
+        """
+        with self._write_lock:
+            with self._get_connection() as conn:
+                with _write_transaction(conn):
+                    self._mark_completed(conn, task_id, output)
+                    cursor = conn.execute(_SQL_READY_DEPENDENTS, (task_id,))
+                    return [row['task_id'] for row in cursor]
+    
+    def _mark_completed(self, conn: sqlite3.Connection, task_id: str,
+                        output: NodeOutput) -> None:
+        """Store a task's output and mark it completed on the given connection."""
+        cursor = conn.execute(_SQL_COMPLETE, (
+            NodeStatus.COMPLETED.name,
+            _serialize_output(output),
+            _to_us(datetime.utcnow()),
+            task_id
+        ))
+        
+        if not cursor.fetchall():
+            raise TaskNotFoundError(f"Task {task_id} not found")
     
     def fail_task(self, task_id: str, error_message: str, retry: bool = True) -> bool:
         """
@@ -231,69 +817,72 @@ class SqliteTaskQueue:
         Returns:
             True if the task will be retried, False if permanently failed.
         """
-        with self._lock:
+        with self._write_lock:
             with self._get_connection() as conn:
-                # Get current task state
-                cursor = conn.execute(
-                    "SELECT retry_count, max_retries FROM tasks WHERE task_id = ?",
-                    (task_id,)
+                with _write_transaction(conn):
+                    # Get current task state
+                    cursor = conn.execute(_SQL_RETRY_STATE, (task_id,))
+                    row = cursor.fetchone()
+                    
+                    if not row:
+                        raise TaskNotFoundError(f"Task {task_id} not found")
+                    
+                    retry_count, max_retries = row['retry_count'], row['max_retries']
+                    
+                    if retry and retry_count < max_retries:
+                        # Retry the task
+                        conn.execute(_SQL_RETRY, (
+                            NodeStatus.PENDING.name,
+                            retry_count + 1,
+                            error_message,
+                            task_id
+                        ))
+                        return True
+                    else:
+                        # Permanently failed
+                        conn.execute(_SQL_FAIL, (
+                            NodeStatus.FAILED.name,
+                            error_message,
+                            _to_us(datetime.utcnow()),
+                            task_id
+                        ))
+                        return False
+    
+    def get_workflow_tasks(self, workflow_id: str,
+                           include_payloads: bool = True) -> List[Task]:
+        """
+        Get all tasks for a specific workflow.
+        
+        Args:
+            workflow_id: ID of the workflow.
+            include_payloads: Load input/output payloads as well. When False
+                only scheduling metadata is read and ``input_data`` and
+                ``output_data`` are None.
+        """
+        query = _SQL_WORKFLOW_TASKS if include_payloads else _SQL_WORKFLOW_TASKS_META
+        
+        with self._get_connection() as conn:
+            dependencies = self._load_dependencies(conn, _SQL_WORKFLOW_DEPS, (workflow_id,))
+            cursor = conn.execute(query, (workflow_id,))
+            return [
+                self._row_to_task(
+                    row, dependencies.get(row['task_id']),
+                    with_input=include_payloads, with_output=include_payloads
                 )
-                row = cursor.fetchone()
-                
-                if not row:
-                    raise TaskNotFoundError(f"Task {task_id} not found")
-                
-                retry_count, max_retries = row['retry_count'], row['max_retries']
-                
-                if retry and retry_count < max_retries:
-                    # Retry the task
-                    conn.execute("""
-                        UPDATE tasks 
-                        SET status = ?, retry_count = ?, started_at = NULL,
-                            error_message = ?
-                        WHERE task_id = ?
-                    """, (
-                        NodeStatus.PENDING.name,
-                        retry_count + 1,
-                        error_message,
-                        task_id
-                    ))
-                    conn.commit()
-                    return True
-                else:
-                    # Permanently failed
-                    conn.execute("""
-                        UPDATE tasks 
-                        SET status = ?, error_message = ?, completed_at = ?
-                        WHERE task_id = ?
-                    """, (
-                        NodeStatus.FAILED.name,
-                        error_message,
-                        datetime.utcnow().isoformat(),
-                        task_id
-                    ))
-                    conn.commit()
-                    return False
-    
-    def get_workflow_tasks(self, workflow_id: str) -> List[Task]:
-        """Get all tasks for a specific workflow."""
+                for row in cursor
+            ]
+    
+    def get_workflow_task_statuses(self, workflow_id: str) -> List[Tuple[str, NodeStatus]]:
+        """Get ``(task_id, status)`` pairs for a workflow without loading payloads."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM tasks WHERE workflow_id = ? ORDER BY created_at",
-                (workflow_id,)
-            )
-            return [self._row_to_task(row) for row in cursor]
+            cursor = conn.execute(_SQL_WORKFLOW_STATUSES, (workflow_id,))
+            return [(row['task_id'], _STATUS_BY_NAME[row['status']]) for row in cursor]
     
     def save_workflow_context(self, context: WorkflowContext) -> None:
         """Save or update a workflow context."""
-        with self._lock:
+        with self._write_lock:
             with self._get_connection() as conn:
-                conn.execute("""
-                    INSERT OR REPLACE INTO workflow_contexts (
-                        workflow_id, current_node_id, execution_state,
-                        shared_data, started_at, completed_at, status
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
+                conn.execute(_SQL_SAVE_CONTEXT, (
                     context.workflow_id,
                     context.current_node_id,
                     json.dumps(context.execution_state),
@@ -302,15 +891,11 @@ class SqliteTaskQueue:
                     context.completed_at.isoformat() if context.completed_at else None,
                     context.status.name
                 ))
-                conn.commit()
     
     def get_workflow_context(self, workflow_id: str) -> Optional[WorkflowContext]:
         """Get a workflow context by ID."""
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                "SELECT * FROM workflow_contexts WHERE workflow_id = ?",
-                (workflow_id,)
-            )
+            cursor = conn.execute(_SQL_GET_CONTEXT, (workflow_id,))
             row = cursor.fetchone()
             
             if not row:
@@ -321,9 +906,9 @@ class SqliteTaskQueue:
                 current_node_id=row['current_node_id'],
                 execution_state=json.loads(row['execution_state'] or '{}'),
                 shared_data=json.loads(row['shared_data'] or '{}'),
-                started_at=datetime.fromisoformat(row['started_at']),
-                completed_at=datetime.fromisoformat(row['completed_at']) if row['completed_at'] else None,
-                status=NodeStatus[row['status']]
+                started_at=_parse_ts(row['started_at']),
+                completed_at=_parse_ts(row['completed_at']) if row['completed_at'] else None,
+                status=_STATUS_BY_NAME[row['status']]
             )
     
     def cleanup_old_tasks(self, older_than_days: int = 7) -> int:
@@ -338,93 +923,87 @@ class SqliteTaskQueue:
         """
         cutoff_date = datetime.utcnow() - timedelta(days=older_than_days)
         
-        with self._lock:
+        with self._write_lock:
             with self._get_connection() as conn:
-                cursor = conn.execute("""
-                    DELETE FROM tasks 
-                    WHERE status IN ('COMPLETED', 'FAILED') 
-                    AND completed_at < ?
-                """, (cutoff_date.isoformat(),))
+                cutoff_us = _to_us(cutoff_date)
+                with _write_transaction(conn):
+                    conn.execute(_SQL_DELETE_OLD_DEPS, (cutoff_us,))
+                    cursor = conn.execute(_SQL_DELETE_OLD_TASKS, (cutoff_us,))
+                    deleted_count = cursor.rowcount
                 
-                deleted_count = cursor.rowcount
-                conn.commit()
+                # Reclaim a bounded number of free pages instead of a full VACUUM.
+                # executescript steps the pragma to completion; execute() would
+                # free a single page.
+                conn.executescript("PRAGMA incremental_vacuum(1000);")
                 
-                # Also vacuum the database to reclaim space
-                conn.execute("VACUUM")
+                # Fold the WAL back into the database and truncate it to zero
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
                 
                 return deleted_count
     
+    def compact(self) -> None:
+        """
+        Rebuild the database file with a full VACUUM.
+        
+        This rewrites the whole file under an exclusive lock; run it offline
+        rather than while workflows are executing.
+        """
+        with self._write_lock:
+            with self._get_connection() as conn:
+                conn.execute("VACUUM")
+    
     def get_queue_stats(self) -> Dict[str, int]:
         """Get statistics about the current queue state."""
         with self._get_connection() as conn:
-            cursor = conn.execute("""
-                SELECT status, COUNT(*) as count 
-                FROM tasks 
-                GROUP BY status
-            """)
+            cursor = conn.execute(_SQL_QUEUE_STATS)
             
             stats = {status.name: 0 for status in NodeStatus}
             stats.update({row['status']: row['count'] for row in cursor})
             
             return stats
     
-    def _are_dependencies_satisfied(self, task: Task, conn: sqlite3.Connection) -> bool:
-        """Check if all dependencies for a task are satisfied."""
-        if not task.dependencies:
-            return True
-        
-        placeholders = ','.join('?' * len(task.dependencies))
-        cursor = conn.execute(f"""
-            SELECT COUNT(*) as incomplete_count
-            FROM tasks 
-            WHERE task_id IN ({placeholders}) 
-            AND status != 'COMPLETED'
-        """, task.dependencies)
-        
-        result = cursor.fetchone()
-        return result['incomplete_count'] == 0
+    @staticmethod
+    def _load_dependencies(conn: sqlite3.Connection, query: str,
+                           params: tuple) -> Dict[str, List[str]]:
+        """Group (task_id, dep_id) rows from a task_deps query by task."""
+        dependencies: Dict[str, List[str]] = {}
+        for task_id, dep_id in conn.execute(query, params):
+            dependencies.setdefault(task_id, []).append(dep_id)
+        return dependencies
     
-    def _update_task_status(self, task: Task, conn: sqlite3.Connection) -> None:
-        """Update task status in the database."""
-        conn.execute("""
-            UPDATE tasks 
-            SET status = ?, started_at = ?
-            WHERE task_id = ?
-        """, (
-            task.status.name,
-            task.started_at.isoformat() if task.started_at else None,
-            task.task_id
-        ))
-    
-    def _row_to_task(self, row: sqlite3.Row) -> Task:
-        """Convert a database row to a Task object."""
+    def _row_to_task(self, row: sqlite3.Row,
+                     dependencies: Optional[List[str]] = None,
+                     with_input: bool = True, with_output: bool = True) -> Task:
+        """
+        Convert a database row to a Task object.
+        
+        ``with_input``/``with_output`` state whether the row projected the
+        ``input_data``/``output_data`` columns.
+        """
         task = Task(
             task_id=row['task_id'],
             node_id=row['node_id'],
             workflow_id=row['workflow_id'],
-            input_data=NodeInput(**json.loads(row['input_data'])),
-            dependencies=json.loads(row['dependencies'] or '[]'),
+            input_data=NodeInput(**_unpack_payload(row['input_data'])) if with_input else None,
+            dependencies=dependencies,
             priority=row['priority'],
             max_retries=row['max_retries']
         )
         
         task.retry_count = row['retry_count']
-        task.status = NodeStatus[row['status']]
-        task.created_at = datetime.fromisoformat(row['created_at'])
+        task.status = _STATUS_BY_NAME[row['status']]
+        task.created_at = _from_us(row['created_at'])
         task.error_message = row['error_message']
         
-        if row['started_at']:
-            task.started_at = datetime.fromisoformat(row['started_at'])
+        if row['started_at'] is not None:
+            task.started_at = _from_us(row['started_at'])
         
-        if row['completed_at']:
-            task.completed_at = datetime.fromisoformat(row['completed_at'])
+        if row['completed_at'] is not None:
+            task.completed_at = _from_us(row['completed_at'])
         
-        if row['output_data']:
-            output_dict = json.loads(row['output_data'])
-            # Reconstruct NodeOutput with proper enum handling
-            output_dict['status'] = NodeStatus[output_dict['status']]
-            output_dict['timestamp'] = datetime.fromisoformat(output_dict['timestamp'])
-            task.output_data = NodeOutput(**output_dict)
+        # Defer output decoding until a caller actually reads it
+        if with_output:
+            task._output_raw = row['output_data']
         
         return task
 
@@ -33,7 +33,7 @@ class ValidationSeverity(Enum):
     ERROR = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     """Result of input validation."""
 
@@ -44,7 +44,7 @@ class ValidationResult:
     error_code: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeInput:
     """Standard input data model for all nodes."""
 
@@ -62,7 +62,7 @@ class NodeInput:
         return key in self.data
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeOutput:
     """Standard output data model for all nodes."""
 
@@ -90,7 +90,7 @@ class NodeOutput:
         self.data[key] = value
 
 
-@dataclass
+@dataclass(slots=True)
 class ArchiveDocument:
     """Data model for an archive document."""
 
@@ -112,7 +112,7 @@ class ArchiveDocument:
         self.metadata[key] = value
 
 
-@dataclass
+@dataclass(slots=True)
 class DirectoryConfig:
     """Configuration model for directory generation workflows."""
 
@@ -126,7 +126,7 @@ class DirectoryConfig:
     validation_rules: Dict[str, Any] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowContext:
     """Execution state container for DAG processing."""
 
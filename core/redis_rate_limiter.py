@@ -0,0 +1,83 @@
+"""
+Redis-backed sliding window rate limiting.
+
+Keeps each user's request log in a Redis sorted set so that every worker
+process and replica enforces the same limit. The prune, count and record
+steps run in one Lua script, which Redis executes atomically.
+"""
+
+import math
+import time
+from typing import Any, Tuple
+from uuid import uuid4
+
+
+# KEYS[1]: window key
+# ARGV: now_ms, window_ms, limit, member
+# Returns {1, 0} when allowed, {0, retry_after_ms} when the limit is reached
+_SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count >= limit then
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local retry_after = window
+    if oldest[2] then
+        retry_after = tonumber(oldest[2]) + window - now
+    end
+    return {0, retry_after}
+end
+
+redis.call('ZADD', key, now, ARGV[4])
+redis.call('PEXPIRE', key, window)
+return {1, 0}
+"""
+
+
+class RedisSlidingWindow:
+    """
+    Sliding window counter stored in Redis sorted sets.
+    
+    The script is registered with ``register_script`` so redis-py sends it
+    by SHA (EVALSHA) after the first call. Keys expire after one window of
+    inactivity, so idle users do not accumulate memory.
+    """
+    
+    def __init__(self, redis_client: Any, key_prefix: str = "ratelimit:"):
+        """
+        Initialize the sliding window.
+        
+        Args:
+            redis_client: A ``redis.Redis`` compatible client.
+            key_prefix: Prefix for the per-user sorted set keys.
+        """
+        self.key_prefix = key_prefix
+        self._script = redis_client.register_script(_SLIDING_WINDOW_SCRIPT)
+    
+    def hit(self, user_id: str, limit: int, window_seconds: int) -> Tuple[bool, int]:
+        """
+        Record a request if the user is within the limit.
+        
+        Args:
+            user_id: ID of the user making the request.
+            limit: Maximum requests allowed in the window.
+            window_seconds: Length of the sliding window in seconds.
+        
+        Returns:
+            Tuple of (is_allowed, retry_after_seconds)
+        """
+        now_ms = int(time.time() * 1000)
+        window_ms = window_seconds * 1000
+        
+        allowed, retry_after_ms = self._script(
+            keys=[f"{self.key_prefix}{user_id}"],
+            args=[now_ms, window_ms, limit, f"{now_ms}-{uuid4().hex}"]
+        )
+        
+        if allowed:
+            return True, 0
+        return False, max(math.ceil(int(retry_after_ms) / 1000), 1)
@@ -8,22 +8,91 @@ error responses.
 
 import json
 import logging
+import random
+import re
+import secrets
 import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Any, Callable, Tuple
-from functools import wraps
+from typing import Dict, List, Optional, Set, Any, Callable, Sequence, Tuple
+from functools import lru_cache, wraps
 from urllib.parse import urlparse
 
-from .rbac_models import User, Permission, Role, AuthEvent, AuthEventType
-from .security_manager import get_security_manager
-from .session_manager import get_session_manager
-from .jwt_manager import get_jwt_manager
-from .permission_checker import get_permission_checker, AuthorizationError
+from utils.rbac_models import User, Permission, Role, AuthEvent, AuthEventType
+from utils.security_manager import get_security_manager
+from utils.session_manager import get_session_manager
+from utils.jwt_manager import get_jwt_manager
+from utils.permission_checker import get_permission_checker, AuthorizationError
+from .jwt_verification_cache import JWTVerificationCache, TokenCache
+from .redis_rate_limiter import RedisSlidingWindow
+from .audit_queue import LazyAuthEvent, get_audit_queue
 
 logger = logging.getLogger(__name__)
 
+# Numeric resource IDs in a path, folded to '*' so they share a cache slot
+_NUMERIC_SEGMENT_RE = re.compile(r'/\d+(?=/|$)')
+
+# The "session" cookie as a whole token, not a suffix of e.g. "mysession"
+_SESSION_COOKIE_RE = re.compile(r'(?:^|;\s*)session=([^;]+)')
+
+# Structural shape of credentials, checked before any expensive validation
+_JWT_SHAPE_RE = re.compile(r'[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+')
+_SESSION_TOKEN_SHAPE_RE = re.compile(r'[A-Za-z0-9_-]+')  # secrets.token_urlsafe
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Shared immutable results for endpoints without an explicit mapping
+_READ_PERMISSIONS = (Permission.DIRECTORY_READ,)
+_WRITE_PERMISSIONS = (Permission.DIRECTORY_UPDATE,)
+_DELETE_PERMISSIONS = (Permission.DIRECTORY_DELETE,)
+
+
+def _new_trace_id() -> str:
+    """Generate a random 16 hex digit trace ID for a request."""
+    return secrets.token_bytes(8).hex()
+
+
+def _endpoint_access_event(user: User, method: str, path: str, ip_address: str,
+                           user_agent: str, trace_id: str,
+                           timestamp: datetime) -> AuthEvent:
+    """Build the audit event for a granted API request."""
+    return AuthEvent(
+        event_type=AuthEventType.PERMISSION_GRANTED,
+        user_id=user.id,
+        username=user.username,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        resource=f"{method} {path}",
+        success=True,
+        timestamp=timestamp,
+        trace_id=trace_id,
+        metadata={"endpoint_access": True}
+    )
+
+
+def _login_success_event(user: User, session_id: Optional[str], ip_address: str,
+                         user_agent: str, trace_id: str, timestamp: datetime,
+                         auth_method: str, jti: Optional[str] = None) -> AuthEvent:
+    """Build the audit event for a successful JWT or session authentication."""
+    metadata: Dict[str, Any] = {"auth_method": auth_method}
+    if auth_method == "jwt":
+        metadata["jti"] = jti
+    
+    return AuthEvent(
+        event_type=AuthEventType.LOGIN_SUCCESS,
+        user_id=user.id,
+        username=user.username,
+        session_id=session_id,
+        ip_address=ip_address,
+        user_agent=user_agent,
+        success=True,
+        timestamp=timestamp,
+        trace_id=trace_id,
+        metadata=metadata
+    )
+
 
 class APISecurityError(Exception):
     """Base exception for API security errors."""
@@ -61,14 +130,31 @@ class RateLimiter:
     Rate limiting implementation with role-based limits.
     
     Implements sliding window rate limiting with per-user tracking
-    and configurable limits based on user roles.
+    and configurable limits based on user roles. When a Redis client is
+    given the window is shared by all processes; otherwise it is kept
+    in-process.
     """
     
-    def __init__(self):
-        """Initialize rate limiter."""
-        self._requests = defaultdict(list)  # user_id -> [(timestamp, endpoint), ...]
-        self._lock = threading.RLock()
+    # Independent lock stripes for the in-process windows (power of two)
+    SHARD_COUNT = 64
+    
+    # Upper bound on tracked keys per shard; anonymous clients can rotate IPs
+    MAX_KEYS_PER_SHARD = 4096
+    
+    def __init__(self, redis_client: Optional[Any] = None):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            redis_client: Optional ``redis.Redis`` client for shared limits.
+        """
+        # Each shard: (key -> deque of timestamps oldest first, its lock);
+        # keys are kept in least recently used order
+        self._shards = [
+            (OrderedDict(), threading.Lock()) for _ in range(self.SHARD_COUNT)
+        ]
         self.security_manager = get_security_manager()
+        self._redis_window = RedisSlidingWindow(redis_client) if redis_client is not None else None
     
     def check_rate_limit(self, user: User, endpoint: str, window_minutes: int = 60) -> Tuple[bool, int]:
         """
@@ -82,44 +168,77 @@ class RateLimiter:
         Returns:
             Tuple of (is_allowed, retry_after_seconds)
         """
-        with self._lock:
-            now = time.time()
-            window_start = now - (window_minutes * 60)
-            
-            # Get rate limit for user's highest role
-            rate_limit = self._get_user_rate_limit(user)
-            
-            # Clean old requests
-            user_requests = self._requests[user.id]
-            user_requests[:] = [(ts, ep) for ts, ep in user_requests if ts > window_start]
-            
-            # Check current request count
-            current_count = len(user_requests)
-            
-            if current_count >= rate_limit:
-                # Calculate retry after time
-                oldest_request = min(user_requests, key=lambda x: x[0])[0] if user_requests else now
-                retry_after = int((oldest_request + (window_minutes * 60)) - now)
-                return False, max(retry_after, 1)
+        # Get rate limit for user's highest role
+        return self._check_key(user.id, self._get_user_rate_limit(user), window_minutes)
+    
+    def check_ip_rate_limit(self, ip_address: str, window_minutes: int = 60) -> Tuple[bool, int]:
+        """
+        Check if an unauthenticated client is within rate limits.
+        
+        Anonymous clients are tracked by IP address and get the lowest
+        role's limit.
+        
+        Args:
+            ip_address: Client IP address.
+            window_minutes: Time window for rate limiting in minutes.
             
-            # Record this request
-            user_requests.append((now, endpoint))
-            return True, 0
+        Returns:
+            Tuple of (is_allowed, retry_after_seconds)
+        """
+        rate_limit = self.security_manager.config.get_rate_limit_for_role(Role.VIEWER)
+        return self._check_key(f"ip:{ip_address}", rate_limit, window_minutes)
     
-    def _get_user_rate_limit(self, user: User) -> int:
-        """Get rate limit for user based on their highest privilege role."""
-        # Role hierarchy (higher index = higher privilege)
-        role_hierarchy = [Role.VIEWER, Role.AUDITOR, Role.OPERATOR, Role.ADMIN]
+    def _check_key(self, key: str, rate_limit: int, window_minutes: int) -> Tuple[bool, int]:
+        """Apply the sliding window limit to one tracked key."""
+        if self._redis_window is not None:
+            return self._redis_window.hit(key, rate_limit, window_minutes * 60)
         
-        # Find highest privilege role
-        user_roles = user.roles
-        max_role = Role.VIEWER  # Default
+        # Unrelated keys hash to different shards and do not contend
+        requests, lock = self._shards[hash(key) & (self.SHARD_COUNT - 1)]
         
-        for role in role_hierarchy:
-            if role in user_roles:
-                max_role = role
+        window_seconds = window_minutes * 60
         
-        return self.security_manager.config.get_rate_limit_for_role(max_role)
+        # Hold the lock only to prune, count and record; timestamps are taken
+        # under it so each deque stays in order
+        with lock:
+            now = time.time()
+            window_start = now - window_seconds
+            
+            # Drop expired requests; timestamps are appended in order
+            user_requests = requests.get(key)
+            if user_requests is None:
+                user_requests = requests[key] = deque()
+            else:
+                requests.move_to_end(key)
+                while user_requests and user_requests[0] <= window_start:
+                    user_requests.popleft()
+            
+            allowed = len(user_requests) < rate_limit
+            if allowed:
+                # Record this request
+                user_requests.append(now)
+            else:
+                oldest_request = user_requests[0] if user_requests else now
+            
+            # Forget keys whose window is empty and, above the cap, the least
+            # recently seen keys; the front of the dict is always the oldest
+            while requests:
+                oldest_requests = next(iter(requests.values()))
+                if (len(requests) <= self.MAX_KEYS_PER_SHARD
+                        and oldest_requests and oldest_requests[-1] > window_start):
+                    break
+                requests.popitem(last=False)
+        
+        if allowed:
+            return True, 0
+        
+        # Calculate retry after time from the snapshot, outside the lock
+        retry_after = int((oldest_request + window_seconds) - now)
+        return False, max(retry_after, 1)
+    
+    def _get_user_rate_limit(self, user: User) -> int:
+        """Get rate limit for user based on their highest privilege role."""
+        return self.security_manager.config.get_rate_limit_for_role(user.max_role)
 
 
 class EndpointPermissionMapper:
@@ -130,11 +249,20 @@ class EndpointPermissionMapper:
     HTTP methods, path patterns, and dynamic permission resolution.
     """
     
+    # Endpoints served without authentication
+    PUBLIC_ENDPOINTS = frozenset({
+        "POST /api/v1/auth/login",
+        "POST /api/v1/auth/logout",
+        "POST /api/v1/auth/refresh",
+        "GET /api/v1/auth/jwks",
+    })
+    
     def __init__(self):
         """Initialize endpoint permission mapper."""
         self.mappings = self._build_default_mappings()
+        self._compile_patterns()
     
-    def get_required_permissions(self, method: str, path: str) -> List[Permission]:
+    def get_required_permissions(self, method: str, path: str) -> Tuple[Permission, ...]:
         """
         Get required permissions for an API endpoint.
         
@@ -143,25 +271,44 @@ class EndpointPermissionMapper:
             path: API endpoint path.
             
         Returns:
-            List of required permissions.
+            Tuple of required permissions.
         """
-        # Normalize method
-        method = method.upper()
-        
+        return self._resolve_cached(method.upper(), _NUMERIC_SEGMENT_RE.sub('/*', path))
+    
+    def _resolve_permissions(self, method: str, path: str) -> Tuple[Permission, ...]:
+        """Resolve permissions for a normalized method and path."""
         # Try exact match first
         key = f"{method} {path}"
         if key in self.mappings:
             return self.mappings[key]
         
-        # Try pattern matching
-        for pattern, permissions in self.mappings.items():
-            if self._match_pattern(pattern, f"{method} {path}"):
-                return permissions
+        # Single-wildcard patterns: compare the fixed ends with C-level
+        # startswith/endswith; patterns are kept in mapping order
+        best = None
+        for order, prefix, suffix, pattern in self._single_wildcard:
+            end = len(key) - len(suffix)
+            if (end >= len(prefix)
+                    and key.startswith(prefix)
+                    and key.endswith(suffix)
+                    and '/' not in key[len(prefix):end]):
+                best = (order, pattern)
+                break
+        
+        # Remaining patterns: the group that matched names the pattern
+        if self._wildcard_re is not None:
+            match = self._wildcard_re.fullmatch(key)
+            if match:
+                order, pattern = self._wildcard_patterns[match.lastgroup]
+                if best is None or order < best[0]:
+                    best = (order, pattern)
+        
+        if best is not None:
+            return self.mappings[best[1]]
         
         # Default permissions for unmatched endpoints
         return self._get_default_permissions(method, path)
     
-    def add_mapping(self, method: str, path: str, permissions: List[Permission]) -> None:
+    def add_mapping(self, method: str, path: str, permissions: Sequence[Permission]) -> None:
         """
         Add endpoint permission mapping.
         
@@ -171,91 +318,105 @@ class EndpointPermissionMapper:
             permissions: Required permissions.
         """
         key = f"{method.upper()} {path}"
-        self.mappings[key] = permissions
+        self.mappings[key] = tuple(permissions)
+        self._compile_patterns()
+    
+    def _compile_patterns(self) -> None:
+        """
+        Prepare the wildcard mappings for matching.
+        
+        Patterns with a single '*' (nearly all of them) are split into their
+        fixed prefix and suffix. The rest are compiled into one anchored
+        regex in which each pattern is a named alternative, tried in mapping
+        order. Both keep the pattern's position so the first mapping wins.
+        """
+        self._single_wildcard: List[Tuple[int, str, str, str]] = []
+        self._wildcard_patterns: Dict[str, Tuple[int, str]] = {}
+        alternatives = []
+        for order, pattern in enumerate(self.mappings):
+            wildcards = pattern.count('*')
+            if not wildcards:
+                continue
+            if wildcards == 1:
+                prefix, suffix = pattern.split('*')
+                self._single_wildcard.append((order, prefix, suffix, pattern))
+                continue
+            group = f"p{len(self._wildcard_patterns)}"
+            self._wildcard_patterns[group] = (order, pattern)
+            # '*' matches exactly one path segment
+            regex = re.escape(pattern).replace(r'\*', '[^/]*')
+            alternatives.append(f"(?P<{group}>{regex})")
+        
+        self._wildcard_re = re.compile('|'.join(alternatives)) if alternatives else None
+        
+        # A fresh memo per mapping table, so add_mapping never serves stale results
+        self._resolve_cached = lru_cache(maxsize=4096)(self._resolve_permissions)
     
-    def _build_default_mappings(self) -> Dict[str, List[Permission]]:
+    def _build_default_mappings(self) -> Dict[str, Tuple[Permission, ...]]:
         """Build default endpoint permission mappings."""
         return {
             # Authentication endpoints (no permissions required)
-            "POST /api/v1/auth/login": [],
-            "POST /api/v1/auth/logout": [],
-            "POST /api/v1/auth/refresh": [],
-            "GET /api/v1/auth/jwks": [],
+            "POST /api/v1/auth/login": (),
+            "POST /api/v1/auth/logout": (),
+            "POST /api/v1/auth/refresh": (),
+            "GET /api/v1/auth/jwks": (),
             
             # User management endpoints
-            "GET /api/v1/users": [Permission.USER_MANAGE],
-            "POST /api/v1/users": [Permission.USER_MANAGE],
-            "GET /api/v1/users/*": [Permission.USER_MANAGE],
-            "PUT /api/v1/users/*": [Permission.USER_MANAGE],
-            "DELETE /api/v1/users/*": [Permission.USER_MANAGE],
-            "PUT /api/v1/users/*/roles": [Permission.ROLE_MANAGE],
+            "GET /api/v1/users": (Permission.USER_MANAGE,),
+            "POST /api/v1/users": (Permission.USER_MANAGE,),
+            "GET /api/v1/users/*": (Permission.USER_MANAGE,),
+            "PUT /api/v1/users/*": (Permission.USER_MANAGE,),
+            "DELETE /api/v1/users/*": (Permission.USER_MANAGE,),
+            "PUT /api/v1/users/*/roles": (Permission.ROLE_MANAGE,),
             
             # Directory operations
-            "GET /api/v1/directories": [Permission.DIRECTORY_READ],
-            "POST /api/v1/directories": [Permission.DIRECTORY_CREATE],
-            "PUT /api/v1/directories/*": [Permission.DIRECTORY_UPDATE],
-            "DELETE /api/v1/directories/*": [Permission.DIRECTORY_DELETE],
-            "POST /api/v1/directories/*/generate": [Permission.DIRECTORY_GENERATE],
+            "GET /api/v1/directories": (Permission.DIRECTORY_READ,),
+            "POST /api/v1/directories": (Permission.DIRECTORY_CREATE,),
+            "PUT /api/v1/directories/*": (Permission.DIRECTORY_UPDATE,),
+            "DELETE /api/v1/directories/*": (Permission.DIRECTORY_DELETE,),
+            "POST /api/v1/directories/*/generate": (Permission.DIRECTORY_GENERATE,),
             
             # Workflow management
-            "GET /api/v1/workflows": [Permission.WORKFLOW_READ],
-            "POST /api/v1/workflows": [Permission.WORKFLOW_CREATE],
-            "PUT /api/v1/workflows/*": [Permission.WORKFLOW_UPDATE],
-            "DELETE /api/v1/workflows/*": [Permission.WORKFLOW_DELETE],
-            "POST /api/v1/workflows/*/execute": [Permission.WORKFLOW_EXECUTE],
+            "GET /api/v1/workflows": (Permission.WORKFLOW_READ,),
+            "POST /api/v1/workflows": (Permission.WORKFLOW_CREATE,),
+            "PUT /api/v1/workflows/*": (Permission.WORKFLOW_UPDATE,),
+            "DELETE /api/v1/workflows/*": (Permission.WORKFLOW_DELETE,),
+            "POST /api/v1/workflows/*/execute": (Permission.WORKFLOW_EXECUTE,),
             
             # AI features
-            "POST /api/v1/ai/generate": [Permission.AI_GENERATE_CONTENT],
-            "POST /api/v1/ai/analyze": [Permission.AI_ANALYZE_DATA],
-            "POST /api/v1/ai/optimize": [Permission.AI_OPTIMIZE_WORKFLOW],
+            "POST /api/v1/ai/generate": (Permission.AI_GENERATE_CONTENT,),
+            "POST /api/v1/ai/analyze": (Permission.AI_ANALYZE_DATA,),
+            "POST /api/v1/ai/optimize": (Permission.AI_OPTIMIZE_WORKFLOW,),
             
             # File operations
-            "POST /api/v1/files/upload": [Permission.FILE_UPLOAD],
-            "GET /api/v1/files/*": [Permission.FILE_DOWNLOAD],
-            "DELETE /api/v1/files/*": [Permission.FILE_DELETE],
+            "POST /api/v1/files/upload": (Permission.FILE_UPLOAD,),
+            "GET /api/v1/files/*": (Permission.FILE_DOWNLOAD,),
+            "DELETE /api/v1/files/*": (Permission.FILE_DELETE,),
             
             # Template management
-            "GET /api/v1/templates": [Permission.TEMPLATE_READ],
-            "POST /api/v1/templates": [Permission.TEMPLATE_CREATE],
-            "PUT /api/v1/templates/*": [Permission.TEMPLATE_UPDATE],
-            "DELETE /api/v1/templates/*": [Permission.TEMPLATE_DELETE],
+            "GET /api/v1/templates": (Permission.TEMPLATE_READ,),
+            "POST /api/v1/templates": (Permission.TEMPLATE_CREATE,),
+            "PUT /api/v1/templates/*": (Permission.TEMPLATE_UPDATE,),
+            "DELETE /api/v1/templates/*": (Permission.TEMPLATE_DELETE,),
             
             # System administration
-            "GET /api/v1/system/config": [Permission.SYSTEM_CONFIG],
-            "PUT /api/v1/system/config": [Permission.SYSTEM_CONFIG],
-            "GET /api/v1/system/audit": [Permission.AUDIT_READ],
-            "POST /api/v1/system/security": [Permission.SECURITY_MANAGE],
+            "GET /api/v1/system/config": (Permission.SYSTEM_CONFIG,),
+            "PUT /api/v1/system/config": (Permission.SYSTEM_CONFIG,),
+            "GET /api/v1/system/audit": (Permission.AUDIT_READ,),
+            "POST /api/v1/system/security": (Permission.SECURITY_MANAGE,),
         }
     
-    def _match_pattern(self, pattern: str, endpoint: str) -> bool:
-        """Match endpoint against pattern with wildcard support."""
-        # Simple wildcard matching (* matches any path segment)
-        if '*' not in pattern:
-            return pattern == endpoint
-        
-        pattern_parts = pattern.split('/')
-        endpoint_parts = endpoint.split('/')
-        
-        if len(pattern_parts) != len(endpoint_parts):
-            return False
-        
-        for p_part, e_part in zip(pattern_parts, endpoint_parts):
-            if p_part != '*' and p_part != e_part:
-                return False
-        
-        return True
-    
-    def _get_default_permissions(self, method: str, path: str) -> List[Permission]:
+    def _get_default_permissions(self, method: str, path: str) -> Tuple[Permission, ...]:
         """Get default permissions for unmatched endpoints."""
         # Default permission based on HTTP method
-        if method in ['GET', 'HEAD', 'OPTIONS']:
-            return [Permission.DIRECTORY_READ]  # Read operations
-        elif method in ['POST', 'PUT', 'PATCH']:
-            return [Permission.DIRECTORY_UPDATE]  # Write operations
+        if method in ('GET', 'HEAD', 'OPTIONS'):
+            return _READ_PERMISSIONS  # Read operations
+        elif method in ('POST', 'PUT', 'PATCH'):
+            return _WRITE_PERMISSIONS  # Write operations
         elif method == 'DELETE':
-            return [Permission.DIRECTORY_DELETE]  # Delete operations
+            return _DELETE_PERMISSIONS  # Delete operations
         
-        return [Permission.DIRECTORY_READ]  # Conservative default
+        return _READ_PERMISSIONS  # Conservative default
 
 
 class APISecurityMiddleware:
@@ -267,29 +428,53 @@ class APISecurityMiddleware:
     and session-based authentication.
     """
     
-    def __init__(self, enable_rate_limiting: bool = True):
+    # Upper bound on client IPs with tracked failed authentication attempts
+    MAX_TRACKED_IPS = 100000
+    
+    def __init__(self, enable_rate_limiting: bool = True,
+                 redis_client: Optional[Any] = None):
         """
         Initialize API security middleware.
         
         Args:
             enable_rate_limiting: Whether to enable rate limiting.
+            redis_client: Optional Redis client to share rate limits across
+                worker processes.
         """
         self.security_manager = get_security_manager()
         self.session_manager = get_session_manager()
         self.jwt_manager = get_jwt_manager()
         self.permission_checker = get_permission_checker()
         
-        self.rate_limiter = RateLimiter() if enable_rate_limiting else None
+        # Audit events are written in batches by a background thread
+        self.audit_queue = get_audit_queue()
+        
+        self.rate_limiter = RateLimiter(redis_client) if enable_rate_limiting else None
         self.endpoint_mapper = EndpointPermissionMapper()
         
-        # Track failed authentication attempts
-        self._failed_attempts = defaultdict(list)  # ip_address -> [timestamp, ...]
+        # Opt-in cache of verified JWT claims, skips signature checks on repeats
+        config = self.security_manager.config
+        self._jwt_cache = (
+            JWTVerificationCache(config.jwt_cache_size, config.jwt_cache_ttl_seconds)
+            if config.jwt_cache_ttl_seconds > 0 else None
+        )
+        
+        # Recently validated sessions by cookie hash; negative results are not cached
+        self._session_cache = (
+            TokenCache(config.session_cache_size, config.session_cache_ttl_seconds)
+            if config.session_cache_ttl_seconds > 0 else None
+        )
+        
+        # Track failed authentication attempts, least recently failing IP first
+        self._failed_attempts: "OrderedDict[str, deque]" = OrderedDict()  # ip -> timestamps
+        self._failed_attempts_lock = threading.Lock()
         
         logger.info("APISecurityMiddleware initialized")
     
     def authenticate_request(self, authorization_header: Optional[str], 
                            session_cookie: Optional[str],
-                           ip_address: str, user_agent: str = "") -> Optional[User]:
+                           ip_address: str, user_agent: str = "",
+                           trace_id: Optional[str] = None) -> Optional[User]:
         """
         Authenticate API request using JWT token or session.
         
@@ -298,12 +483,13 @@ class APISecurityMiddleware:
             session_cookie: Session cookie value.
             ip_address: Client IP address.
             user_agent: Client user agent.
+            trace_id: Trace ID of the surrounding request; generated if omitted.
             
         Returns:
             Authenticated user or None if authentication fails.
         """
-        import secrets
-        trace_id = secrets.token_hex(8)
+        if trace_id is None:
+            trace_id = _new_trace_id()
         
         # Try JWT authentication first
         if authorization_header:
@@ -323,7 +509,8 @@ class APISecurityMiddleware:
     
     def authorize_request(self, user: User, method: str, path: str,
                          resource_id: Optional[str] = None,
-                         context: Optional[Dict[str, Any]] = None) -> bool:
+                         context: Optional[Dict[str, Any]] = None,
+                         required_permissions: Optional[Sequence[Permission]] = None) -> bool:
         """
         Authorize API request based on permissions.
         
@@ -333,32 +520,32 @@ class APISecurityMiddleware:
             path: API endpoint path.
             resource_id: Optional resource identifier.
             context: Optional authorization context.
+            required_permissions: Permissions already resolved for the
+                endpoint; looked up from ``method`` and ``path`` if omitted.
             
         Returns:
             True if authorized, False otherwise.
         """
-        required_permissions = self.endpoint_mapper.get_required_permissions(method, path)
+        if required_permissions is None:
+            required_permissions = self.endpoint_mapper.get_required_permissions(method, path)
         
         # No permissions required (e.g., public endpoints)
         if not required_permissions:
             return True
         
-        # Check each required permission
-        for permission in required_permissions:
-            if not self.permission_checker.check_permission(
-                user, permission, resource_id, context
-            ):
-                return False
-        
-        return True
+        return self.permission_checker.check_permissions(
+            user, required_permissions, resource_id, context
+        )
     
-    def check_rate_limit(self, user: User, endpoint: str) -> None:
+    def check_rate_limit(self, user: User, endpoint: str,
+                         trace_id: Optional[str] = None) -> None:
         """
         Check rate limit for user request.
         
         Args:
             user: User making the request.
             endpoint: API endpoint being accessed.
+            trace_id: Trace ID of the surrounding request; generated if omitted.
             
         Raises:
             RateLimitExceeded: If rate limit is exceeded.
@@ -369,8 +556,8 @@ class APISecurityMiddleware:
         is_allowed, retry_after = self.rate_limiter.check_rate_limit(user, endpoint)
         
         if not is_allowed:
-            import secrets
-            trace_id = secrets.token_hex(8)
+            if trace_id is None:
+                trace_id = _new_trace_id()
             
             # Log rate limit violation
             event = AuthEvent(
@@ -384,7 +571,46 @@ class APISecurityMiddleware:
                 trace_id=trace_id,
                 metadata={"rate_limit_exceeded": True, "retry_after": retry_after}
             )
-            self.security_manager._log_audit_event(event)
+            self.audit_queue.put(event)
+            
+            raise RateLimitExceeded(
+                f"Rate limit exceeded. Try again in {retry_after} seconds.",
+                retry_after, trace_id
+            )
+    
+    def check_ip_rate_limit(self, ip_address: str, endpoint: str,
+                            trace_id: Optional[str] = None) -> None:
+        """
+        Check rate limit for an unauthenticated request.
+        
+        Args:
+            ip_address: Client IP address.
+            endpoint: API endpoint being accessed.
+            trace_id: Trace ID of the surrounding request; generated if omitted.
+            
+        Raises:
+            RateLimitExceeded: If rate limit is exceeded.
+        """
+        if not self.rate_limiter or not self.security_manager.config.enable_rate_limiting:
+            return
+        
+        is_allowed, retry_after = self.rate_limiter.check_ip_rate_limit(ip_address)
+        
+        if not is_allowed:
+            if trace_id is None:
+                trace_id = _new_trace_id()
+            
+            # Log rate limit violation
+            event = AuthEvent(
+                event_type=AuthEventType.PERMISSION_DENIED,
+                ip_address=ip_address,
+                resource=endpoint,
+                success=False,
+                error_message="Rate limit exceeded",
+                trace_id=trace_id,
+                metadata={"rate_limit_exceeded": True, "retry_after": retry_after}
+            )
+            self.audit_queue.put(event)
             
             raise RateLimitExceeded(
                 f"Rate limit exceeded. Try again in {retry_after} seconds.",
@@ -394,10 +620,13 @@ class APISecurityMiddleware:
     def process_request(self, method: str, path: str, headers: Dict[str, str],
                        ip_address: str, user_agent: str = "",
                        resource_id: Optional[str] = None,
-                       context: Optional[Dict[str, Any]] = None) -> User:
+                       context: Optional[Dict[str, Any]] = None) -> Optional[User]:
         """
         Process API request with full security validation.
         
+        Public endpoints skip authentication and are rate limited by client
+        IP instead.
+        
         Args:
             method: HTTP method.
             path: API endpoint path.
@@ -408,36 +637,42 @@ class APISecurityMiddleware:
             context: Optional authorization context.
             
         Returns:
-            Authenticated and authorized user.
+            Authenticated and authorized user, or None for public endpoints.
             
         Raises:
             APISecurityError: If security validation fails.
         """
-        import secrets
-        trace_id = secrets.token_hex(8)
+        trace_id = _new_trace_id()
         
         try:
+            # Public endpoints need no user, so skip token verification
+            if f"{method.upper()} {path}" in self.endpoint_mapper.PUBLIC_ENDPOINTS:
+                self.check_ip_rate_limit(ip_address, path, trace_id)
+                return None
+            
             # Extract authentication data
             authorization_header = headers.get('Authorization')
-            session_cookie = headers.get('Cookie', '').split('session=')[1].split(';')[0] if 'session=' in headers.get('Cookie', '') else None
+            cookie_match = _SESSION_COOKIE_RE.search(headers.get('Cookie', ''))
+            session_cookie = cookie_match.group(1) if cookie_match else None
             
             # Authenticate request
             user = self.authenticate_request(
-                authorization_header, session_cookie, ip_address, user_agent
+                authorization_header, session_cookie, ip_address, user_agent, trace_id
             )
             
             if not user:
                 raise AuthenticationRequired(trace_id=trace_id)
             
             # Check rate limits
-            self.check_rate_limit(user, path)
+            self.check_rate_limit(user, path, trace_id)
             
             # Authorize request
             if context:
                 context["user_ip"] = ip_address
             
-            if not self.authorize_request(user, method, path, resource_id, context):
-                required_perms = self.endpoint_mapper.get_required_permissions(method, path)
+            required_perms = self.endpoint_mapper.get_required_permissions(method, path)
+            if not self.authorize_request(user, method, path, resource_id, context,
+                                          required_perms):
                 perm_names = [p.value for p in required_perms]
                 
                 raise InsufficientPermissions(
@@ -447,18 +682,10 @@ class APISecurityMiddleware:
                 )
             
             # Log successful request
-            event = AuthEvent(
-                event_type=AuthEventType.PERMISSION_GRANTED,
-                user_id=user.id,
-                username=user.username,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                resource=f"{method} {path}",
-                success=True,
-                trace_id=trace_id,
-                metadata={"endpoint_access": True}
+            self._audit_success(
+                _endpoint_access_event, user, method, path, ip_address,
+                user_agent, trace_id, datetime.utcnow()
             )
-            self.security_manager._log_audit_event(event)
             
             return user
             
@@ -501,17 +728,25 @@ class APISecurityMiddleware:
     def _authenticate_jwt(self, authorization_header: str, ip_address: str,
                          user_agent: str, trace_id: str) -> Optional[User]:
         """Authenticate using JWT token."""
+        # Extract token from header
+        if not authorization_header.startswith('Bearer '):
+            return None
+        
+        token = authorization_header[7:]  # Remove 'Bearer ' prefix
+        
+        # Garbage never reaches the cache or signature verification
+        if not _JWT_SHAPE_RE.fullmatch(token):
+            return None
+        
         try:
-            # Extract token from header
-            if not authorization_header.startswith('Bearer '):
-                return None
-            
-            token = authorization_header[7:]  # Remove 'Bearer ' prefix
-            
-            # Validate token
-            claims = self.jwt_manager.validate_token(token, 'access')
-            if not claims:
-                return None
+            # Validate token, reusing a recent verification when cached
+            claims = self._jwt_cache.get(token) if self._jwt_cache is not None else None
+            if claims is None:
+                claims = self.jwt_manager.validate_token(token, 'access')
+                if not claims:
+                    return None
+                if self._jwt_cache is not None:
+                    self._jwt_cache.put(token, claims)
             
             # Get user
             user_id = claims.get('sub')
@@ -519,17 +754,10 @@ class APISecurityMiddleware:
             
             if user and user.is_active and not user.is_locked:
                 # Log successful JWT authentication
-                event = AuthEvent(
-                    event_type=AuthEventType.LOGIN_SUCCESS,
-                    user_id=user.id,
-                    username=user.username,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    success=True,
-                    trace_id=trace_id,
-                    metadata={"auth_method": "jwt", "jti": claims.get('jti')}
+                self._audit_success(
+                    _login_success_event, user, None, ip_address, user_agent,
+                    trace_id, datetime.utcnow(), "jwt", claims.get('jti')
                 )
-                self.security_manager._log_audit_event(event)
                 
                 return user
             
@@ -541,29 +769,35 @@ class APISecurityMiddleware:
     def _authenticate_session(self, session_cookie: str, ip_address: str,
                              user_agent: str, trace_id: str) -> Optional[User]:
         """Authenticate using session cookie."""
+        if not _SESSION_TOKEN_SHAPE_RE.fullmatch(session_cookie):
+            return None
+        
         try:
-            # Validate session
-            session = self.session_manager.validate_session(session_cookie)
-            if not session:
-                return None
+            # Validate session, reusing a recent validation when cached
+            session = None
+            if self._session_cache is not None:
+                session = self._session_cache.get(session_cookie)
+                if session is not None and not session.is_active():
+                    session = None
+            if session is None:
+                session = self.session_manager.validate_session(session_cookie)
+                if not session:
+                    return None
+                if self._session_cache is not None:
+                    self._session_cache.put(
+                        session_cookie, session,
+                        (session.expires_at - _EPOCH).total_seconds()
+                    )
             
             # Get user
             user = self.security_manager._users_cache.get(session.user_id)
             
             if user and user.is_active and not user.is_locked:
                 # Log successful session authentication
-                event = AuthEvent(
-                    event_type=AuthEventType.LOGIN_SUCCESS,
-                    user_id=user.id,
-                    username=user.username,
-                    session_id=session.id,
-                    ip_address=ip_address,
-                    user_agent=user_agent,
-                    success=True,
-                    trace_id=trace_id,
-                    metadata={"auth_method": "session"}
+                self._audit_success(
+                    _login_success_event, user, session.id, ip_address, user_agent,
+                    trace_id, datetime.utcnow(), "session"
                 )
-                self.security_manager._log_audit_event(event)
                 
                 return user
             
@@ -572,18 +806,46 @@ class APISecurityMiddleware:
         
         return None
     
+    def _audit_success(self, factory: Callable[..., AuthEvent], *args: Any) -> None:
+        """
+        Queue a sampled success event for deferred construction.
+        
+        Successful accesses are audited at ``audit_sampling_rate``; the event
+        itself is only built on the audit writer thread. Failures are always
+        logged eagerly.
+        """
+        config = self.security_manager.config
+        if not config.enable_audit_logging:
+            return
+        
+        rate = config.audit_sampling_rate
+        if rate < 1.0 and random.random() >= rate:
+            return
+        
+        self.audit_queue.put(LazyAuthEvent(factory, *args))
+    
     def _log_failed_attempt(self, ip_address: str, user_agent: str, trace_id: str) -> None:
         """Log failed authentication attempt."""
         now = time.time()
-        
-        # Clean old attempts (older than 1 hour)
         hour_ago = now - 3600
-        self._failed_attempts[ip_address] = [
-            ts for ts in self._failed_attempts[ip_address] if ts > hour_ago
-        ]
         
-        # Add current attempt
-        self._failed_attempts[ip_address].append(now)
+        with self._failed_attempts_lock:
+            # Clean old attempts (older than 1 hour) and add the current one
+            attempts = self._failed_attempts.pop(ip_address, None) or deque()
+            while attempts and attempts[0] <= hour_ago:
+                attempts.popleft()
+            attempts.append(now)
+            self._failed_attempts[ip_address] = attempts
+            failed_count = len(attempts)
+            
+            # Forget IPs idle for an hour and cap the number tracked; the
+            # front of the dict is always the least recently failing IP
+            while self._failed_attempts:
+                oldest_attempts = next(iter(self._failed_attempts.values()))
+                if (len(self._failed_attempts) <= self.MAX_TRACKED_IPS
+                        and oldest_attempts[-1] > hour_ago):
+                    break
+                self._failed_attempts.popitem(last=False)
         
         # Log audit event
         event = AuthEvent(
@@ -593,9 +855,9 @@ class APISecurityMiddleware:
             success=False,
             error_message="Authentication failed",
             trace_id=trace_id,
-            metadata={"failed_attempts": len(self._failed_attempts[ip_address])}
+            metadata={"failed_attempts": failed_count}
         )
-        self.security_manager._log_audit_event(event)
+        self.audit_queue.put(event)
 
 
 # Decorator for protecting API endpoints
@@ -612,8 +874,8 @@ def require_authentication(permission: Optional[Permission] = None):
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Get middleware from arguments or create new instance
-            middleware = kwargs.get('security_middleware') or APISecurityMiddleware()
+            # Get middleware from arguments or use the shared instance
+            middleware = kwargs.get('security_middleware') or get_api_security_middleware()
             
             # Extract request info from kwargs
             method = kwargs.get('method', 'GET')
@@ -641,11 +903,14 @@ def require_authentication(permission: Optional[Permission] = None):
 
 # Global API security middleware instance
 _api_security_middleware: Optional[APISecurityMiddleware] = None
+_api_security_middleware_lock = threading.Lock()
 
 
 def get_api_security_middleware() -> APISecurityMiddleware:
     """Get the global API security middleware instance."""
     global _api_security_middleware
     if _api_security_middleware is None:
-        _api_security_middleware = APISecurityMiddleware()
+        with _api_security_middleware_lock:
+            if _api_security_middleware is None:
+                _api_security_middleware = APISecurityMiddleware()
     return _api_security_middleware
\ No newline at end of file
@@ -0,0 +1,35 @@
+"""
+模板文件缓存。
+
+按 (路径, 修改时间, 大小) 缓存模板文件的原始字节，同一模板在多次生成之间
+只从磁盘读取一次；模板被修改后键随之变化，旧条目自然失效。
+
+缓存的是字节而非解析后的 Workbook：openpyxl 的 Workbook 经 copy/deepcopy
+后会丢失列样式和部分样式表，每个输出文件仍需从字节重新解析。
+"""
+
+import functools
+import os
+
+
+@functools.lru_cache(maxsize=8)
+def _load_template(path, mtime, size):
+    """读取模板字节，结果由 lru_cache 按 (path, mtime, size) 缓存。"""
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def load_template_bytes(template_path):
+    """
+    获取模板文件的字节内容，命中缓存时不访问磁盘读取内容。
+
+    文件不存在时抛出 FileNotFoundError。
+    """
+    path = os.path.abspath(template_path)
+    stat = os.stat(path)
+    return _load_template(path, stat.st_mtime_ns, stat.st_size)
+
+
+def clear_template_cache():
+    """清空模板缓存。"""
+    _load_template.cache_clear()
@@ -3,23 +3,149 @@ Excel文件格式转换模块
 提供安全的Excel文件格式转换功能
 """
 
-import win32com.client as win32
+import atexit
+import gc
+import multiprocessing
+import multiprocessing.util
 import os
 import logging
-from typing import Optional
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
 
+import openpyxl
+
+try:
+    import pythoncom
+    import win32com.client as win32
+except ImportError:
+    pythoncom = None
+    win32 = None
+
+try:
+    import xlrd
+except ImportError:
+    xlrd = None
+
 # 导入文件验证器
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from utils.file_validator import FileValidator, validate_excel_file
 
+# XlCalculation.xlCalculationManual
+_XL_CALCULATION_MANUAL = -4135
+
+# Excel类型库（Microsoft Excel Object Library）的GUID与版本
+_EXCEL_TYPELIB = ('{00020813-0000-0000-C000-000000000046}', 0, 1, 9)
+_excel_typelib_ready = False
+_excel_typelib_lock = threading.Lock()
+
+
+def _ensure_excel_typelib() -> None:
+    """
+    确保Excel类型库的makepy包装已生成，每个进程只执行一次
+    
+    之后用 Dispatch 创建Excel时直接使用已生成的包装类，
+    不必像 EnsureDispatch 那样每次都校验gencache并获取文件锁。
+    """
+    global _excel_typelib_ready
+    if _excel_typelib_ready:
+        return
+    with _excel_typelib_lock:
+        if not _excel_typelib_ready:
+            try:
+                win32.gencache.EnsureModule(*_EXCEL_TYPELIB)
+            except Exception as e:
+                # 没有类型库时 Dispatch 仍可使用动态调度
+                logging.getLogger(__name__).warning(f"生成Excel类型库包装失败: {e}")
+            _excel_typelib_ready = True
+
 
 class ExcelConverter:
-    """安全的Excel格式转换器"""
+    """
+    安全的Excel格式转换器
+    
+    Excel.Application 在首次转换时创建并在多次转换之间复用，
+    避免每个文件都承担一次Excel进程的启动开销。可作为上下文管理器使用，
+    退出时自动调用 close() 退出Excel。
     
-    def __init__(self):
+    backend="native" 时 xls2xlsx 使用 xlrd 读取、openpyxl 流式写入，
+    不需要Excel进程，也可在未安装Office的环境运行；只保留单元格值，
+    不保留格式。xlsx2xls 没有可靠的纯Python实现，始终使用COM。
+    
+    只需读取或重新保存.xlsx时，可用 open_xlsx_readonly / save_as_xlsx
+    直接处理OOXML，无需启动Excel；.xls转.xlsx仍需COM或xlrd。
+    """
+    
+    BACKENDS = ("com", "native")
+    # 转换方向 -> 输入文件扩展名
+    DIRECTIONS = {"xlsx2xls": ".xlsx", "xls2xlsx": ".xls"}
+    # 批量转换的最大进程数，每个进程各自持有一个Excel实例
+    MAX_FOLDER_WORKERS = 4
+    
+    def __init__(self, backend: str = "com"):
+        """
+        Args:
+            backend: 转换后端，"com" 使用Excel，"native" 使用xlrd+openpyxl
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"不支持的转换后端: {backend}")
         self.logger = logging.getLogger(__name__)
+        self.backend = backend
+        self.excel_app = None
+        # 为创建Excel而初始化COM的线程，close() 时在该线程上反初始化
+        self._com_thread: Optional[int] = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _get_excel_app(self):
+        """
+        获取复用的Excel应用程序实例，首次调用时创建
+        
+        Returns:
+            Excel.Application COM对象
+        """
+        if self.excel_app is None:
+            if win32 is None:
+                raise RuntimeError("pywin32不可用，无法通过Excel进行转换")
+            if self._com_thread is None:
+                # 确保当前线程处于STA；已初始化时只增加引用计数
+                pythoncom.CoInitialize()
+                self._com_thread = threading.get_ident()
+            _ensure_excel_typelib()
+            excel_app = win32.Dispatch("Excel.Application")
+            excel_app.Visible = False  # 隐藏Excel窗口
+            excel_app.DisplayAlerts = False  # 禁用警告对话框
+            excel_app.ScreenUpdating = False  # 禁用屏幕刷新
+            excel_app.EnableEvents = False  # 禁用工作簿事件
+            excel_app.Interactive = False  # 禁止用户输入打断
+            excel_app.AskToUpdateLinks = False  # 不提示更新外部链接
+            self._disable_recalculation(excel_app)
+            self.excel_app = excel_app
+            self.logger.debug("Excel应用程序已启动")
+        return self.excel_app
+    
+    def _disable_recalculation(self, excel_app):
+        """
+        将Excel切换为手动计算，打开和另存时不再重算公式
+        
+        Calculation 只能在有打开的工作簿时设置，因此借助一个临时空白
+        工作簿设置；该设置属于应用程序级别，对之后打开的工作簿都生效。
+        Excel实例为本转换器独占，关闭时随进程退出，无需恢复。
+        """
+        scratch = None
+        try:
+            scratch = excel_app.Workbooks.Add()
+            excel_app.Calculation = _XL_CALCULATION_MANUAL
+            excel_app.CalculateBeforeSave = False
+        except Exception as e:
+            self.logger.warning(f"设置手动计算模式失败: {e}")
+        finally:
+            self._close_workbook(scratch)
     
     def xlsx2xls(self, file_path: str) -> Optional[str]:
         """
@@ -35,86 +161,252 @@ class ExcelConverter:
             ValueError: 文件路径不安全或不存在
             RuntimeError: Excel操作失败
         """
-        # 验证输入文件路径安全性
-        if not validate_excel_file(file_path):
-            raise ValueError(f"不安全或无效的文件路径: {file_path}")
+        # 检查文件扩展名
+        if not file_path.lower().endswith('.xlsx'):
+            raise ValueError("输入文件必须是.xlsx格式")
+        
+        # 保存为xls格式 (FileFormat=56 表示Excel 97-2003格式)
+        return self._convert(file_path, '.xls', 56, "xlsx为xls")
+    
+    def xls2xlsx(self, file_path: str) -> Optional[str]:
+        """
+        安全地将xls文件转换为xlsx格式
         
+        Args:
+            file_path: 输入的xls文件路径
+            
+        Returns:
+            str: 转换后的xlsx文件路径，转换失败返回None
+            
+        Raises:
+            ValueError: 文件路径不安全或不存在
+            RuntimeError: Excel操作失败
+        """
         # 检查文件扩展名
+        if not file_path.lower().endswith('.xls'):
+            raise ValueError("输入文件必须是.xls格式")
+        
+        if self.backend == "native":
+            return self._xls2xlsx_native(file_path)
+        
+        # 保存为xlsx格式 (FileFormat=51 表示Excel 2007-2019格式)
+        return self._convert(file_path, '.xlsx', 51, "xls为xlsx")
+    
+    def open_xlsx_readonly(self, file_path: str):
+        """
+        不经过Excel，以只读流式方式打开xlsx文件
+        
+        read_only 模式按需解析工作表XML，内存占用与工作表大小无关；
+        data_only 读取公式的缓存值而非公式本身。
+        
+        Args:
+            file_path: xlsx文件路径
+            
+        Returns:
+            openpyxl只读工作簿，使用完毕后应调用其 close()
+            
+        Raises:
+            ValueError: 文件路径不安全、不存在或不是.xlsx格式
+        """
+        if not validate_excel_file(file_path):
+            raise ValueError(f"不安全或无效的文件路径: {file_path}")
         if not file_path.lower().endswith('.xlsx'):
             raise ValueError("输入文件必须是.xlsx格式")
         
-        excel_app = None
+        return openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    
+    def save_as_xlsx(self, workbook, output_path: str) -> str:
+        """
+        不经过Excel，将工作簿保存为xlsx文件
+        
+        只读工作簿不能直接保存，其单元格值会逐行流式写入新建的
+        write_only 工作簿；普通工作簿直接保存。
+        
+        Args:
+            workbook: openpyxl工作簿
+            output_path: 输出的xlsx文件路径
+            
+        Returns:
+            str: 输出文件路径
+            
+        Raises:
+            ValueError: 输出文件不是.xlsx格式
+            RuntimeError: 保存失败
+        """
+        if not output_path.lower().endswith('.xlsx'):
+            raise ValueError("输出文件必须是.xlsx格式")
+        
+        try:
+            if getattr(workbook, 'read_only', False):
+                output = openpyxl.Workbook(write_only=True)
+                for sheet in workbook.worksheets:
+                    target = output.create_sheet(title=sheet.title)
+                    for row in sheet.iter_rows(values_only=True):
+                        target.append(row)
+                output.save(output_path)
+            else:
+                workbook.save(output_path)
+            
+            self.logger.info(f"保存成功: {output_path}")
+            return output_path
+            
+        except Exception as e:
+            self.logger.error(f"保存xlsx时出错: {e}")
+            raise RuntimeError(f"保存xlsx失败: {e}")
+    
+    def convert_folder(self, folder: str, direction: str = "xls2xlsx",
+                       processes: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """
+        批量转换文件夹中的Excel文件
+        
+        文件列表被均分给多个进程，每个进程初始化一次COM并复用同一个
+        ExcelConverter。不使用线程：Excel COM对象属于单线程套间，
+        跨线程调用需要封送，容易出现"RPC 服务器不可用"错误。
+        
+        Args:
+            folder: 输入文件夹路径
+            direction: 转换方向，"xlsx2xls" 或 "xls2xlsx"
+            processes: 进程数，默认为 min(CPU核数, MAX_FOLDER_WORKERS)
+            
+        Returns:
+            Dict[str, Optional[str]]: 输入文件路径 -> 输出文件路径，失败为None
+            
+        Raises:
+            ValueError: 转换方向无效或文件夹不存在
+        """
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"不支持的转换方向: {direction}")
+        if not os.path.isdir(folder):
+            raise ValueError(f"文件夹不存在: {folder}")
+        
+        input_ext = self.DIRECTIONS[direction]
+        with os.scandir(folder) as entries:
+            paths = sorted(
+                entry.path for entry in entries
+                if entry.is_file()
+                and entry.name.lower().endswith(input_ext)
+                and not entry.name.startswith('~$')  # Excel锁文件
+            )
+        
+        if processes is None:
+            processes = min(os.cpu_count() or 1, self.MAX_FOLDER_WORKERS)
+        processes = max(1, min(processes, len(paths)))
+        
+        self.logger.info(f"批量转换 {len(paths)} 个文件，进程数: {processes}")
+        
+        if processes == 1:
+            return dict(_convert_paths(self, direction, paths))
+        
+        chunks = [paths[i::processes] for i in range(processes)]
+        pool = multiprocessing.Pool(processes, initializer=_init_folder_worker,
+                                    initargs=(self.backend,))
+        try:
+            chunk_results = pool.starmap(
+                _convert_folder_chunk, [(direction, chunk) for chunk in chunks]
+            )
+            pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            # close() 后 join 让工作进程正常退出并关闭各自的Excel
+            pool.join()
+        
+        results = {}
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
+        return {path: results[path] for path in paths}
+    
+    def _convert(self, file_path: str, output_ext: str, file_format: int,
+                 description: str) -> str:
+        """
+        使用复用的Excel实例打开工作簿并另存为目标格式
+        
+        Args:
+            file_path: 输入文件路径
+            output_ext: 输出文件扩展名
+            file_format: Excel SaveAs 的 FileFormat 值
+            description: 日志中使用的转换方向描述
+            
+        Returns:
+            str: 转换后的文件路径
+            
+        Raises:
+            ValueError: 文件路径不安全或不存在
+            RuntimeError: Excel操作失败
+        """
+        # 验证输入文件路径安全性
+        if not validate_excel_file(file_path):
+            raise ValueError(f"不安全或无效的文件路径: {file_path}")
+        
         workbook = None
         
         try:
             # 生成安全的输出路径
-            output_path = FileValidator.generate_safe_output_path(file_path, '.xls')
+            output_path = FileValidator.generate_safe_output_path(file_path, output_ext)
             
             self.logger.info(f"开始转换 {file_path} -> {output_path}")
             
-            # 创建Excel应用程序实例
-            excel_app = win32.gencache.EnsureDispatch("Excel.Application")
-            excel_app.Visible = False  # 隐藏Excel窗口
-            excel_app.DisplayAlerts = False  # 禁用警告对话框
-            
-            # 打开工作簿
-            workbook = excel_app.Workbooks.Open(file_path)
-            
-            # 保存为xls格式 (FileFormat=56 表示Excel 97-2003格式)
-            workbook.SaveAs(output_path, FileFormat=56)
+            # 只读打开工作簿，不更新链接、不弹出提示、不加入最近使用列表
+            workbook = self._get_excel_app().Workbooks.Open(
+                file_path,
+                UpdateLinks=0,
+                ReadOnly=True,
+                IgnoreReadOnlyRecommended=True,
+                Notify=False,
+                AddToMru=False,
+            )
+            workbook.SaveAs(output_path, FileFormat=file_format)
             
             self.logger.info(f"转换成功: {output_path}")
             return output_path
             
         except Exception as e:
-            self.logger.error(f"转换xlsx为xls时出错: {e}")
+            self.logger.error(f"转换{description}时出错: {e}")
             raise RuntimeError(f"Excel转换失败: {e}")
             
         finally:
-            # 确保资源正确释放
-            self._cleanup_excel_resources(workbook, excel_app)
+            # 只关闭工作簿，Excel应用程序留给后续转换复用
+            self._close_workbook(workbook)
     
-    def xls2xlsx(self, file_path: str) -> Optional[str]:
+    def _xls2xlsx_native(self, file_path: str) -> str:
         """
-        安全地将xls文件转换为xlsx格式
+        不经过Excel，将xls文件的单元格值流式写入新的xlsx文件
         
         Args:
             file_path: 输入的xls文件路径
             
         Returns:
-            str: 转换后的xlsx文件路径，转换失败返回None
+            str: 转换后的xlsx文件路径
             
         Raises:
             ValueError: 文件路径不安全或不存在
-            RuntimeError: Excel操作失败
+            RuntimeError: 读取或写入失败
         """
-        # 验证输入文件路径安全性
         if not validate_excel_file(file_path):
             raise ValueError(f"不安全或无效的文件路径: {file_path}")
         
-        # 检查文件扩展名
-        if not file_path.lower().endswith('.xls'):
-            raise ValueError("输入文件必须是.xls格式")
-        
-        excel_app = None
-        workbook = None
+        if xlrd is None:
+            raise RuntimeError("xlrd不可用，无法使用native后端转换xls文件")
         
         try:
-            # 生成安全的输出路径
             output_path = FileValidator.generate_safe_output_path(file_path, '.xlsx')
             
             self.logger.info(f"开始转换 {file_path} -> {output_path}")
             
-            # 创建Excel应用程序实例
-            excel_app = win32.gencache.EnsureDispatch("Excel.Application")
-            excel_app.Visible = False  # 隐藏Excel窗口
-            excel_app.DisplayAlerts = False  # 禁用警告对话框
-            
-            # 打开工作簿
-            workbook = excel_app.Workbooks.Open(file_path)
-            
-            # 保存为xlsx格式 (FileFormat=51 表示Excel 2007-2019格式)
-            workbook.SaveAs(output_path, FileFormat=51)
+            book = xlrd.open_workbook(file_path, on_demand=True)
+            try:
+                workbook = openpyxl.Workbook(write_only=True)
+                for sheet_index in range(book.nsheets):
+                    sheet = book.sheet_by_index(sheet_index)
+                    worksheet = workbook.create_sheet(title=sheet.name)
+                    for row in sheet.get_rows():
+                        worksheet.append([_xlrd_cell_value(cell, book.datemode)
+                                          for cell in row])
+                    book.unload_sheet(sheet_index)
+                workbook.save(output_path)
+            finally:
+                book.release_resources()
             
             self.logger.info(f"转换成功: {output_path}")
             return output_path
@@ -122,32 +414,37 @@ class ExcelConverter:
         except Exception as e:
             self.logger.error(f"转换xls为xlsx时出错: {e}")
             raise RuntimeError(f"Excel转换失败: {e}")
-            
-        finally:
-            # 确保资源正确释放
-            self._cleanup_excel_resources(workbook, excel_app)
     
-    def _cleanup_excel_resources(self, workbook, excel_app):
+    def _close_workbook(self, workbook):
         """
-        清理Excel COM资源
+        关闭工作簿
         
         Args:
             workbook: Excel工作簿对象
-            excel_app: Excel应用程序对象
         """
         try:
-            # 关闭工作簿
             if workbook is not None:
                 workbook.Close(SaveChanges=False)
                 self.logger.debug("工作簿已关闭")
                 
         except Exception as e:
             self.logger.warning(f"关闭工作簿时出错: {e}")
+    
+    def close(self):
+        """退出复用的Excel应用程序并释放COM引用"""
+        self._cleanup_excel_resources()
+    
+    def _cleanup_excel_resources(self):
+        """
+        清理Excel COM资源
         
+        Quit 之后立即丢弃最后一个COM引用并回收，避免Python延迟释放
+        导致Excel进程残留；若本实例初始化过COM，则在同一线程上反初始化。
+        """
         try:
             # 退出Excel应用程序
-            if excel_app is not None:
-                excel_app.Quit()
+            if self.excel_app is not None:
+                self.excel_app.Quit()
                 self.logger.debug("Excel应用程序已退出")
                 
         except Exception as e:
@@ -156,47 +453,145 @@ class ExcelConverter:
         finally:
             # 释放COM对象引用
             try:
-                if workbook is not None:
-                    del workbook
-                if excel_app is not None:
-                    del excel_app
+                self.excel_app = None
+                gc.collect()
+                if pythoncom is not None:
+                    pythoncom.CoFreeUnusedLibraries()
+                    if self._com_thread == threading.get_ident():
+                        pythoncom.CoUninitialize()
+                        self._com_thread = None
             except Exception as e:
                 self.logger.warning(f"释放COM对象时出错: {e}")
 
 
+def _xlrd_cell_value(cell, datemode: int) -> Any:
+    """
+    将xlrd单元格转换为openpyxl可写入的值
+    
+    Args:
+        cell: xlrd单元格
+        datemode: 工作簿的日期模式（1900/1904）
+        
+    Returns:
+        单元格值；空单元格和错误值返回None
+    """
+    ctype = cell.ctype
+    if ctype == xlrd.XL_CELL_DATE:
+        try:
+            return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+        except xlrd.xldate.XLDateError:
+            return cell.value
+    if ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    return cell.value
+
+
+def _convert_paths(converter: ExcelConverter, direction: str,
+                   paths: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """
+    用同一个转换器依次转换文件，单个文件失败不影响其余文件
+    
+    Args:
+        converter: 复用的转换器
+        direction: 转换方向
+        paths: 输入文件路径列表
+        
+    Returns:
+        List[Tuple[str, Optional[str]]]: (输入路径, 输出路径或None)
+    """
+    convert = getattr(converter, direction)
+    results = []
+    for path in paths:
+        try:
+            results.append((path, convert(path)))
+        except (ValueError, RuntimeError) as e:
+            converter.logger.error(f"批量转换跳过 {path}: {e}")
+            results.append((path, None))
+    return results
+
+
+# 批量转换工作进程内复用的转换器
+_worker_converter: Optional[ExcelConverter] = None
+
+
+def _init_folder_worker(backend: str) -> None:
+    """批量转换工作进程初始化：初始化COM并创建进程内复用的转换器"""
+    global _worker_converter
+    if pythoncom is not None:
+        pythoncom.CoInitialize()
+    _worker_converter = ExcelConverter(backend)
+    # 工作进程正常退出时退出Excel
+    multiprocessing.util.Finalize(_worker_converter, _worker_converter.close,
+                                  exitpriority=10)
+
+
+def _convert_folder_chunk(direction: str,
+                          paths: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """在工作进程中转换一组文件"""
+    return _convert_paths(_worker_converter, direction, paths)
+
+
+# 便捷函数共用的转换器，复用同一个Excel进程
+_default_converter: Optional[ExcelConverter] = None
+_default_converter_thread: Optional[int] = None
+_default_converter_lock = threading.Lock()
+
+
+def _convert_with_default(method: str, file_path: str) -> Optional[str]:
+    """
+    使用共享转换器执行转换
+    
+    COM对象绑定在创建它的线程上，因此只有创建共享转换器的线程复用它，
+    其他线程使用临时转换器。
+    """
+    global _default_converter, _default_converter_thread
+    with _default_converter_lock:
+        if _default_converter is None:
+            _default_converter = ExcelConverter()
+            _default_converter_thread = threading.get_ident()
+            atexit.register(_default_converter.close)
+        if _default_converter_thread == threading.get_ident():
+            return getattr(_default_converter, method)(file_path)
+    
+    with ExcelConverter() as converter:
+        return getattr(converter, method)(file_path)
+
+
 # 便捷函数，保持向后兼容性
 def xlsx2xls(file_path: str) -> Optional[str]:
     """将xlsx文件转换为xls格式的便捷函数"""
-    converter = ExcelConverter()
-    return converter.xlsx2xls(file_path)
+    return _convert_with_default('xlsx2xls', file_path)
 
 
 def xls2xlsx(file_path: str) -> Optional[str]:
     """将xls文件转换为xlsx格式的便捷函数"""
-    converter = ExcelConverter()
-    return converter.xls2xlsx(file_path)
+    return _convert_with_default('xls2xlsx', file_path)
 
 
 if __name__ == "__main__":
+    import argparse
+    
     # 配置日志
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
-    # 示例用法（仅用于测试）
-    # 注意：实际使用时应该通过适当的输入验证获取文件路径
-    test_file_path = r"path/to/your/excel/file.xlsx"
+    parser = argparse.ArgumentParser(description="批量转换文件夹中的Excel文件")
+    parser.add_argument("folder", help="输入文件夹路径")
+    parser.add_argument("--direction", choices=sorted(ExcelConverter.DIRECTIONS),
+                        default="xls2xlsx", help="转换方向")
+    parser.add_argument("--backend", choices=ExcelConverter.BACKENDS,
+                        default="com", help="转换后端")
+    parser.add_argument("--processes", type=int, default=None, help="进程数")
+    args = parser.parse_args()
     
-    if os.path.exists(test_file_path):
-        try:
-            converter = ExcelConverter()
-            result = converter.xlsx2xls(test_file_path)
-            if result:
-                print(f"转换成功: {result}")
-            else:
-                print("转换失败")
-        except Exception as e:
-            print(f"转换过程中出错: {e}")
-    else:
-        print("测试文件不存在，跳过转换测试")
+    with ExcelConverter(args.backend) as converter:
+        results = converter.convert_folder(args.folder, args.direction, args.processes)
+    
+    failed = [path for path, output in results.items() if output is None]
+    print(f"转换完成: 成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+    for path in failed:
+        print(f"  失败: {path}")
@@ -5,15 +5,20 @@ gdi_height_measure.py  (2025-08-03)
 GDI-based row-height measurer that matches Excel printed layout.
 
 - Keep Excel 'column width (chars)' -> **printer pixels** conversion.
-- Use DrawText(DT_CALCRECT|DT_EDITCONTROL|DT_WORDBREAK|DT_NOPREFIX) for line count.
+- One GetTextExtentExPointW call per paragraph gives cumulative char extents;
+  lines are then wrapped in Python with DrawText(DT_WORDBREAK|DT_EDITCONTROL)
+  rules, so every probed width reuses the same extents. Where a width lands
+  within 1 px of a wrap point, DrawText itself decides the line count.
 - Per-line height from calib table (SimSun 11pt -> 13.5pt).
 - 'safe' strategy: probe width-1..4 px; if line count increases, add one line.
 - Swallow 'row_info' kwarg for compatibility with callers.
 """
 
 from __future__ import annotations
-import contextlib, math, re
-from dataclasses import dataclass
+import atexit, contextlib, ctypes, math, queue, re, threading
+from collections import OrderedDict
+from ctypes import wintypes
+from dataclasses import dataclass, field
 
 import win32con
 import win32gui
@@ -21,41 +26,151 @@ import win32print
 import win32ui
 
 
+# Half-width runs get a trailing zero-width space so a line may break after them
+_HALF_WIDTH_BLOCK = re.compile(r'([A-Za-z0-9\-·/]+)')
+_SOFT_BREAK_REPL = "\\1\u200B"
+
+# pywin32 does not wrap GetTextExtentExPointW; call gdi32 directly
+_GetTextExtentExPointW = ctypes.WinDLL("gdi32").GetTextExtentExPointW
+_GetTextExtentExPointW.argtypes = [
+    wintypes.HDC, wintypes.LPCWSTR, ctypes.c_int, ctypes.c_int,
+    ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+    ctypes.POINTER(wintypes.SIZE),
+]
+_GetTextExtentExPointW.restype = wintypes.BOOL
+
+
+def _text_extents(hdc: int, text: str) -> list[int]:
+    """Cumulative pixel extent after each character of text (one GDI call)."""
+    n_units = len(text.encode("utf-16-le")) // 2
+    if not n_units:
+        return []
+    dx = (ctypes.c_int * n_units)()
+    size = wintypes.SIZE()
+    if not _GetTextExtentExPointW(hdc, text, n_units, 0, None, dx, ctypes.byref(size)):
+        raise ctypes.WinError()
+    if n_units == len(text):
+        return list(dx)
+    # Characters outside the BMP take two UTF-16 units; keep the extent after each char
+    extents, unit = [], -1
+    for ch in text:
+        unit += 2 if ord(ch) > 0xFFFF else 1
+        extents.append(dx[unit])
+    return extents
+
+
+def _split_paragraphs(text: str) -> list[str]:
+    """Split on CRLF, CR or LF, like DrawText."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.split("\n")
+
+
+def _is_word_char(ch: str) -> bool:
+    return "!" <= ch <= "~"
+
+
+# Kinsoku: characters that may not start a line / may not end a line
+_NO_LINE_START = frozenset("!%),.:;?]}·、。〃〉》」』】〕〗〞﹚﹜！％），．：；？］｝～’”…—")
+_NO_LINE_END = frozenset("([{〈《「『【〔〖〝﹙﹛（［｛‘“")
+
+
+def _can_break(prev: str, nxt: str) -> bool:
+    """Whether a line may break between prev and nxt."""
+    if nxt in _NO_LINE_START or prev in _NO_LINE_END:
+        return False
+    return prev == " " or not (_is_word_char(prev) and _is_word_char(nxt))
+
+
+def _wrap_line_count(text: str, extents: list[int], width_px: int) -> int:
+    """
+    Greedy DT_WORDBREAK-style wrap of one paragraph; returns its line count.
+    Lines may break anywhere except inside a run of printable ASCII (a
+    zero-width space ends the run) or where kinsoku forbids it; a run with
+    no break opportunity breaks per character when wider than a whole line.
+    Trailing spaces hang past the edge, as in DrawText.
+    """
+    n = len(extents)
+    lines = 1
+    start = 0           # first char of the current line
+    base = 0            # extent before `start`
+    last_break = 0      # latest char a new line may start at
+    i = 0
+    while i < n:
+        if extents[i] - base > width_px and i > start and text[i] != " ":
+            brk = last_break if last_break > start else i
+            lines += 1
+            start = i = brk
+            base = extents[brk - 1]
+            continue
+        nxt = i + 1
+        if nxt < n and _can_break(text[i], text[nxt]):
+            last_break = nxt
+        i = nxt
+    return lines
+
+
+# Calibrated per-line heights: (font name lower-case, size_pt) -> pt
+_CALIB_TABLE: dict[tuple[str, float], float] = {
+    ("simsun", 11.0): 13.5,
+}
+
+
 # ------------------------- public types ------------------------- #
-@dataclass
+@dataclass(frozen=True)
 class FontSpec:
     name: str = "SimSun"
     size_pt: float = 11.0
     weight: int = 400
     italic: bool = False
     charset: int = win32con.DEFAULT_CHARSET
+    # Derived once here instead of on every measure() (frozen keeps them valid)
+    key: tuple = field(init=False, repr=False, compare=False)
+    line_height_pt: float = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        name_lc = self.name.lower()
+        object.__setattr__(self, "key", (name_lc, self.size_pt, self.weight,
+                                         self.italic, self.charset))
+        object.__setattr__(self, "line_height_pt",
+                           _CALIB_TABLE.get((name_lc, round(self.size_pt, 2)), 13.5))
+
+
+_DEFAULT_FONT_SPEC = FontSpec()
 
 
 # ------------------------- main class --------------------------- #
 class PrinterTextMeasurer:
     """Owns a printer HDC and caches HFONT objects."""
-    _CALIB_TABLE: dict[tuple[str, float], float] = {
-        ("simsun", 11.0): 13.5,
-    }
+    _CALIB_TABLE = _CALIB_TABLE
     # Edge probes: try shrinking width by these px; if lines increase -> reserve 1 line
     SAFE_OFFSETS = (1, 2, 3, 4)
+    # Max memoized measure() results (sheets repeat many cell texts)
+    RESULT_CACHE_SIZE = 4096
 
     def __init__(self, printer: str | None = None):
         self._printer_name = printer or win32print.GetDefaultPrinter()
         self._h_printer = None
         self._hdc = None
+        self._dpi: tuple[int, int] | None = None    # (x, y), fixed per HDC
+        self._width_px_cache: dict[float, int] = {}  # col chars -> printer px
         self._font_cache: dict[tuple, int] = {}
+        # (text, width_px, font key, strategy, soft_break) -> measure() result
+        self._result_cache: OrderedDict[tuple, tuple[float, int, bool]] = OrderedDict()
 
     # ---- context mgmt ----
     def __enter__(self):
         self._h_printer = win32print.OpenPrinter(self._printer_name)
         self._hdc = win32gui.CreateDC("WINSPOOL", self._printer_name, None)
+        self._dpi = (self._dpi_x(), self._dpi_y())
+        self._width_px_cache.clear()
         return self
 
     def __exit__(self, exc_type, exc, tb):
         for h in self._font_cache.values():
             with contextlib.suppress(Exception):
                 win32gui.DeleteObject(h)
+        self._font_cache.clear()
         if self._hdc:
             with contextlib.suppress(Exception):
                 win32gui.DeleteDC(self._hdc)
@@ -72,12 +187,12 @@ class PrinterTextMeasurer:
 
     # ---- font cache ----
     def _hfont_for(self, spec: FontSpec) -> int:
-        key = (spec.name.lower(), spec.size_pt, spec.weight, spec.italic, spec.charset)
+        key = spec.key
         if key in self._font_cache:
             return self._font_cache[key]
         lf = win32gui.LOGFONT()
         # Negative lfHeight -> char height in logical units (device pixels for MM_TEXT)
-        lf.lfHeight  = -round(spec.size_pt * self._dpi_y() / 72)
+        lf.lfHeight  = -round(spec.size_pt * self._dpi[1] / 72)
         lf.lfWeight  = spec.weight
         lf.lfItalic  = int(spec.italic)
         lf.lfCharSet = spec.charset
@@ -93,8 +208,12 @@ class PrinterTextMeasurer:
         This is the actual usable area for text, excluding Excel's internal margins.
         Formula: chars * 7 (no +5, as that's Excel's display width including margins)
         """
-        px_screen = (col_chars * 12.0) if col_chars < 1.0 else (col_chars * 7.0)
-        return int(round(px_screen * self._dpi_x() / 96.0))
+        # A sheet has only a handful of distinct column widths
+        px = self._width_px_cache.get(col_chars)
+        if px is None:
+            px_screen = (col_chars * 12.0) if col_chars < 1.0 else (col_chars * 7.0)
+            px = self._width_px_cache[col_chars] = int(round(px_screen * self._dpi[0] / 96.0))
+        return px
 
     # ---- core measurement ----
     def measure(self,
@@ -110,53 +229,124 @@ class PrinterTextMeasurer:
         Measure height in points and line count for given device-pixel width.
         Returns: (height_pt, line_count, is_edge)
         """
-        spec = spec or FontSpec()
-        hfont = self._hfont_for(spec)
-        old = win32gui.SelectObject(self._hdc, hfont)
+        return self.measure_many([text], width_px, spec, strategy=strategy,
+                                 debug=debug, soft_break=soft_break)[0]
 
-        try:
-            # Inject zero-width space after ASCII runs to mimic East Asian wrapping
-            processed = (re.sub(r'([A-Za-z0-9\-·/]+)', lambda m: m.group(1) + "\u200B",
-                                text.rstrip()) if soft_break else text.rstrip())
-
-            def _count_lines(w_px: int) -> int:
-                rect = (0, 0, max(w_px, 1), 0)
-                flags = (win32con.DT_CALCRECT | win32con.DT_WORDBREAK |
-                         win32con.DT_EDITCONTROL | win32con.DT_NOPREFIX)
-                rc = win32gui.DrawText(self._hdc, processed, -1, rect, flags)
-                # pywin32 may return [height, (l,t,r,b)] or a tuple; normalize
-                if isinstance(rc, list) and len(rc) == 2:
-                    height_px = rc[1][3] - rc[1][1]
-                else:
-                    # (l, t, r, b)
-                    height_px = rc[3] - rc[1]
-                tm = win32gui.GetTextMetrics(self._hdc)
-                h_line = tm.get("tmHeight", tm.get("Height", 1))
-                ext    = tm.get("tmExternalLeading", tm.get("ExternalLeading", 0))
-                # Each visual row roughly occupies (tmHeight + tmExternalLeading)
-                return max(1, math.ceil((height_px + ext) / (h_line + ext)))
-
-            lines = _count_lines(width_px)
-
-            is_edge = False
-            if strategy == "safe":
-                # Probe –1/–2/–3/–4 px. If any causes an extra line, reserve 1 line.
-                for offs in self.SAFE_OFFSETS:
-                    if _count_lines(max(50, width_px - offs)) > lines:
-                        lines += 1
-                        is_edge = True
-                        break
-
-            # per-line height (pt)
-            per_line_pt = self._CALIB_TABLE.get(
-                (spec.name.lower(), round(spec.size_pt, 2)), 13.5
-            )
-            height_pt = lines * per_line_pt
-
-            return height_pt, lines, is_edge
-
-        finally:
-            win32gui.SelectObject(self._hdc, old)
+    def measure_many(self,
+                     texts: list[str],
+                     width_px: int,
+                     spec: FontSpec | None = None,
+                     *,
+                     strategy: str = "exact",
+                     debug: bool = False,
+                     soft_break: bool = True
+                     ) -> list[tuple[float, int, bool]]:
+        """
+        Measure several texts (e.g. a whole column) at one width and font.
+        The font is selected into the HDC once for the batch, not per text.
+        Returns: [(height_pt, line_count, is_edge), ...] in input order
+        """
+        spec = spec or _DEFAULT_FONT_SPEC
+        font_key = spec.key
+        results: list[tuple[float, int, bool] | None] = [None] * len(texts)
+        pending = []
+        # Results depend only on the printer, which is fixed per instance
+        for i, text in enumerate(texts):
+            cache_key = (text, width_px, font_key, strategy, soft_break)
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                self._result_cache.move_to_end(cache_key)
+                results[i] = cached
+            else:
+                pending.append((i, cache_key))
+
+        if pending:
+            old = win32gui.SelectObject(self._hdc, self._hfont_for(spec))
+            try:
+                for i, cache_key in pending:
+                    # Duplicates within the batch were cached by their first occurrence
+                    result = self._result_cache.get(cache_key)
+                    if result is None:
+                        result = self._measure_selected(cache_key[0], width_px, spec,
+                                                        strategy, soft_break)
+                        self._result_cache[cache_key] = result
+                        if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+                            self._result_cache.popitem(last=False)
+                    results[i] = result
+            finally:
+                win32gui.SelectObject(self._hdc, old)
+
+        return results
+
+    def _measure_selected(self, text: str, width_px: int, spec: FontSpec,
+                          strategy: str, soft_break: bool) -> tuple[float, int, bool]:
+        """Measure one text; the caller has selected the font for spec."""
+        # Inject zero-width space after ASCII runs to mimic East Asian wrapping
+        processed = text.rstrip()
+        if soft_break:
+            processed = _HALF_WIDTH_BLOCK.sub(_SOFT_BREAK_REPL, processed)
+
+        # Measure each paragraph once; every probed width reuses the extents
+        paragraphs = [(para, _text_extents(self._hdc, para))
+                      for para in _split_paragraphs(processed)]
+
+        emulated: dict[int, int] = {}
+
+        def _emulate(w_px: int) -> int:
+            w_px = max(w_px, 1)
+            lines = emulated.get(w_px)
+            if lines is None:
+                lines = emulated[w_px] = sum(_wrap_line_count(para, extents, w_px)
+                                             for para, extents in paragraphs)
+            return lines
+
+        def _count_lines(w_px: int) -> int:
+            w_px = max(w_px, 1)
+            lines = _emulate(w_px)
+            # Within 1 px of a wrap point rounding may differ; DrawText decides
+            if _emulate(w_px - 1) != lines or _emulate(w_px + 1) != lines:
+                return self._drawtext_line_count(processed, w_px)
+            return lines
+
+        # Fast path: one paragraph at least 1 px narrower than any width we would probe
+        min_width = width_px
+        if strategy == "safe":
+            min_width = min(width_px, max(50, width_px - max(self.SAFE_OFFSETS)))
+        if len(paragraphs) == 1 and (not paragraphs[0][1] or paragraphs[0][1][-1] < min_width):
+            return spec.line_height_pt, 1, False
+
+        lines = _count_lines(width_px)
+
+        is_edge = False
+        if strategy == "safe":
+            # Probe –1/–2/–3/–4 px. If any causes an extra line, reserve 1 line.
+            for offs in self.SAFE_OFFSETS:
+                if _count_lines(max(50, width_px - offs)) > lines:
+                    lines += 1
+                    is_edge = True
+                    break
+
+        height_pt = lines * spec.line_height_pt
+
+        return height_pt, lines, is_edge
+
+    def _drawtext_line_count(self, text: str, w_px: int) -> int:
+        """Line count from DrawText(DT_CALCRECT); the caller has selected the font."""
+        rect = (0, 0, max(w_px, 1), 0)
+        flags = (win32con.DT_CALCRECT | win32con.DT_WORDBREAK |
+                 win32con.DT_EDITCONTROL | win32con.DT_NOPREFIX)
+        rc = win32gui.DrawText(self._hdc, text, -1, rect, flags)
+        # pywin32 may return [height, (l,t,r,b)] or a tuple; normalize
+        if isinstance(rc, (list, tuple)) and len(rc) == 2:
+            height_px = rc[1][3] - rc[1][1]
+        else:
+            # (l, t, r, b)
+            height_px = rc[3] - rc[1]
+        tm = win32gui.GetTextMetrics(self._hdc)
+        h_line = tm.get("tmHeight", tm.get("Height", 1))
+        ext    = tm.get("tmExternalLeading", tm.get("ExternalLeading", 0))
+        # Each visual row roughly occupies (tmHeight + tmExternalLeading)
+        return max(1, math.ceil((height_px + ext) / (h_line + ext)))
 
     # ---- convenience wrapper: column width (chars) ----
     def measure_for_excel_col(self,
@@ -174,6 +364,58 @@ class PrinterTextMeasurer:
         return h_pt, lines
 
 
+# ------------------------- object pool -------------------------- #
+class PrinterTextMeasurerPool:
+    """
+    Reuses entered PrinterTextMeasurer instances across calls.
+    Opening the printer and creating its DC is far more expensive than a
+    measurement, so acquire() hands out an already-entered measurer (with
+    its HFONT and result caches warm) and release() returns it. A measurer
+    is used by one thread at a time; printer DCs are not thread-affine, so
+    any thread may take any idle instance. The first measurer is opened
+    in __init__, so an unusable printer fails at construction rather than
+    on every measurement. close() runs at exit and exits idle measurers;
+    measurers still checked out are exited when they are released.
+    """
+
+    def __init__(self, printer: str | None = None):
+        self._printer = printer
+        self._idle: queue.SimpleQueue[PrinterTextMeasurer] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.release(self.acquire())
+        atexit.register(self.close)
+
+    def acquire(self) -> PrinterTextMeasurer:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        return PrinterTextMeasurer(self._printer).__enter__()
+
+    def release(self, measurer: PrinterTextMeasurer) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(measurer)
+                return
+        with contextlib.suppress(Exception):
+            measurer.__exit__(None, None, None)
+
+    def close(self) -> None:
+        """Exit idle measurers; busy ones are exited by their release()."""
+        with self._lock:
+            self._closed = True
+            idle = []
+            while True:
+                try:
+                    idle.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+        for measurer in idle:
+            with contextlib.suppress(Exception):
+                measurer.__exit__(None, None, None)
+
+
 # ---- CLI sanity test ----
 if __name__ == "__main__":
     sample = ("［厦门市海沧区］征拆工作专题会议的纪要［2022年８月２５日，厦门市海沧区东孚街道党工委书记赖大庆主持召开会议，"
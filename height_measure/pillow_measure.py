@@ -19,11 +19,19 @@ from __future__ import annotations
 
 import math
 import re
+import threading
+import weakref
 from functools import lru_cache
 from typing import Tuple
 
+import numpy as np
 from PIL import ImageFont
 
+try:                         # 可选：用 Numba 编译逐字折行循环
+    import numba
+except ImportError:
+    numba = None
+
 # ------------------------ 常量与校准 ------------------------ #
 _GRID = 0.75                 # Excel 行高网格
 _DEFAULT_SLOPE = 1.0         # 全局微调系数
@@ -60,33 +68,156 @@ def _per_line_pt(font_name: str, size_pt: float,
     return math.ceil(raw / _GRID) * _GRID
 
 
-@lru_cache(maxsize=128)
+# (font_path_or_name, px_size) -> 字体；不设上限，工作簿中字体组合通常只有几十种
+_FONT_CACHE: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
+_FONT_LOCK = threading.Lock()
+
+
 def _load_font(font_path_or_name: str, size_pt: float) -> ImageFont.FreeTypeFont:
     """
-    加载字体并缓存。
+    加载字体并缓存（线程安全）。
     注意：Pillow 的 truetype(size=...) 期望的是**像素**大小（基于 96 DPI 的逻辑像素）。
     需将 pt 换算为 px：px = pt * 96 / 72
     """
     px_size = int(round(size_pt * _SCREEN_DPI / 72.0))  # 11pt -> 15px
     px_size = max(px_size, 1)
-    return ImageFont.truetype(font_path_or_name, size=px_size)
+    key = (font_path_or_name, px_size)
+    font = _FONT_CACHE.get(key)
+    if font is None:
+        with _FONT_LOCK:
+            font = _FONT_CACHE.get(key)
+            if font is None:
+                font = ImageFont.truetype(font_path_or_name, size=px_size)
+                _FONT_CACHE[key] = font
+    return font
+
+
+# 预加载中文工作簿最常用的宋体 11pt；系统没有该字体时跳过
+try:
+    _load_font("simsun.ttc", 11.0)
+except OSError:
+    pass
+
+
+@lru_cache(maxsize=None)
+def _font_line_height(font_path_or_name: str, size_pt: float) -> float:
+    """每种 (字体, 字号) 只计算一次行盒高度，省去逐次 lower()/round() 与查表"""
+    font = _load_font(font_path_or_name, size_pt)
+    ascent, descent = font.getmetrics()  # 单位：px @ 96DPI
+    return _per_line_pt(font.getname()[0], size_pt,
+                        ascent, descent, dpi=_SCREEN_DPI)
+
+
+# 字体 -> {字符: 宽度(px)}；逐字宽度只向 FreeType 查询一次
+_CHAR_WIDTHS: "weakref.WeakKeyDictionary[ImageFont.FreeTypeFont, dict[str, float]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _get_char_widths(font: ImageFont.FreeTypeFont, text: str) -> dict[str, float]:
+    """返回字体的逐字宽度表，并补齐 text 中尚未测量过的字符"""
+    widths = _CHAR_WIDTHS.get(font)
+    if widths is None:
+        widths = _CHAR_WIDTHS.setdefault(font, {})
+    missing = set(text).difference(widths)
+    if missing:
+        get_len = font.getlength
+        widths.update({ch: get_len(ch) for ch in missing})
+    return widths
+
+
+def _split_segments(text: str) -> list[str]:
+    """按换行切分为不含换行符的段；\r 与 \n 各算一次换行（\r\n 算两次）"""
+    if "\r" in text:
+        text = text.replace("\r", "\n")
+    return text.split("\n")
+
+
+def _count_segment_wraps(cum: np.ndarray, width_px: float) -> int:
+    """
+    对一段不含换行符的文本做贪心折行，返回额外产生的行数。
+    cum 为逐字宽度的累加和；每行用 searchsorted 一次找到断点，
+    循环次数等于行数而非字符数。
+    """
+    n = len(cum)
+    wraps = 0
+    end = int(np.searchsorted(cum, width_px, side="right"))
+    if end == 0 and n:
+        # 空行放不下首字：与逐字算法一致，先记一行，再把该字放到下一行
+        wraps, end = 1, 1
+    while end < n:
+        wraps += 1
+        # 新行以第 end 个字开头；单字超宽时独占一行
+        nxt = int(np.searchsorted(cum, cum[end - 1] + width_px, side="right"))
+        end = max(nxt, end + 1)
+    return wraps
+
+
+def _greedy_segment_wraps(widths: np.ndarray, width_px: float) -> int:
+    """逐字贪心折行（与 _count_segment_wraps 结果一致），供 Numba 编译"""
+    wraps = 0
+    accum = 0.0
+    for w in widths:
+        if accum + w <= width_px:
+            accum += w
+        else:
+            wraps += 1
+            accum = w
+    return wraps
+
+
+# 有 Numba 时逐字循环编译为机器码；否则使用 NumPy searchsorted 版本
+_greedy_segment_wraps_jit = (numba.njit(cache=True)(_greedy_segment_wraps)
+                             if numba is not None else None)
 
 
 def _wrap_and_count_lines(text: str, width_px: int,
                           font: ImageFont.FreeTypeFont) -> int:
-    """逐字累加测宽，超过 width_px 则换行，返回行数"""
-    get_len = font.getlength
-    lines, accum = 1, ""
-    for ch in text:
-        if ch in ("\n", "\r"):
-            lines, accum = lines + 1, ""
-            continue
-        if get_len(accum + ch) <= width_px:
-            accum += ch
-        else:
-            lines, accum = lines + 1, ch
+    """逐字宽度累加测宽，超过 width_px 则换行，返回行数"""
+    char_width = _get_char_widths(font, text)
+    segments = _split_segments(text)
+    lines = len(segments)
+    for seg in segments:
+        if seg:
+            widths = np.fromiter(map(char_width.__getitem__, seg),
+                                 dtype=np.float64, count=len(seg))
+            if _greedy_segment_wraps_jit is not None:
+                lines += _greedy_segment_wraps_jit(widths, float(width_px))
+            else:
+                lines += _count_segment_wraps(np.cumsum(widths), width_px)
     return lines
 
+@lru_cache(maxsize=8192)
+def _measure_lines(text: str, width_px: int, font_path_or_name: str,
+                   font_size_pt: float, safe: bool) -> Tuple[int, float, bool]:
+    """
+    计算行数与行盒高度并缓存；表格中大量重复的单元格文本只计算一次。
+    返回 (lines, per_line_pt, is_edge)，is_edge 表示 safe 策略多留了 1 行。
+    """
+    # 1) 预处理文本：半角块加软断
+    processed = _inject_soft_breaks(text)
+
+    # 2) 加载字体（pt→px） & 行盒高度
+    font = _load_font(font_path_or_name, font_size_pt)
+    per_line_pt = _font_line_height(font_path_or_name, font_size_pt)
+
+    # 3) 快速路径：无换行且整段放得下（safe 时按缩 1 px 后的宽度判断）。
+    #    与折行使用同一逐字宽度表、同一累加顺序，判断结果与慢路径一致；
+    #    整段 getlength 含字距调整，临界时会与逐字累加不一致
+    min_width = min(width_px, max(width_px - 1, 10)) if safe else width_px
+    if "\n" not in processed and "\r" not in processed:
+        char_width = _get_char_widths(font, processed)
+        if sum(map(char_width.__getitem__, processed)) <= min_width:
+            return 1, per_line_pt, False
+
+    # 4) 计算行数
+    lines = _wrap_and_count_lines(processed, width_px, font)
+
+    # 5) safe 策略：若缩 1 px 就增行，则多留 1 行
+    is_edge = bool(safe and _wrap_and_count_lines(
+        processed, max(width_px - 1, 10), font) > lines)
+    return lines, per_line_pt, is_edge
+
+
 # ------------------------ 主外部接口 ------------------------ #
 def measure(text: str,
             width_px: int,
@@ -115,25 +246,15 @@ def measure(text: str,
     if slope is None:
         slope = _DEFAULT_SLOPE
 
-    # 1) 预处理文本：半角块加软断
-    processed = _inject_soft_breaks(text)
-
-    # 2) 加载字体（pt→px） & 计算行数
-    font = _load_font(font_path_or_name, font_size_pt)
-    lines = _wrap_and_count_lines(processed, width_px, font)
-
-    # 3) 行盒高度
-    ascent, descent = font.getmetrics()  # 单位：px @ 96DPI
-    per_line_pt = _per_line_pt(font.getname()[0], font_size_pt,
-                               ascent, descent, dpi=_SCREEN_DPI)
+    lines, per_line_pt, is_edge = _measure_lines(
+        text, width_px, font_path_or_name, font_size_pt, bool(safe))
 
     height_pt = lines * per_line_pt * slope
 
-    # 4) safe 策略：若缩 1 px 就增行，则多留 1 行
-    if safe:
-        if _wrap_and_count_lines(processed, max(width_px - 1, 10), font) > lines:
-            height_pt += per_line_pt
-            lines += 1
+    # safe 策略多留的 1 行不乘 slope
+    if is_edge:
+        height_pt += per_line_pt
+        lines += 1
 
     if debug:
         print(f"[DBG] width_px={width_px}, pt={font_size_pt}, px_size={int(round(font_size_pt * _SCREEN_DPI / 72.0))}, "
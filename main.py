@@ -1,42 +1,65 @@
 import logging
+import logging.handlers
+import multiprocessing
 import queue
 import threading
 import tkinter as tk
+from collections import deque
+import concurrent.futures
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from tkinter import filedialog, messagebox, ttk
-from tkinter.scrolledtext import ScrolledText
 import sys
 import os
-import pandas as pd
 
 # 添加当前目录到Python路径（支持直接运行）
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-from utils.recipes import (
-    create_aj_index,
-    create_jn_or_jh_index,
-    create_qy_full_index,
-)
-from core.enhanced_height_calculator import (
-    get_height_calculator,
-    set_calculation_method,
-    get_available_methods
-)
+# utils.recipes、core.enhanced_height_calculator、utils.print_service 及 pandas
+# 依赖xlwings/pywin32等较重的模块，在首次使用处再导入，加快窗口首次显示
 from utils.config_manager import get_config_manager
 from utils.file_validator import validate_excel_file, validate_output_directory
 from utils.feature_manager import get_feature_manager, is_feature_enabled
 
+logger = logging.getLogger(__name__)
 
-class QueueHandler(logging.Handler):
+
+# 生成子进程中的取消事件，由 _init_generation_worker 设置
+_worker_cancel_event = None
+
+
+def _init_generation_worker(log_queue, cancel_event):
+    """生成子进程初始化：日志转发回主进程，并保存取消事件"""
+    global _worker_cancel_event
+    _worker_cancel_event = cancel_event
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root_logger.setLevel(logging.INFO)
+
+
+def _run_recipe(recipe_func, height_method, kwargs):
+    """在生成子进程中执行目录配方，返回行高计算性能统计"""
+    import utils.recipes
+    from core.enhanced_height_calculator import get_height_calculator, set_calculation_method
+    
+    set_calculation_method(height_method)
+    getattr(utils.recipes, recipe_func)(cancel_flag=_worker_cancel_event, **kwargs)
+    return get_height_calculator().get_performance_stats()
+
+
+class FormattingRelayHandler(logging.Handler):
     """
-    一个自定义的日志处理器，将日志记录发送到一个队列中，
-    以便在GUI线程中安全地更新Text控件。
+    日志中继处理器，运行在 QueueListener 的后台线程中：
+    格式化、过滤并精简日志记录后，将字符串追加到界面队列（deque）
+    并置位事件，GUI线程只需取出现成的字符串更新日志控件。
     支持精简模式，过滤详细的调试信息。
     """
 
-    def __init__(self, log_queue):
+    def __init__(self, log_queue, log_event):
         super().__init__()
         self.log_queue = log_queue
+        self.log_event = log_event
         # 定义需要在GUI中精简显示的关键词
         self.simplify_keywords = [
             'twip比较', '页码分割', 'pt值:', '当前行高', '缩放',
@@ -61,9 +84,11 @@ class QueueHandler(logging.Handler):
         if any(keyword in formatted_msg for keyword in self.simplify_keywords):
             simplified_msg = self._simplify_message(formatted_msg)
             if simplified_msg:
-                self.log_queue.put(simplified_msg)
+                self.log_queue.append(simplified_msg)
+                self.log_event.set()
         else:
-            self.log_queue.put(formatted_msg)
+            self.log_queue.append(formatted_msg)
+            self.log_event.set()
     
     def _simplify_message(self, message):
         """将详细的技术日志转换为用户友好的简要信息"""
@@ -123,6 +148,14 @@ class DirectoryGeneratorGUI(tk.Tk):
     """
     Tkinter图形用户界面主应用类。
     """
+    
+    LOG_MAX_LINES = 500  # 日志区保留的最大行数
+    
+    # 轮询间隔（毫秒）：空闲时逐次加倍直到上限，有变化时恢复为最小值
+    LOG_POLL_MIN_MS = 100
+    LOG_POLL_MAX_MS = 1000
+    STATUS_POLL_MIN_MS = 2000
+    STATUS_POLL_MAX_MS = 8000
 
     def __init__(self):
         super().__init__()
@@ -138,9 +171,34 @@ class DirectoryGeneratorGUI(tk.Tk):
         self.current_task_thread = None
         self.shutdown_flag = threading.Event()
         
-        # 初始化打印服务
-        from utils.print_service import get_print_service
-        self.print_service = get_print_service()
+        # 打印服务在首次使用时创建（见 _ensure_print_service）
+        self._print_service = None
+        
+        # 生成子进程池在首次生成时创建（见 _ensure_generation_pool）
+        self._generation_pool = None
+        self._generation_cancel_event = None
+        self._generation_log_listener = None
+        self._worker_height_stats = None
+        
+        # 状态控件上次写入的值，未变化时跳过重复的Tcl调用
+        self._last_print_status = None
+        self._last_interval_status = None
+        self._last_skip_state = None
+        self._last_progress_value = None
+        self._last_progress_text = None
+        self._printers_sig = None
+        self._progress_q = deque()  # 工作线程提交的进度更新，由_drain_progress在GUI线程应用
+        self._log_poll_delay = self.LOG_POLL_MIN_MS
+        self._status_poll_delay = self.STATUS_POLL_MIN_MS
+        
+        # 配置延迟保存：界面修改只标记为脏，合并后由后台线程写盘
+        self._config_dirty = False
+        self._config_flush_scheduled = False
+        self._config_save_queue = queue.Queue()
+        self._config_save_thread = threading.Thread(
+            target=self._config_save_worker, name="ConfigSaver", daemon=True
+        )
+        self._config_save_thread.start()
         
         # 初始化文件列表相关属性
         self.file_list_data = []  # 存储文件列表数据
@@ -166,30 +224,43 @@ class DirectoryGeneratorGUI(tk.Tk):
         from datetime import datetime
         log_filename = os.path.join(log_dir, f"adg_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
         
-        self.log_queue = queue.Queue()
-        self.queue_handler = QueueHandler(self.log_queue)
+        # 界面队列：存放已格式化的日志字符串，由process_log_queue消费。
+        # deque的append/popleft本身是原子的，无需Queue的锁；有新消息时置位事件
+        self.log_queue = deque(maxlen=10000)
+        self._log_event = threading.Event()
+        relay_handler = FormattingRelayHandler(self.log_queue, self._log_event)
+        relay_handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s", "%H:%M:%S"))
         
         # 文件处理器（完整日志）
         file_handler = logging.FileHandler(log_filename, encoding='utf-8')
         file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", "%H:%M:%S"))
         
+        # 记录日志的线程只把原始记录放入队列；格式化、过滤和写文件
+        # 都在监听线程中完成，不占用GUI线程
+        raw_log_queue = queue.Queue()
+        self.queue_handler = logging.handlers.QueueHandler(raw_log_queue)
+        self.queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        self._log_handlers = (relay_handler, file_handler)
+        self.log_listener = logging.handlers.QueueListener(
+            raw_log_queue, *self._log_handlers, respect_handler_level=True
+        )
+        self.log_listener.start()
+        
         logging.basicConfig(
             level=logging.INFO,
-            format="%(asctime)s - %(message)s",
-            datefmt="%H:%M:%S",
-            handlers=[self.queue_handler, file_handler],
+            handlers=[self.queue_handler],
         )
 
         self.create_widgets()
-        self.load_config()  # 加载配置
-        self.refresh_printers()  # 初始化打印机列表
-        self.after(100, self.process_log_queue)
         
-        # 初始化完成后显示当前方案信息
-        self.after(200, self.show_initial_method_info)
+        # 在后台线程读取配置，读取完成后在GUI线程中填充控件
+        self._loaded_config_queue = queue.Queue(maxsize=1)
+        threading.Thread(target=self._load_config_worker, name="ConfigLoader", daemon=True).start()
+        self.after(10, self._apply_initial_config)
         
-        # 延迟初始化文件列表
-        self.after(300, self.update_file_list)
+        self.after(50, self.refresh_printers)  # 窗口显示后再初始化打印机列表
+        self.after(100, self.process_log_queue)
+        self.after(100, self._drain_progress)
         
         # 启动打印状态监控
         self.after(1000, self.monitor_print_status)
@@ -229,6 +300,7 @@ class DirectoryGeneratorGUI(tk.Tk):
         height_container.pack(side=tk.LEFT, padx=(1, 5))
         
         # 获取可用方案
+        from core.enhanced_height_calculator import get_available_methods
         available_methods = get_available_methods()
         method_display_names = {
             'xlwings': 'xlwings',
@@ -254,12 +326,14 @@ class DirectoryGeneratorGUI(tk.Tk):
         self.options = {}
         self.options["start_file"] = ttk.Entry(config_row1, width=8)
         self.options["start_file"].pack(side=tk.LEFT, padx=(1, 5))
-        self.options["start_file"].bind('<FocusOut>', lambda e: self.on_option_changed("start_file", e.widget.get()))
+        self.options["start_file"]._opt_key = "start_file"
+        self.options["start_file"].bind('<FocusOut>', self._on_entry_focusout)
 
         ttk.Label(config_row1, text="结束档号:").pack(side=tk.LEFT)
         self.options["end_file"] = ttk.Entry(config_row1, width=8)
         self.options["end_file"].pack(side=tk.LEFT, padx=(1, 0))
-        self.options["end_file"].bind('<FocusOut>', lambda e: self.on_option_changed("end_file", e.widget.get()))
+        self.options["end_file"]._opt_key = "end_file"
+        self.options["end_file"].bind('<FocusOut>', self._on_entry_focusout)
         
         # 绑定选择变化事件
         self.height_method_combo.bind('<<ComboboxSelected>>', self.on_height_method_changed)
@@ -268,6 +342,9 @@ class DirectoryGeneratorGUI(tk.Tk):
         # 存储方案映射
         self.available_methods = available_methods
         self.method_display_names = method_display_names
+        self._display_to_method = {
+            method_display_names.get(method, method): method for method in available_methods
+        }
 
         # --- 路径配置（紧凑型） ---
         self.path_frame = ttk.LabelFrame(main_frame, text="配置路径", padding="1")
@@ -275,6 +352,8 @@ class DirectoryGeneratorGUI(tk.Tk):
 
         self.paths = {}
         self.path_widgets = {}  # 存储所有路径相关的控件
+        self._visible_path_rows = {}  # 当前显示的路径控件: 路径键 -> 行号
+        self._recipe_layout_cache = {}  # 目录类型 -> {路径键: 行号}
         
         # 创建路径网格容器
         self.path_grid = ttk.Frame(self.path_frame)
@@ -386,10 +465,9 @@ class DirectoryGeneratorGUI(tk.Tk):
         ttk.Label(mode_frame, text="模式:").pack(side=tk.LEFT)
         
         self.print_mode_var = tk.StringVar(value="none")
-        self.print_mode_var.trace('w', self.on_print_mode_changed)
-        ttk.Radiobutton(mode_frame, text="不打印", variable=self.print_mode_var, value="none").pack(side=tk.LEFT, padx=2)
-        ttk.Radiobutton(mode_frame, text="直接", variable=self.print_mode_var, value="direct").pack(side=tk.LEFT, padx=2)
-        ttk.Radiobutton(mode_frame, text="批量", variable=self.print_mode_var, value="batch").pack(side=tk.LEFT, padx=2)
+        ttk.Radiobutton(mode_frame, text="不打印", variable=self.print_mode_var, value="none", command=self.on_print_mode_changed).pack(side=tk.LEFT, padx=2)
+        ttk.Radiobutton(mode_frame, text="直接", variable=self.print_mode_var, value="direct", command=self.on_print_mode_changed).pack(side=tk.LEFT, padx=2)
+        ttk.Radiobutton(mode_frame, text="批量", variable=self.print_mode_var, value="batch", command=self.on_print_mode_changed).pack(side=tk.LEFT, padx=2)
         
         # 第二行：打印机、份数、批量按钮
         printer_frame = ttk.Frame(print_frame)
@@ -409,8 +487,13 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         ttk.Label(copies_batch_frame, text="份数:").pack(side=tk.LEFT)
         
-        self.print_copies_var = tk.StringVar(value="1")
-        copies_spinbox = ttk.Spinbox(copies_batch_frame, from_=1, to=10, width=3, textvariable=self.print_copies_var)
+        # 只允许输入1-10的整数，读取时无需再解析和捕获ValueError
+        self.print_copies_var = tk.IntVar(value=1)
+        copies_vcmd = (self.register(self._validate_copies), '%d', '%P', '%S')
+        copies_spinbox = ttk.Spinbox(
+            copies_batch_frame, from_=1, to=10, width=3, textvariable=self.print_copies_var,
+            validate='key', validatecommand=copies_vcmd
+        )
         copies_spinbox.pack(side=tk.LEFT, padx=2)
         
         self.batch_print_btn = ttk.Button(copies_batch_frame, text="批量打印", command=self.batch_print_files, state="disabled", width=10)
@@ -436,6 +519,9 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         ttk.Label(interval_frame, text="每").pack(side=tk.LEFT, padx=(5, 0))
         
+        # 手动输入的值在失去焦点时统一提交一次，而不是每次按键都提交
+        interval_vcmd = (self.register(self._validate_interval), '%P')
+        
         self.interval_task_count_var = tk.StringVar(value="3")
         task_count_spinbox = ttk.Spinbox(
             interval_frame, 
@@ -443,10 +529,11 @@ class DirectoryGeneratorGUI(tk.Tk):
             to=20, 
             width=2, 
             textvariable=self.interval_task_count_var,
-            command=self.on_interval_settings_changed
+            command=self.on_interval_settings_changed,
+            validate='focusout',
+            validatecommand=interval_vcmd
         )
         task_count_spinbox.pack(side=tk.LEFT, padx=1)
-        task_count_spinbox.bind('<KeyRelease>', lambda e: self.on_interval_settings_changed())
         
         ttk.Label(interval_frame, text="个休息").pack(side=tk.LEFT)
         
@@ -457,10 +544,11 @@ class DirectoryGeneratorGUI(tk.Tk):
             to=300, 
             width=2, 
             textvariable=self.interval_seconds_var,
-            command=self.on_interval_settings_changed
+            command=self.on_interval_settings_changed,
+            validate='focusout',
+            validatecommand=interval_vcmd
         )
         seconds_spinbox.pack(side=tk.LEFT, padx=1)
-        seconds_spinbox.bind('<KeyRelease>', lambda e: self.on_interval_settings_changed())
         
         ttk.Label(interval_frame, text="秒").pack(side=tk.LEFT)
         
@@ -517,12 +605,24 @@ class DirectoryGeneratorGUI(tk.Tk):
         # 右侧：日志输出（适应小窗口）
         log_frame = ttk.LabelFrame(control_frame, text="日志", padding="3")
         log_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(3, 0))
-        self.log_text = ScrolledText(log_frame, state="disabled", height=12, width=50, wrap=tk.WORD, font=("Consolas", 8))
-        self.log_text.pack(fill=tk.BOTH, expand=True)
+        # 使用Treeview按行存放日志，配合固定长度的deque实现环形缓冲，
+        # 超出上限时只删除最旧的一行，无需读取整个文本内容
+        style = ttk.Style(self)
+        style.configure("Log.Treeview", font=("Consolas", 8), rowheight=14)
+        self.log_tree = ttk.Treeview(
+            log_frame, columns=("msg",), show="", height=12, style="Log.Treeview", selectmode="none"
+        )
+        self.log_tree.column("msg", width=350, stretch=True)
+        log_scrollbar = ttk.Scrollbar(log_frame, orient=tk.VERTICAL, command=self.log_tree.yview)
+        self.log_tree.configure(yscrollcommand=log_scrollbar.set)
+        log_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self._log_ids = deque(maxlen=self.LOG_MAX_LINES)
 
     def show_initial_method_info(self):
         """显示初始方案信息"""
         try:
+            from core.enhanced_height_calculator import get_height_calculator, get_available_methods
             calculator = get_height_calculator()
             current_method = calculator.method
             available_methods = get_available_methods()
@@ -542,20 +642,17 @@ class DirectoryGeneratorGUI(tk.Tk):
         selected_display = self.height_method_var.get()
         
         # 找到对应的实际方案名
-        selected_method = None
-        for method in self.available_methods:
-            if self.method_display_names.get(method, method) == selected_display:
-                selected_method = method
-                break
+        selected_method = self._display_to_method.get(selected_display)
         
         if selected_method:
             try:
                 # 切换到选定的方案
+                from core.enhanced_height_calculator import set_calculation_method
                 set_calculation_method(selected_method)
                 
                 # 保存到配置
                 self.config_manager.set_last_height_method(selected_method)
-                self.config_manager.save_config()
+                self._mark_config_dirty()
                 
                 # 在日志中显示切换信息
                 logging.info(f"行高计算方案已切换到: {selected_method}")
@@ -578,7 +675,7 @@ class DirectoryGeneratorGUI(tk.Tk):
         """当目录类型选择改变时的回调函数"""
         selected_recipe = self.recipe_var.get()
         self.config_manager.set_last_recipe(selected_recipe)
-        self.config_manager.save_config()
+        self._mark_config_dirty()
         logging.info(f"目录类型已切换到: {selected_recipe}")
         
         # 更新路径显示
@@ -595,7 +692,8 @@ class DirectoryGeneratorGUI(tk.Tk):
             
             # 创建输入框
             entry = ttk.Entry(self.path_grid, width=40)
-            entry.bind('<FocusOut>', lambda e, k=key: self.on_path_changed(k, e.widget.get()))
+            entry._path_key = key
+            entry.bind('<FocusOut>', self._on_entry_focusout)
             
             # 创建浏览按钮
             is_dir = "folder" in key
@@ -623,21 +721,29 @@ class DirectoryGeneratorGUI(tk.Tk):
         selected_recipe = self.recipe_var.get()
         required_paths = self.recipe_path_mapping.get(selected_recipe, [])
         
-        # 隐藏所有控件
-        for key, widgets in self.path_widgets.items():
+        # 每种目录类型的布局（路径键 -> 行号）只计算一次
+        layout = self._recipe_layout_cache.get(selected_recipe)
+        if layout is None:
+            shown_keys = [key for key in required_paths if key in self.path_widgets]
+            layout = {key: row for row, key in enumerate(shown_keys)}
+            self._recipe_layout_cache[selected_recipe] = layout
+        
+        # 只处理可见性或行号发生变化的控件
+        for key in self._visible_path_rows.keys() - layout.keys():
+            widgets = self.path_widgets[key]
             widgets['label'].grid_remove()
             widgets['entry'].grid_remove()
             widgets['button'].grid_remove()
         
-        # 显示需要的控件
-        current_row = 0
-        for path_key in required_paths:
-            if path_key in self.path_widgets:
-                widgets = self.path_widgets[path_key]
-                widgets['label'].grid(row=current_row, column=0, sticky=tk.W, padx=3, pady=1)
-                widgets['entry'].grid(row=current_row, column=1, sticky=tk.EW, padx=3, pady=1)
-                widgets['button'].grid(row=current_row, column=2, sticky=tk.E, padx=3, pady=1)
-                current_row += 1
+        for key, row in layout.items():
+            if self._visible_path_rows.get(key) == row:
+                continue
+            widgets = self.path_widgets[key]
+            widgets['label'].grid(row=row, column=0, sticky=tk.W, padx=3, pady=1)
+            widgets['entry'].grid(row=row, column=1, sticky=tk.EW, padx=3, pady=1)
+            widgets['button'].grid(row=row, column=2, sticky=tk.E, padx=3, pady=1)
+        
+        self._visible_path_rows = layout
         
         # 更新界面状态标题
         path_count = len(required_paths)
@@ -654,13 +760,28 @@ class DirectoryGeneratorGUI(tk.Tk):
                     self.paths[path_key].delete(0, tk.END)
                     self.config_manager.set_path(path_key, "")
             
-            self.config_manager.save_config()
+            self._mark_config_dirty()
             logging.info(f"已清空 [{selected_recipe}] 的所有路径")
 
+    def _on_entry_focusout(self, event):
+        """路径/可选参数输入框失去焦点时的统一回调，值与配置相同时不做处理"""
+        widget = event.widget
+        value = widget.get()
+        
+        path_key = getattr(widget, '_path_key', None)
+        if path_key is not None:
+            if value != self.config_manager.get(f"paths.{path_key}", ""):
+                self.on_path_changed(path_key, value)
+            return
+        
+        option_key = getattr(widget, '_opt_key', None)
+        if option_key is not None and value != self.config_manager.get(f"options.{option_key}", ""):
+            self.on_option_changed(option_key, value)
+
     def on_path_changed(self, path_key, path_value):
         """当路径改变时的回调函数"""
         self.config_manager.set_path(path_key, path_value)
-        self.config_manager.save_config()
+        self._mark_config_dirty()
         
         # 如果是目录文件路径变更，更新文件列表
         if path_key in ["jn_catalog_path", "aj_catalog_path", "jh_catalog_path"]:
@@ -669,7 +790,7 @@ class DirectoryGeneratorGUI(tk.Tk):
     def on_option_changed(self, option_key, option_value):
         """当可选参数改变时的回调函数"""
         self.config_manager.set_option(option_key, option_value)
-        self.config_manager.save_config()
+        self._mark_config_dirty()
         
         # 如果是档号范围变更，更新文件列表
         if option_key in ["start_file", "end_file"]:
@@ -677,44 +798,94 @@ class DirectoryGeneratorGUI(tk.Tk):
 
     def load_config(self):
         """从配置文件加载设置"""
+        try:
+            config = self._read_config_blocking()
+        except Exception as e:
+            logging.warning(f"加载配置失败: {e}")
+            return
+        self._apply_config(config)
+
+    def _load_config_worker(self):
+        """后台线程：读取配置，结果交给 _apply_initial_config"""
+        try:
+            config = self._read_config_blocking()
+        except Exception as e:
+            logging.warning(f"加载配置失败: {e}")
+            config = None
+        self._loaded_config_queue.put(config)
+
+    def _apply_initial_config(self):
+        """等待后台读取的配置并应用，随后完成依赖配置的初始化步骤"""
+        try:
+            config = self._loaded_config_queue.get_nowait()
+        except queue.Empty:
+            self.after(10, self._apply_initial_config)
+            return
+        
+        if config is not None:
+            self._apply_config(config)
+        
+        # 初始化完成后显示当前方案信息
+        self.after(200, self.show_initial_method_info)
+        
+        # 延迟初始化文件列表
+        self.after(300, self.update_file_list)
+
+    def _read_config_blocking(self):
+        """读取配置数据并切换行高计算方案（不操作控件，可在后台线程中执行）"""
+        config = {
+            'recipe': self.config_manager.get_last_recipe(),
+            'height_method': self.config_manager.get_last_height_method(),
+            'paths': dict(self.config_manager.get_paths()),
+            'options': dict(self.config_manager.get_options()),
+            'print_interval': dict(self.config_manager.get_print_interval_config()),
+        }
+        if config['height_method'] in self.available_methods:
+            from core.enhanced_height_calculator import set_calculation_method
+            set_calculation_method(config['height_method'])
+        return config
+
+    def _apply_config(self, config):
+        """将读取的配置填充到界面控件（需在GUI线程中调用）"""
         try:
             # 加载目录类型选择
-            last_recipe = self.config_manager.get_last_recipe()
+            last_recipe = config['recipe']
             recipe_values = ["卷内目录", "案卷目录", "全引目录", "简化目录"]
             if last_recipe in recipe_values:
                 self.recipe_var.set(last_recipe)
 
             # 加载行高计算方案
-            last_method = self.config_manager.get_last_height_method()
+            last_method = config['height_method']
             if last_method in self.available_methods:
                 display_name = self.method_display_names.get(last_method, last_method)
                 self.height_method_var.set(display_name)
-                set_calculation_method(last_method)
 
             # 加载路径配置
-            paths_config = self.config_manager.get_paths()
+            paths_config = config['paths']
             for path_key, entry_widget in self.paths.items():
                 path_value = paths_config.get(path_key, "")
-                if path_value:
+                # 内容相同时跳过，避免无效的Tcl调用
+                if path_value and entry_widget.get() != path_value:
                     entry_widget.delete(0, tk.END)
                     entry_widget.insert(0, path_value)
 
             # 加载可选参数
-            options_config = self.config_manager.get_options()
+            options_config = config['options']
             for option_key, entry_widget in self.options.items():
                 option_value = options_config.get(option_key, "")
-                if option_value:
+                if option_value and entry_widget.get() != option_value:
                     entry_widget.delete(0, tk.END)
                     entry_widget.insert(0, option_value)
             
             # 加载打印间隔控制配置
-            interval_config = self.config_manager.get_print_interval_config()
+            interval_config = config['print_interval']
             self.interval_enabled_var.set(interval_config.get('enabled', True))
             self.interval_task_count_var.set(str(interval_config.get('task_count', 3)))
             self.interval_seconds_var.set(str(interval_config.get('interval_seconds', 50)))
             
-            # 更新打印服务的间隔配置
-            self.print_service.set_interval_config(interval_config)
+            # 更新打印服务的间隔配置（尚未创建时由 _ensure_print_service 应用）
+            if self._print_service is not None:
+                self._print_service.set_interval_config(interval_config)
 
             # 更新路径显示（重要：在加载配置后更新）
             self.update_path_visibility()
@@ -742,8 +913,14 @@ class DirectoryGeneratorGUI(tk.Tk):
                     if self.current_task_thread.is_alive():
                         messagebox.showwarning("警告", "任务仍在运行，强制关闭程序")
             
+            # 关闭生成子进程
+            if self._generation_pool is not None:
+                self._generation_cancel_event.set()
+                self._generation_pool.shutdown(wait=False, cancel_futures=True)
+                self._generation_log_listener.stop()
+            
             # 关闭打印服务和所有相关线程
-            if hasattr(self, 'print_service'):
+            if self._print_service is not None:
                 logging.info("正在关闭打印服务...")
                 self.print_service.shutdown(timeout=3.0)  # 3秒超时
                 
@@ -751,6 +928,10 @@ class DirectoryGeneratorGUI(tk.Tk):
                 from utils.print_service import cleanup_print_service
                 cleanup_print_service()
             
+            # 停止配置保存线程，随后同步保存最终配置
+            self._config_save_queue.put(None)
+            self._config_save_thread.join(timeout=3.0)
+            
             # 保存窗口几何信息
             geometry = self.geometry()
             self.config_manager.set_window_geometry(geometry)
@@ -761,8 +942,45 @@ class DirectoryGeneratorGUI(tk.Tk):
         except Exception as e:
             logging.warning(f"关闭程序时发生异常: {e}")
         finally:
+            # 停止日志监听线程（会先处理完队列中剩余的记录）
+            self.log_listener.stop()
             self.destroy()
 
+    @property
+    def print_service(self):
+        """打印服务（首次访问时创建）"""
+        return self._ensure_print_service()
+    
+    def _ensure_print_service(self):
+        """按需导入并创建打印服务，并应用已保存的打印间隔配置"""
+        if self._print_service is None:
+            from utils.print_service import get_print_service
+            self._print_service = get_print_service()
+            self._print_service.set_interval_config(self.config_manager.get_print_interval_config())
+        return self._print_service
+    
+    def _mark_config_dirty(self):
+        """标记配置已修改，500ms内的多次修改只保存一次"""
+        self._config_dirty = True
+        if not self._config_flush_scheduled:
+            self._config_flush_scheduled = True
+            self.after(500, self._flush_config_if_dirty)
+    
+    def _flush_config_if_dirty(self):
+        """将待保存的配置交给后台线程写盘"""
+        self._config_flush_scheduled = False
+        if self._config_dirty:
+            self._config_dirty = False
+            self._config_save_queue.put(True)
+    
+    def _config_save_worker(self):
+        """后台保存配置，收到None时退出"""
+        while True:
+            item = self._config_save_queue.get()
+            if item is None:
+                break
+            self.config_manager.save_config()
+    
     def browse_path(self, entry_widget, is_directory, path_key):
         """打开文件/文件夹对话框并更新输入框。"""
         if is_directory:
@@ -774,7 +992,7 @@ class DirectoryGeneratorGUI(tk.Tk):
                     entry_widget.insert(0, path)
                     # 保存到配置
                     self.config_manager.set_path(path_key, path)
-                    self.config_manager.save_config()
+                    self._mark_config_dirty()
                     logging.info(f"已选择输出目录: {path}")
                 else:
                     messagebox.showerror("路径错误", "选择的目录不存在或没有写入权限")
@@ -792,7 +1010,7 @@ class DirectoryGeneratorGUI(tk.Tk):
                     entry_widget.insert(0, path)
                     # 保存到配置
                     self.config_manager.set_path(path_key, path)
-                    self.config_manager.save_config()
+                    self._mark_config_dirty()
                     logging.info(f"已选择文件: {path}")
                     
                     # 如果是档案数据文件，自动更新文件列表
@@ -809,7 +1027,7 @@ class DirectoryGeneratorGUI(tk.Tk):
         if messagebox.askyesno("确认", "确定要重置所有配置到默认值吗？这将清空所有路径和选项。"):
             # 重置配置管理器
             self.config_manager.config = self.config_manager._get_default_config()
-            self.config_manager.save_config()
+            self._mark_config_dirty()
             
             # 重新加载界面
             self.load_config()
@@ -849,53 +1067,98 @@ class DirectoryGeneratorGUI(tk.Tk):
 
     def process_log_queue(self):
         """从队列中获取日志消息并显示在文本控件中。"""
+        # 本次要插入的行；定长deque只保留最后能显示的行
+        lines = deque(maxlen=self.LOG_MAX_LINES)
         try:
-            batch_size = 20  # 增加批量处理数量，加快显示速度
-            messages = []
-            
-            for _ in range(batch_size):
-                try:
-                    record = self.log_queue.get(block=False)
-                    messages.append(record)
-                except queue.Empty:
-                    break
-            
-            if messages:
-                self.log_text.configure(state="normal")
-                self.log_text.insert(tk.END, "\n".join(messages) + "\n")
-                # 限制日志行数，防止内存占用过多
-                lines = self.log_text.get("1.0", tk.END).split("\n")
-                if len(lines) > 500:  # 保留最后500行
-                    self.log_text.delete("1.0", f"{len(lines)-500}.0")
-                self.log_text.configure(state="disabled")
-                self.log_text.see(tk.END)
+            # 按当前积压量取出消息（最多一屏上限），突发日志时不会越积越多
+            if self._log_event.is_set():
+                self._log_event.clear()
+                for _ in range(min(len(self.log_queue), self.LOG_MAX_LINES)):
+                    lines.extend(self.log_queue.popleft().splitlines() or [""])
+                if self.log_queue:
+                    self._log_event.set()
+            
+            if lines:
+                # 超过上限的旧行一次性删除，限制日志行数防止内存占用过多
+                excess = len(self._log_ids) + len(lines) - self.LOG_MAX_LINES
+                if excess > 0:
+                    self.log_tree.delete(*[self._log_ids.popleft() for _ in range(excess)])
+                for line in lines:
+                    self._log_ids.append(self.log_tree.insert("", "end", values=(line,)))
+                self.log_tree.see(self._log_ids[-1])
                 
         except Exception as e:
             # 防止日志处理异常影响主程序
-            pass
-        self.after(100, self.process_log_queue)  # 提高更新频率，从200ms改为100ms
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("处理日志队列失败: %r", e)
+        
+        if lines:
+            self._log_poll_delay = self.LOG_POLL_MIN_MS
+        else:
+            self._log_poll_delay = min(self._log_poll_delay * 2, self.LOG_POLL_MAX_MS)
+        self.after(self._log_poll_delay, self.process_log_queue)
 
     def update_progress(self, value, text):
-        """更新进度条和标签"""
-        self.after(0, lambda: self._safe_update_progress(value, text))
+        """更新进度条和标签（可在工作线程中调用）"""
+        self._progress_q.append((value, text))
+    
+    def _drain_progress(self):
+        """定时应用最新的进度更新，多次更新只显示最后一次"""
+        latest = None
+        while self._progress_q:
+            latest = self._progress_q.popleft()
+        if latest is not None:
+            self._safe_update_progress(*latest)
+        self.after(100, self._drain_progress)
     
     def _safe_update_progress(self, value, text):
         """线程安全的进度更新"""
         try:
-            self.progress_var.set(value)
-            self.progress_label.config(text=text)
+            if value != self._last_progress_value:
+                self._last_progress_value = value
+                self.progress_var.set(value)
+            if text != self._last_progress_text:
+                self._last_progress_text = text
+                self.progress_label.config(text=text)
         except:
             pass
     
+    def _set_print_status(self, text):
+        """更新打印队列状态（值未变化时跳过），返回是否有变化"""
+        if text == self._last_print_status:
+            return False
+        self._last_print_status = text
+        self.print_status_var.set(text)
+        return True
+    
+    def _set_interval_status(self, text):
+        """更新间隔状态文本（值未变化时跳过），返回是否有变化"""
+        if text == self._last_interval_status:
+            return False
+        self._last_interval_status = text
+        self.interval_status_var.set(text)
+        return True
+    
+    def _set_skip_rest_state(self, state):
+        """更新跳过休息按钮状态（值未变化时跳过），返回是否有变化"""
+        if state == self._last_skip_state:
+            return False
+        self._last_skip_state = state
+        self.skip_rest_btn.config(state=state)
+        return True
+    
     def monitor_print_status(self):
         """监控打印状态"""
+        # 本次是否有状态变化或待打印任务，决定下次轮询间隔
+        active = False
         try:
-            if hasattr(self, 'print_service'):
+            if self._print_service is not None:
                 stats = self.print_service.get_print_stats()
                 pending_count = self.print_service.get_pending_print_count()
+                active = pending_count > 0
                 
                 status_text = f"打印队列: {pending_count} | 已完成: {stats['total_completed']} | 失败: {stats['total_failed']}"
-                self.print_status_var.set(status_text)
+                active |= self._set_print_status(status_text)
                 
                 # 监控当前选择的打印机的间隔状态
                 current_printer = self.printer_var.get()
@@ -906,30 +1169,34 @@ class DirectoryGeneratorGUI(tk.Tk):
                         # 显示休息状态和倒计时
                         remaining = rest_info['remaining_seconds']
                         interval_text = f"打印暂时停止，剩余 {remaining} 秒"
-                        self.interval_status_var.set(interval_text)
-                        self.skip_rest_btn.config(state="normal")
+                        active |= self._set_interval_status(interval_text)
+                        active |= self._set_skip_rest_state("normal")
                     else:
                         # 显示当前任务计数
                         task_count = rest_info['task_count']
                         if task_count > 0:
                             interval_text = f"当前打印机已完成 {task_count} 个任务"
-                            self.interval_status_var.set(interval_text)
+                            active |= self._set_interval_status(interval_text)
                         else:
-                            self.interval_status_var.set("")
-                        self.skip_rest_btn.config(state="disabled")
+                            active |= self._set_interval_status("")
+                        active |= self._set_skip_rest_state("disabled")
                 else:
-                    self.interval_status_var.set("")
-                    self.skip_rest_btn.config(state="disabled")
+                    active |= self._set_interval_status("")
+                    active |= self._set_skip_rest_state("disabled")
                     
         except Exception as e:
-            logging.error(f"监控打印状态时发生异常: {e}")
-            self.interval_status_var.set("状态监控异常")
-            self.skip_rest_btn.config(state="disabled")
+            logger.error("监控打印状态时发生异常: %s", e)
+            self._set_interval_status("状态监控异常")
+            self._set_skip_rest_state("disabled")
         
-        # 每2秒更新一次状态
-        self.after(2000, self.monitor_print_status)
+        # 有变化时每2秒更新一次状态，空闲时逐步放慢
+        if active:
+            self._status_poll_delay = self.STATUS_POLL_MIN_MS
+        else:
+            self._status_poll_delay = min(self._status_poll_delay * 2, self.STATUS_POLL_MAX_MS)
+        self.after(self._status_poll_delay, self.monitor_print_status)
     
-    def on_print_mode_changed(self, *args):
+    def on_print_mode_changed(self):
         """当打印模式改变时的回调"""
         mode = self.print_mode_var.get()
         if mode == "batch":
@@ -963,7 +1230,7 @@ class DirectoryGeneratorGUI(tk.Tk):
             }
             
             self.config_manager.set_print_interval_config(interval_config)
-            self.config_manager.save_config()
+            self._mark_config_dirty()
             
             # 更新打印服务配置
             self.print_service.set_interval_config(interval_config)
@@ -975,6 +1242,29 @@ class DirectoryGeneratorGUI(tk.Tk):
         except Exception as e:
             logging.error(f"更新间隔控制配置失败: {e}")
     
+    def _validate_interval(self, value):
+        """
+        间隔设置输入框失去焦点时的validatecommand。
+        
+        校验中修改textvariable会使Tk关闭该控件的验证，因此实际的
+        校验与保存推迟到空闲时由on_interval_settings_changed完成。
+        """
+        self.after_idle(self.on_interval_settings_changed)
+        return True
+    
+    def _validate_copies(self, action, value, text):
+        """
+        份数输入框的validatecommand，只接受1-10的整数，输入框不会为空。
+        
+        选中后直接输入时Tk先删除选区（清空被拒绝）再插入，拼接结果无效
+        而输入的数字本身有效时，在空闲时用输入的数字替换整个值。
+        """
+        if value.isdigit() and 1 <= int(value) <= 10:
+            return True
+        if action == '1' and text.isdigit() and 1 <= int(text) <= 10:
+            self.after_idle(self.print_copies_var.set, int(text))
+        return False
+    
     def skip_printer_rest(self):
         """跳过当前打印机的休息时间"""
         try:
@@ -1003,6 +1293,7 @@ class DirectoryGeneratorGUI(tk.Tk):
                 catalog_path = xls2xlsx(catalog_path)
             
             # 读取Excel数据
+            import pandas as pd
             df = pd.read_excel(catalog_path)
             logging.info(f"成功读取Excel文件，列名: {list(df.columns)}, 行数: {len(df)}")
             
@@ -1278,7 +1569,11 @@ class DirectoryGeneratorGUI(tk.Tk):
         """刷新打印机列表"""
         try:
             printers = self.print_service.refresh_printers()
-            self.printer_combo['values'] = printers
+            # 打印机列表未变化时不重新设置下拉框内容
+            signature = tuple(printers)
+            if signature != self._printers_sig:
+                self._printers_sig = signature
+                self.printer_combo['values'] = printers
             
             # 设置默认打印机
             default_printer = self.print_service.get_default_printer()
@@ -1309,15 +1604,15 @@ class DirectoryGeneratorGUI(tk.Tk):
             return
         
         try:
-            copies = int(self.print_copies_var.get())
+            copies = self.print_copies_var.get()
             printer_name = self.printer_var.get()
             
-            # 添加打印任务到队列
-            for file_path in file_paths:
-                self.print_service.add_print_job(file_path, printer_name, copies)
-            
-            # 启动批量打印
-            self.print_service.start_batch_printing()
+            # 放入打印服务队列后立即返回，由分发线程按批打印；完成情况在GUI线程中轮询
+            futures = [
+                self.print_service.queue_print_job(file_path, printer_name, copies)
+                for file_path in file_paths
+            ]
+            self.after(1000, self._poll_batch_print, futures)
             
             logging.info(f"已添加 {len(file_paths)} 个文件到打印队列")
             messagebox.showinfo("信息", f"已添加 {len(file_paths)} 个文件到打印队列\n打印机: {printer_name}")
@@ -1328,6 +1623,19 @@ class DirectoryGeneratorGUI(tk.Tk):
             logging.error(f"批量打印失败: {e}")
             messagebox.showerror("错误", f"批量打印失败: {e}")
 
+    def _poll_batch_print(self, futures):
+        """轮询批量打印任务，全部结束后记录结果（不阻塞GUI线程）"""
+        done, not_done = concurrent.futures.wait(futures, timeout=0)
+        if not_done:
+            self.after(1000, self._poll_batch_print, futures)
+            return
+        
+        succeeded = sum(
+            1 for future in done
+            if not future.cancelled() and future.exception() is None and future.result()
+        )
+        logging.info(f"批量打印结束: 成功 {succeeded} 个，失败 {len(futures) - succeeded} 个")
+
     def run_generation_thread(self):
         """在单独的线程中启动目录生成任务，以防UI冻结。"""
         # 检查是否有任务正在运行
@@ -1337,10 +1645,12 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         # 创建取消标志
         self.cancel_flag = threading.Event()
+        if self._generation_cancel_event is not None:
+            self._generation_cancel_event.clear()
+        self._worker_height_stats = None
         
         self.start_button.config(state="disabled", text="正在生成...")
-        self.progress_var.set(0)
-        self.progress_label.config(text="正在初始化...")
+        self._safe_update_progress(0, "正在初始化...")
         
         # 创建并启动新的工作线程
         self.current_task_thread = threading.Thread(
@@ -1359,8 +1669,10 @@ class DirectoryGeneratorGUI(tk.Tk):
         """取消当前正在运行的任务"""
         if hasattr(self, 'cancel_flag'):
             self.cancel_flag.set()
+            if self._generation_cancel_event is not None:
+                self._generation_cancel_event.set()
             logging.info("用户请求取消任务")
-            self.progress_label.config(text="正在取消...")
+            self._safe_update_progress(self.progress_var.get(), "正在取消...")
             
             # 更新按钮状态（不禁用，显示取消中状态）
             self.cancel_button.config(text="取消中...", state="disabled")
@@ -1407,7 +1719,7 @@ class DirectoryGeneratorGUI(tk.Tk):
             # 获取打印参数
             print_mode = self.print_mode_var.get()
             printer_name = self.printer_var.get() if print_mode in ["direct", "batch"] else None
-            print_copies = int(self.print_copies_var.get()) if print_mode in ["direct", "batch"] else 1
+            print_copies = self.print_copies_var.get() if print_mode in ["direct", "batch"] else 1
             direct_print = print_mode == "direct"
 
             # 更新进度
@@ -1561,13 +1873,15 @@ class DirectoryGeneratorGUI(tk.Tk):
             logging.info("任务成功完成！")
             
             # 更新进度显示
-            self.progress_var.set(100)
-            self.progress_label.config(text="任务完成！")
+            self.update_progress(100, "任务完成！")
             
             # 显示性能统计
             try:
-                calculator = get_height_calculator()
-                stats = calculator.get_performance_stats()
+                # 在子进程中生成时使用子进程返回的统计
+                stats = self._worker_height_stats
+                if stats is None:
+                    from core.enhanced_height_calculator import get_height_calculator
+                    stats = get_height_calculator().get_performance_stats()
                 
                 logging.info("=" * 40)
                 logging.info("行高计算性能统计:")
@@ -1618,8 +1932,7 @@ class DirectoryGeneratorGUI(tk.Tk):
             messagebox.showerror("意外错误", user_msg)
         finally:
             self.start_button.config(state="normal", text="开始生成")
-            self.progress_var.set(0)
-            self.progress_label.config(text="准备就绪")
+            self.update_progress(0, "准备就绪")
             
             # 恢复按钮状态：隐藏取消按钮，显示开始按钮
             self.cancel_button.pack_forget()
@@ -1631,6 +1944,49 @@ class DirectoryGeneratorGUI(tk.Tk):
                 del self.cancel_flag
 
 
+    def _ensure_generation_pool(self):
+        """按需创建单进程的生成进程池，子进程日志经队列转发到本进程的日志处理器"""
+        if self._generation_pool is None:
+            context = multiprocessing.get_context("spawn")
+            if self._generation_log_listener is None:
+                self._generation_cancel_event = context.Event()
+                log_queue = context.Queue()
+                self._generation_log_listener = logging.handlers.QueueListener(
+                    log_queue, *self._log_handlers, respect_handler_level=True
+                )
+                self._generation_log_listener.start()
+            self._generation_pool = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=context,
+                initializer=_init_generation_worker,
+                initargs=(self._generation_log_listener.queue, self._generation_cancel_event),
+            )
+        return self._generation_pool
+    
+    def _call_recipe(self, recipe_func, direct_print=False, **kwargs):
+        """
+        执行目录配方。
+        
+        计算密集的生成在独立进程中执行，避免与界面线程争用GIL；
+        边转换边打印时需要与界面共用打印服务，仍在当前线程中执行。
+        """
+        if direct_print:
+            import utils.recipes
+            getattr(utils.recipes, recipe_func)(
+                direct_print=True, cancel_flag=getattr(self, 'cancel_flag', None), **kwargs
+            )
+            return
+        
+        from core.enhanced_height_calculator import get_height_calculator
+        future = self._ensure_generation_pool().submit(
+            _run_recipe, recipe_func, get_height_calculator().method, kwargs
+        )
+        try:
+            self._worker_height_stats = future.result()
+        except BrokenProcessPool:
+            self._generation_pool = None
+            raise RuntimeError("生成子进程异常退出")
+    
     def _execute_legacy_generation(self, recipe, params, convert_mode, selected_file_numbers, direct_print, printer_name, print_copies):
         """执行传统的目录生成实现。"""
         if recipe == "全引目录":
@@ -1653,7 +2009,8 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         if convert_mode == "selected" and selected_file_numbers:
             for selected_file in selected_file_numbers:
-                create_qy_full_index(
+                self._call_recipe(
+                    "create_qy_full_index",
                     jn_catalog_path=params["jn_catalog_path"],
                     aj_catalog_path=params["aj_catalog_path"],
                     template_path=params["template_path"],
@@ -1662,11 +2019,11 @@ class DirectoryGeneratorGUI(tk.Tk):
                     end_file=selected_file,
                     direct_print=direct_print,
                     printer_name=printer_name,
-                    print_copies=print_copies,
-                    cancel_flag=getattr(self, 'cancel_flag', None)
+                    print_copies=print_copies
                 )
         else:
-            create_qy_full_index(
+            self._call_recipe(
+                "create_qy_full_index",
                 jn_catalog_path=params["jn_catalog_path"],
                 aj_catalog_path=params["aj_catalog_path"],
                 template_path=params["template_path"],
@@ -1675,8 +2032,7 @@ class DirectoryGeneratorGUI(tk.Tk):
                 end_file=params["end_file"],
                 direct_print=direct_print,
                 printer_name=printer_name,
-                print_copies=print_copies,
-                cancel_flag=getattr(self, 'cancel_flag', None)
+                print_copies=print_copies
             )
     
     def _execute_case_index_legacy(self, params, direct_print, printer_name, print_copies):
@@ -1686,7 +2042,8 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         if convert_mode == "selected" and selected_file_numbers:
             for selected_file in selected_file_numbers:
-                create_aj_index(
+                self._call_recipe(
+                    "create_aj_index",
                     catalog_path=params["aj_catalog_path"],
                     template_path=params["template_path"],
                     output_folder=params["output_folder"],
@@ -1694,11 +2051,11 @@ class DirectoryGeneratorGUI(tk.Tk):
                     end_file=selected_file,
                     direct_print=direct_print,
                     printer_name=printer_name,
-                    print_copies=print_copies,
-                    cancel_flag=getattr(self, 'cancel_flag', None)
+                    print_copies=print_copies
                 )
         else:
-            create_aj_index(
+            self._call_recipe(
+                "create_aj_index",
                 catalog_path=params["aj_catalog_path"],
                 template_path=params["template_path"],
                 output_folder=params["output_folder"],
@@ -1706,8 +2063,7 @@ class DirectoryGeneratorGUI(tk.Tk):
                 end_file=params["end_file"],
                 direct_print=direct_print,
                 printer_name=printer_name,
-                print_copies=print_copies,
-                cancel_flag=getattr(self, 'cancel_flag', None)
+                print_copies=print_copies
             )
     
     def _execute_volume_index_legacy(self, recipe, params, convert_mode, selected_file_numbers, direct_print, printer_name, print_copies):
@@ -1719,7 +2075,8 @@ class DirectoryGeneratorGUI(tk.Tk):
         
         if convert_mode == "selected" and selected_file_numbers:
             for selected_file in selected_file_numbers:
-                create_jn_or_jh_index(
+                self._call_recipe(
+                    "create_jn_or_jh_index",
                     catalog_path=params[catalog_path_key],
                     template_path=params["template_path"],
                     output_folder=params["output_folder"],
@@ -1728,11 +2085,11 @@ class DirectoryGeneratorGUI(tk.Tk):
                     end_file=selected_file,
                     direct_print=direct_print,
                     printer_name=printer_name,
-                    print_copies=print_copies,
-                    cancel_flag=getattr(self, 'cancel_flag', None)
+                    print_copies=print_copies
                 )
         else:
-            create_jn_or_jh_index(
+            self._call_recipe(
+                "create_jn_or_jh_index",
                 catalog_path=params[catalog_path_key],
                 template_path=params["template_path"],
                 output_folder=params["output_folder"],
@@ -1741,11 +2098,11 @@ class DirectoryGeneratorGUI(tk.Tk):
                 end_file=params["end_file"],
                 direct_print=direct_print,
                 printer_name=printer_name,
-                print_copies=print_copies,
-                cancel_flag=getattr(self, 'cancel_flag', None)
+                print_copies=print_copies
             )
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = DirectoryGeneratorGUI()
     app.mainloop()
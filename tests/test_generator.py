@@ -176,6 +176,22 @@ class TestTemplateHandling:
         result = prepare_template('/nonexistent/template.xlsx')
         assert result is None
     
+    def test_prepare_template_cache_invalidation(self, test_env):
+        """测试模板修改后缓存失效"""
+        from core.generator import prepare_template
+        
+        template_path = os.path.join(test_env.temp_dir, 'cached_template.xlsx')
+        with open(template_path, 'wb') as f:
+            f.write(b'first')
+        test_env.temp_files.append(template_path)
+        
+        assert prepare_template(template_path).getvalue() == b'first'
+        
+        # 内容和大小都变化后应重新读取
+        with open(template_path, 'wb') as f:
+            f.write(b'second version')
+        assert prepare_template(template_path).getvalue() == b'second version'
+    
     def test_cleanup_stream(self):
         """测试流清理功能"""
         from core.generator import cleanup_stream
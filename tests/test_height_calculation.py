@@ -203,6 +203,48 @@ class TestHeightMeasureModules:
         except ImportError:
             pytest.skip("GDI模块不可用")
     
+    @skip_on_non_windows
+    def test_gdi_wrap_matches_drawtext(self):
+        """测试Python换行模拟与DrawText的行数一致（中英文混排语料）"""
+        try:
+            import win32gui
+            from height_measure.gdi_measure import (
+                PrinterTextMeasurer, FontSpec, _HALF_WIDTH_BLOCK, _SOFT_BREAK_REPL,
+                _text_extents, _wrap_line_count
+            )
+            measurer = PrinterTextMeasurer().__enter__()
+        except Exception as e:
+            pytest.skip(f"GDI打印机不可用: {e}")
+        
+        corpus = [
+            "［厦门市海沧区］征拆工作专题会议的纪要［2022年８月２５日，厦门市海沧区东孚街道党工委书记赖大庆主持召开会议，"
+            "研究关于鼎美村原房屋权证登记时误采用谐音字或方言谐音导致与身份证名字不一致的相关问题］",
+            "关于印发《档案管理办法（试行）》的通知",
+            "厦府〔2023〕12号 关于ABC-123/4项目的批复（附件：3份）。",
+            "Annual report 2023, section 4.2: overview of archive-management procedures",
+            "会议纪要：第1次、第2次、第3次……共计10次。",
+            "题名“项目验收”意见书；备注：见附件",
+        ]
+        spec = FontSpec("SimSun", 11)
+        try:
+            old = win32gui.SelectObject(measurer._hdc, measurer._hfont_for(spec))
+            try:
+                for text in corpus:
+                    processed = _HALF_WIDTH_BLOCK.sub(_SOFT_BREAK_REPL, text)
+                    extents = _text_extents(measurer._hdc, processed)
+                    for width_px in range(100, extents[-1] + 50, 7):
+                        emulated = [_wrap_line_count(processed, extents, w)
+                                    for w in (width_px - 1, width_px, width_px + 1)]
+                        # 距换行点1像素以内时生产代码直接使用DrawText，不比较
+                        if len(set(emulated)) != 1:
+                            continue
+                        assert emulated[1] == measurer._drawtext_line_count(processed, width_px), \
+                            (text, width_px)
+            finally:
+                win32gui.SelectObject(measurer._hdc, old)
+        finally:
+            measurer.__exit__(None, None, None)
+    
     def test_pillow_basic_measurement(self):
         """测试Pillow基础测量功能"""
         try:
@@ -222,6 +264,32 @@ class TestHeightMeasureModules:
         except ImportError:
             pytest.skip("Pillow模块不可用")
 
+    def test_pillow_fast_path_matches_wrap(self):
+        """测试Pillow单行快速路径与逐字折行的判断一致（整段测宽含字距调整时）"""
+        try:
+            from height_measure import pillow_measure
+        except ImportError:
+            pytest.skip("Pillow模块不可用")
+        
+        class KernedFont:
+            """逐字宽度10px，整段测宽时相邻字符各收紧0.5px"""
+            def getlength(self, text):
+                return 10.0 * len(text) - 0.5 * max(len(text) - 1, 0)
+        
+        font = KernedFont()
+        with patch.object(pillow_measure, '_load_font', return_value=font), \
+             patch.object(pillow_measure, '_font_line_height', return_value=13.5):
+            for text in ["测试文本", "AVAWATa", "Title 2023"]:
+                processed = pillow_measure._inject_soft_breaks(text)
+                for width_px in range(10, 120):
+                    for safe in (False, True):
+                        lines = pillow_measure._wrap_and_count_lines(processed, width_px, font)
+                        is_edge = bool(safe and pillow_measure._wrap_and_count_lines(
+                            processed, max(width_px - 1, 10), font) > lines)
+                        result = pillow_measure._measure_lines.__wrapped__(
+                            text, width_px, "test", 11.0, safe)
+                        assert result == (lines, 13.5, is_edge), (text, width_px, safe)
+
 class TestHeightCalculationEdgeCases:
     """测试行高计算的边界情况"""
     
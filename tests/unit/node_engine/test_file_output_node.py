@@ -10,9 +10,10 @@ import tempfile
 import json
 import pandas as pd
 from pathlib import Path
+from unittest.mock import patch
 
 from core.node_interfaces import NodeInput, NodeStatus, ValidationSeverity
-from core.node_engine.nodes.file_output_node import FileOutputNode
+from core.node_engine.nodes.file_output_node import FileOutputNode, _fs_probe
 
 
 class TestFileOutputNode:
@@ -152,6 +153,55 @@ class TestFileOutputNode:
         info_results = [r for r in results if r.severity == ValidationSeverity.INFO]
         assert any("Created output directory" in r.message for r in info_results)
     
+    def test_fs_probe(self, temp_dir):
+        """Test batched filesystem probe reports files, dirs and missing paths."""
+        existing = temp_dir / "existing.csv"
+        existing.write_text("a,b")
+        missing_dir = temp_dir / "missing"
+        
+        probe = _fs_probe([temp_dir, existing, temp_dir / "absent.csv",
+                           missing_dir, missing_dir / "out.csv"])
+        
+        assert probe[temp_dir] is False
+        assert probe[existing] is True
+        assert probe[temp_dir / "absent.csv"] is None
+        assert probe[missing_dir] is None
+        assert probe[missing_dir / "out.csv"] is None
+    
+    def test_validation_sees_filesystem_changes(self, temp_dir, excel_template):
+        """Test repeated validations re-probe the template and output file."""
+        output_path = temp_dir / "output.csv"
+        config = {
+            'output_path': str(output_path),
+            'template_path': str(excel_template),
+            'format': 'excel'
+        }
+        node = FileOutputNode("file_output_1", config)
+        input_data = NodeInput(data={"data": []})
+        
+        codes = [r.error_code for r in node.validate_input(input_data)]
+        assert "TEMPLATE_NOT_FOUND" not in codes and "FILE_EXISTS" not in codes
+        
+        excel_template.unlink()
+        output_path.write_text("a,b")
+        codes = [r.error_code for r in node.validate_input(input_data)]
+        assert "TEMPLATE_NOT_FOUND" in codes
+        assert "FILE_EXISTS" in codes
+    
+    def test_format_change_after_construction(self, temp_dir, sample_data):
+        """Test the writer follows a format changed after construction."""
+        output_path = temp_dir / "output.dat"
+        node = FileOutputNode("file_output_1", {'output_path': str(output_path), 'format': 'csv'})
+        node.process(NodeInput(data={"data": sample_data}))
+        assert output_path.read_text(encoding="utf-8-sig").startswith("id,name")
+        
+        node.format = 'json'
+        node.overwrite = True
+        output = node.process(NodeInput(data={"data": sample_data}))
+        
+        assert output.status == NodeStatus.COMPLETED
+        assert json.loads(output_path.read_text())[0]['name'] == 'Document 1'
+    
     def test_process_excel_simple(self, temp_dir, sample_data):
         """Test simple Excel output without template."""
         output_path = temp_dir / "output.xlsx"
@@ -477,6 +527,22 @@ class TestFileOutputNode:
         assert 'output_file' in output_schema['properties']
         assert 'statistics' in output_schema['properties']
         assert 'file_info' in output_schema['properties']
+    
+    def test_get_schema_cached(self):
+        """Test schema is built once and callers get independent copies."""
+        with patch.object(FileOutputNode, '_SCHEMA_CACHE', None), \
+             patch.object(FileOutputNode, '_build_schema', autospec=True,
+                          side_effect=FileOutputNode._build_schema) as build:
+            first = FileOutputNode("file_output_1").get_schema()
+            first['supported_formats'].append('xml')
+            first['output_schema']['properties'].clear()
+            second = FileOutputNode("file_output_2").get_schema()
+        
+        assert build.call_count == 1
+        assert first is not second
+        assert 'xml' not in second['supported_formats']
+        assert 'output_file' in second['output_schema']['properties']
+        assert FileOutputNode.SUPPORTED_FORMATS == ['excel', 'csv', 'json']
 
 
 if __name__ == "__main__":
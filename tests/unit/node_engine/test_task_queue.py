@@ -0,0 +1,272 @@
+"""
+Unit tests for SqliteTaskQueue.
+
+Tests schema creation, connection pooling and queue bookkeeping
+against a temporary SQLite database.
+"""
+
+import pytest
+import sqlite3
+from dataclasses import asdict
+import gc
+import tempfile
+import threading
+import weakref
+from datetime import datetime, timezone
+from pathlib import Path
+
+from core.node_interfaces import NodeInput, NodeOutput, NodeStatus
+from core.node_engine.task_queue import (
+    SqliteTaskQueue, Task, TaskNotFoundError, TaskQueueError, _pack_payload, _parse_ts, _serialize_input, _serialize_output
+)
+
+
+class TestSqliteTaskQueue:
+    """Test SqliteTaskQueue functionality."""
+    
+    @pytest.fixture
+    def task_queue(self):
+        """Create a task queue backed by a temporary database."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            task_queue = SqliteTaskQueue(str(Path(temp_dir) / "queue.db"))
+            yield task_queue
+            task_queue.close()
+    
+    def test_indexes_created(self, task_queue):
+        """Test indexes are created as standalone statements."""
+        with task_queue._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'tasks'"
+            ).fetchall()
+        
+        names = {row['name'] for row in rows}
+        assert {'idx_status_priority', 'idx_workflow_id', 'idx_completed_status'} <= names
+    
+    def test_connection_per_thread(self, task_queue):
+        """Test each thread reuses its own long-lived connection."""
+        with task_queue._get_connection() as first:
+            pass
+        with task_queue._get_connection() as second:
+            pass
+        
+        other = []
+        
+        def worker():
+            with task_queue._get_connection() as conn:
+                other.append(conn)
+                conn.execute("SELECT 1")
+        
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        
+        assert first is second
+        assert other[0] is not first
+    
+    def test_unreferenced_queue_released(self):
+        """Test neither atexit nor the optimize thread keeps a queue alive."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            task_queue = SqliteTaskQueue(str(Path(temp_dir) / "queue.db"))
+            ref = weakref.ref(task_queue)
+            stop = task_queue._stop_optimize
+            task_queue.close()
+            del task_queue
+            gc.collect()
+            
+            assert ref() is None
+            assert stop.is_set()
+    
+    def test_empty_queue_stats(self, task_queue):
+        """Test statistics for an empty queue."""
+        stats = task_queue.get_queue_stats()
+        
+        assert set(stats) == {status.name for status in NodeStatus}
+        assert all(count == 0 for count in stats.values())
+        assert task_queue.get_next_ready_task() is None
+
+    
+    def test_dependency_ordering(self, task_queue):
+        """Test tasks are only dispatched once their dependencies completed."""
+        task_queue.add_tasks([
+            Task("child", "node_b", "wf", NodeInput(data={}), dependencies=["root"], priority=5),
+            Task("root", "node_a", "wf", NodeInput(data={"value": 1})),
+        ])
+        
+        task = task_queue.get_next_ready_task()
+        assert task.task_id == "root"
+        assert task.status == NodeStatus.RUNNING
+        assert task.input_data.data == {"value": 1}
+        assert task_queue.get_next_ready_task() is None
+        
+        ready = task_queue.complete_and_get_ready("root", NodeOutput(data={"result": 2}))
+        assert ready == ["child"]
+        child = task_queue.get_next_ready_task()
+        assert child.task_id == "child"
+        assert child.dependencies == ["root"]
+    
+    def test_write_transaction_rolls_back(self, task_queue):
+        """Test a failed multi-statement write leaves no open transaction."""
+        with pytest.raises(TaskNotFoundError):
+            task_queue.complete_and_get_ready("missing", NodeOutput(data={}))
+        
+        with task_queue._get_connection() as conn:
+            assert conn.isolation_level is None
+            assert not conn.in_transaction
+    
+    def test_workflow_levels(self, task_queue):
+        """Test add_workflow dispatches tasks level by level."""
+        task_queue.add_workflow([
+            Task("c", "node_c", "wf", NodeInput(data={}), dependencies=["a", "b"], priority=9),
+            Task("b", "node_b", "wf", NodeInput(data={}), dependencies=["a"]),
+            Task("a", "node_a", "wf", NodeInput(data={})),
+        ])
+        with task_queue._get_connection() as conn:
+            levels = dict(conn.execute("SELECT task_id, dep_level FROM tasks").fetchall())
+        assert levels == {"a": 0, "b": 1, "c": 2}
+        
+        order = []
+        while True:
+            task = task_queue.get_next_ready_workflow_task("wf")
+            if task is None:
+                break
+            order.append(task.task_id)
+            assert task_queue.get_next_ready_workflow_task("wf") is None
+            task_queue.complete_task(task.task_id, NodeOutput(data={}))
+        assert order == ["a", "b", "c"]
+    
+    def test_workflow_cycle_rejected(self, task_queue):
+        """Test add_workflow refuses cyclic dependencies."""
+        with pytest.raises(ValueError):
+            task_queue.add_workflow([
+                Task("a", "node_a", "wf", NodeInput(data={}), dependencies=["b"]),
+                Task("b", "node_b", "wf", NodeInput(data={}), dependencies=["a"]),
+            ])
+        assert task_queue.get_workflow_tasks("wf") == []
+    
+    def test_legacy_dependency_column_migrated(self):
+        """Test JSON dependency columns are backfilled into task_deps."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = str(Path(temp_dir) / "legacy.db")
+            conn = sqlite3.connect(db_path)
+            conn.execute("""
+                CREATE TABLE tasks (
+                    task_id TEXT PRIMARY KEY, node_id TEXT NOT NULL,
+                    workflow_id TEXT NOT NULL, status TEXT NOT NULL,
+                    priority INTEGER DEFAULT 0, max_retries INTEGER DEFAULT 3,
+                    retry_count INTEGER DEFAULT 0, dependencies TEXT,
+                    input_data BLOB, output_data BLOB, error_message TEXT,
+                    created_at INTEGER NOT NULL, started_at INTEGER,
+                    completed_at INTEGER
+                )
+            """)
+            conn.execute(
+                "INSERT INTO tasks (task_id, node_id, workflow_id, status, dependencies, created_at) "
+                "VALUES ('b', 'n', 'wf', 'PENDING', '[\"a\"]', 0)"
+            )
+            conn.commit()
+            conn.close()
+            
+            task_queue = SqliteTaskQueue(db_path)
+            with task_queue._get_connection() as conn:
+                columns = {row['name'] for row in conn.execute("PRAGMA table_info(tasks)")}
+                edges = conn.execute("SELECT task_id, dep_id FROM task_deps").fetchall()
+            task_queue.close()
+        
+        assert 'dependencies' not in columns
+        assert [tuple(edge) for edge in edges] == [('b', 'a')]
+    
+    def test_output_round_trip(self, task_queue):
+        """Test completed task output is restored with enums and timestamps."""
+        task_queue.add_task(Task("t1", "node_a", "wf", NodeInput(data={"a": [1, 2]})))
+        task_queue.get_next_ready_task()
+        output = NodeOutput(data={"result": "ok"}, node_id="node_a", warnings=["w"])
+        task_queue.complete_task("t1", output)
+        
+        [task] = task_queue.get_workflow_tasks("wf")
+        assert task.status == NodeStatus.COMPLETED
+        assert task._output_raw is not None
+        assert task.output_data.data == {"result": "ok"}
+        assert task.output_data.status == NodeStatus.COMPLETED
+        assert task.output_data.timestamp == output.timestamp
+        assert task.output_data.warnings == ["w"]
+        assert task._output_raw is None
+        
+        assert task_queue.get_workflow_task_statuses("wf") == [("t1", NodeStatus.COMPLETED)]
+        
+        [meta_only] = task_queue.get_workflow_tasks("wf", include_payloads=False)
+        assert meta_only.status == NodeStatus.COMPLETED
+        assert meta_only.input_data is None
+        assert meta_only.output_data is None
+    
+    def test_payload_round_trip_int_keys_and_datetimes(self, task_queue):
+        """Test non-str map keys and nested datetimes survive a claim."""
+        naive = datetime(2025, 8, 17, 9, 30, 5, 123)
+        aware = datetime(2025, 8, 17, 9, 30, 5, tzinfo=timezone.utc)
+        node_input = NodeInput(data={"rows": {0: "a", 1: "b"}, "at": naive},
+                               metadata={"when": [naive, aware]})
+        task_queue.add_task(Task("t1", "n1", "w1", node_input))
+        
+        task = task_queue.get_next_ready_task()
+        assert task.input_data.data == {"rows": {0: "a", 1: "b"}, "at": naive}
+        assert task.input_data.data["at"].tzinfo is None
+        assert task.input_data.metadata["when"] == [naive, aware]
+        assert task.input_data.timestamp == node_input.timestamp
+    
+    def test_undecodable_claim_rolls_back(self, task_queue):
+        """Test a claim whose payload cannot be decoded leaves the task PENDING."""
+        task_queue.add_task(Task("t1", "n1", "w1", NodeInput(data={})))
+        with task_queue._get_connection() as conn:
+            conn.execute("UPDATE tasks SET input_data = ? WHERE task_id = 't1'", (b"\xc1",))
+        
+        with pytest.raises(TaskQueueError):
+            task_queue.get_next_ready_task()
+        assert task_queue.get_workflow_task_statuses("w1") == [("t1", NodeStatus.PENDING)]
+    
+    def test_serializers_match_asdict(self):
+        """Test direct field serialization produces the same payload as asdict."""
+        node_input = NodeInput(data={"rows": [{"a": 1}]}, metadata={"m": "x"}, node_id="n")
+        output = NodeOutput(data={"result": [1, 2]}, errors=["e"], processing_time_ms=1.5)
+        
+        assert _serialize_input(node_input) == _pack_payload(asdict(node_input))
+        assert _serialize_output(output) == _pack_payload(asdict(output))
+    
+    @pytest.mark.parametrize("value", [
+        datetime(2025, 8, 17, 9, 30, 5),
+        datetime(2025, 8, 17, 9, 30, 5, 123),
+    ])
+    def test_parse_ts_matches_fromisoformat(self, value):
+        """Test the fixed-position parser round-trips isoformat output."""
+        assert _parse_ts(value.isoformat()) == value
+    
+    def test_cleanup_old_tasks(self, task_queue):
+        """Test cleanup compares integer completion timestamps."""
+        task_queue.add_task(Task("t1", "node_a", "wf", NodeInput(data={})))
+        task_queue.get_next_ready_task()
+        task_queue.complete_task("t1", NodeOutput(data={}))
+        
+        assert task_queue.cleanup_old_tasks(older_than_days=1) == 0
+        assert task_queue.cleanup_old_tasks(older_than_days=-1) == 1
+        assert task_queue.get_workflow_tasks("wf") == []
+    
+    def test_incremental_auto_vacuum(self, task_queue):
+        """Test new databases are created with incremental auto-vacuum."""
+        with task_queue._get_connection() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        
+        task_queue.add_tasks([
+            Task(f"t{i}", "node_a", "wf", NodeInput(data={"blob": "x" * 2000}))
+            for i in range(50)
+        ])
+        with task_queue._get_connection() as conn:
+            conn.execute("UPDATE tasks SET status = 'COMPLETED', completed_at = 0")
+            conn.commit()
+        
+        assert task_queue.cleanup_old_tasks() == 50
+        with task_queue._get_connection() as conn:
+            assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        
+        task_queue.compact()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
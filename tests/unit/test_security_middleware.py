@@ -0,0 +1,234 @@
+"""
+Unit tests for the API security middleware helpers.
+
+Tests the verified-token caches, the background audit writer and the
+in-process sliding window rate limiter.
+"""
+
+import pytest
+import threading
+from unittest.mock import Mock, patch
+
+from core.audit_queue import AuditQueue, LazyAuthEvent
+from core.jwt_verification_cache import JWTVerificationCache, TokenCache
+from core.security_middleware import EndpointPermissionMapper, RateLimiter
+from utils.rbac_models import Permission
+
+
+class TestTokenCache:
+    """Test TokenCache functionality."""
+
+    def test_get_put(self):
+        """Test cached values are returned and unknown tokens miss."""
+        cache = TokenCache()
+        cache.put("token-a", {"user": 1})
+
+        assert cache.get("token-a") == {"user": 1}
+        assert cache.get("token-b") is None
+        assert len(cache) == 1
+
+    def test_ttl_expiry(self):
+        """Test entries expire ttl seconds after they were cached."""
+        cache = TokenCache(ttl=5.0)
+        with patch('core.jwt_verification_cache.time.time', return_value=1000.0):
+            cache.put("token", "value")
+
+        with patch('core.jwt_verification_cache.time.time', return_value=1004.0):
+            assert cache.get("token") == "value"
+        with patch('core.jwt_verification_cache.time.time', return_value=1005.0):
+            assert cache.get("token") is None
+        assert len(cache) == 0
+
+    def test_expired_value_not_cached(self):
+        """Test a value whose own expiry has passed is not stored."""
+        cache = TokenCache()
+        cache.put("token", "value", expires_at=0.0)
+
+        assert cache.get("token") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        """Test the least recently used token is evicted at maxsize."""
+        cache = TokenCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_raw_token_not_stored(self):
+        """Test entries are keyed by digest rather than the raw token."""
+        cache = TokenCache()
+        cache.put("secret-token", "value")
+
+        assert "secret-token" not in cache._entries
+        cache.clear()
+        assert len(cache) == 0
+
+
+class TestJWTVerificationCache:
+    """Test JWTVerificationCache functionality."""
+
+    def test_exp_claim_bounds_expiry(self):
+        """Test cached claims expire no later than the exp claim."""
+        cache = JWTVerificationCache(ttl=60.0)
+        with patch('core.jwt_verification_cache.time.time', return_value=1000.0):
+            cache.put("jwt", {"sub": "u1", "exp": 1002})
+
+        with patch('core.jwt_verification_cache.time.time', return_value=1001.0):
+            assert cache.get("jwt") == {"sub": "u1", "exp": 1002}
+        with patch('core.jwt_verification_cache.time.time', return_value=1002.0):
+            assert cache.get("jwt") is None
+
+    def test_expired_claims_not_cached(self):
+        """Test claims that are already expired are not cached."""
+        cache = JWTVerificationCache()
+        cache.put("jwt", {"sub": "u1", "exp": 1})
+
+        assert cache.get("jwt") is None
+
+
+class TestAuditQueue:
+    """Test AuditQueue functionality."""
+
+    def test_batching(self):
+        """Test queued events are drained in batches of at most batch_size."""
+        batches = []
+        entered = threading.Event()
+        release = threading.Event()
+
+        def sink(events):
+            batches.append(list(events))
+            entered.set()
+            release.wait(5)
+
+        audit_queue = AuditQueue(sink, batch_size=4)
+        try:
+            # Hold the writer in the sink while the next events queue up
+            audit_queue.put(0)
+            assert entered.wait(5)
+            for event in range(1, 11):
+                assert audit_queue.put(event)
+            release.set()
+            audit_queue.flush()
+        finally:
+            release.set()
+            audit_queue.close()
+
+        assert batches == [[0], [1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+
+    def test_lazy_events_built_by_writer(self):
+        """Test LazyAuthEvent is built by the writer and failures are skipped."""
+        written = []
+
+        def broken():
+            raise ValueError("bad event")
+
+        audit_queue = AuditQueue(written.extend)
+        audit_queue.put(LazyAuthEvent(lambda a, b: f"{a}-{b}", "x", "y"))
+        audit_queue.put(LazyAuthEvent(broken))
+        audit_queue.put("plain")
+        audit_queue.close()
+
+        assert written == ["x-y", "plain"]
+
+    def test_full_queue_drops(self):
+        """Test events are dropped and counted when the queue is full."""
+        release = threading.Event()
+        audit_queue = AuditQueue(lambda events: release.wait(5), maxsize=1, batch_size=1)
+        try:
+            accepted = [audit_queue.put(i) for i in range(5)]
+        finally:
+            release.set()
+            audit_queue.close()
+
+        assert not all(accepted)
+        assert audit_queue.dropped_events == accepted.count(False)
+
+
+class TestRateLimiter:
+    """Test RateLimiter in-process windows."""
+
+    @pytest.fixture
+    def rate_limiter(self):
+        """Create a rate limiter without touching the security database."""
+        with patch('core.security_middleware.get_security_manager', return_value=Mock()):
+            yield RateLimiter()
+
+    def test_limit_and_retry_after(self, rate_limiter):
+        """Test requests beyond the limit are refused until the window slides."""
+        with patch('core.security_middleware.time.time', return_value=1000.0):
+            assert rate_limiter._check_key("u1", 2, 1) == (True, 0)
+        with patch('core.security_middleware.time.time', return_value=1010.0):
+            assert rate_limiter._check_key("u1", 2, 1) == (True, 0)
+            assert rate_limiter._check_key("u1", 2, 1) == (False, 50)
+
+        # The first request leaves the 60 second window
+        with patch('core.security_middleware.time.time', return_value=1060.0):
+            assert rate_limiter._check_key("u1", 2, 1) == (True, 0)
+
+    def test_keys_are_independent(self, rate_limiter):
+        """Test each key has its own window."""
+        assert rate_limiter._check_key("u1", 1, 1) == (True, 0)
+        assert rate_limiter._check_key("u1", 1, 1)[0] is False
+        assert rate_limiter._check_key("ip:10.0.0.1", 1, 1) == (True, 0)
+
+    @pytest.fixture
+    def single_shard_limiter(self):
+        """Create a rate limiter with one small shard."""
+        with patch('core.security_middleware.get_security_manager', return_value=Mock()), \
+             patch.object(RateLimiter, 'SHARD_COUNT', 1), \
+             patch.object(RateLimiter, 'MAX_KEYS_PER_SHARD', 3):
+            yield RateLimiter()
+
+    def test_idle_keys_forgotten(self, single_shard_limiter):
+        """Test keys whose window has emptied are removed."""
+        requests, _ = single_shard_limiter._shards[0]
+        with patch('core.security_middleware.time.time', return_value=1000.0):
+            single_shard_limiter._check_key("ip:10.0.0.1", 5, 1)
+            single_shard_limiter._check_key("ip:10.0.0.2", 5, 1)
+        with patch('core.security_middleware.time.time', return_value=2000.0):
+            single_shard_limiter._check_key("u1", 5, 1)
+
+        assert list(requests) == ["u1"]
+
+    def test_key_count_capped(self, single_shard_limiter):
+        """Test the least recently seen keys are evicted above the cap."""
+        requests, _ = single_shard_limiter._shards[0]
+        for i in range(10):
+            single_shard_limiter._check_key(f"ip:10.0.0.{i}", 5, 1)
+
+        assert list(requests) == ["ip:10.0.0.7", "ip:10.0.0.8", "ip:10.0.0.9"]
+
+
+
+class TestEndpointPermissionMapper:
+    """Test EndpointPermissionMapper resolution."""
+
+    def test_single_wildcard_patterns(self):
+        """Test single-wildcard patterns match exactly one path segment."""
+        mapper = EndpointPermissionMapper()
+
+        assert mapper.get_required_permissions("put", "/api/v1/users/42/roles") == (Permission.ROLE_MANAGE,)
+        assert mapper.get_required_permissions("GET", "/api/v1/users/alice") == (Permission.USER_MANAGE,)
+        assert mapper.get_required_permissions("POST", "/api/v1/directories/7/generate") == \
+            (Permission.DIRECTORY_GENERATE,)
+        # '*' does not span segments, so this falls back to the method default
+        assert mapper.get_required_permissions("GET", "/api/v1/files/a/b") == (Permission.DIRECTORY_READ,)
+
+    def test_multi_wildcard_and_mapping_order(self):
+        """Test multi-wildcard patterns and that the earliest mapping wins."""
+        mapper = EndpointPermissionMapper()
+        mapper.add_mapping("GET", "/api/v1/workflows/*/runs/*", [Permission.WORKFLOW_READ])
+        mapper.add_mapping("GET", "/api/v1/workflows/*/runs/latest", [Permission.WORKFLOW_EXECUTE])
+
+        assert mapper.get_required_permissions("GET", "/api/v1/workflows/abc/runs/9") == (Permission.WORKFLOW_READ,)
+        assert mapper.get_required_permissions("GET", "/api/v1/workflows/abc/runs/latest") == \
+            (Permission.WORKFLOW_READ,)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -6,6 +6,7 @@
 import json
 import logging
 import os
+import threading
 from typing import Dict, Any, Optional
 
 
@@ -21,6 +22,8 @@ class ConfigManager:
         """
         self.config_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), config_file)
         self.config = self._load_config()
+        # 保护配置的修改与写盘，允许在后台线程中保存
+        self._lock = threading.RLock()
     
     def _load_config(self) -> Dict[str, Any]:
         """从文件加载配置"""
@@ -227,7 +230,7 @@ class ConfigManager:
             # 确保目录存在
             os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
             
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            with self._lock, open(self.config_file, 'w', encoding='utf-8') as f:
                 json.dump(self.config, f, indent=2, ensure_ascii=False)
             return True
         except OSError as e:
@@ -250,15 +253,17 @@ class ConfigManager:
     def set(self, key: str, value: Any) -> None:
         """设置配置项"""
         keys = key.split('.')
-        config = self.config
         
-        # 创建嵌套字典结构
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        
-        config[keys[-1]] = value
+        with self._lock:
+            config = self.config
+            
+            # 创建嵌套字典结构
+            for k in keys[:-1]:
+                if k not in config:
+                    config[k] = {}
+                config = config[k]
+            
+            config[keys[-1]] = value
     
     def get_paths(self) -> Dict[str, str]:
         """获取所有路径配置"""
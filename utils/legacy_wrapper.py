@@ -136,7 +136,7 @@ class LegacyCompatibilityWrapper:
             
             if auth_header or session_cookie:
                 # Use new authentication
-                from .core.security_middleware import get_api_security_middleware
+                from core.security_middleware import get_api_security_middleware
                 middleware = get_api_security_middleware()
                 
                 try:
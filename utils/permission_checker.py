@@ -7,7 +7,7 @@ and context-aware authorization with comprehensive audit logging.
 
 import logging
 from typing import Dict, List, Optional, Set, Any, Callable, Union
-from functools import wraps
+from functools import lru_cache, wraps
 from contextlib import contextmanager
 
 from .rbac_models import (
@@ -20,6 +20,15 @@ from .session_manager import get_session_manager
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=64)
+def _effective_permissions(roles: frozenset) -> frozenset:
+    """Union of the permissions granted by a set of roles, memoized per role set."""
+    permissions = set()
+    for role in roles:
+        permissions.update(ROLE_PERMISSIONS.get(role, set()))
+    return frozenset(permissions)
+
+
 class AuthorizationError(Exception):
     """Raised when authorization checks fail."""
     def __init__(self, message: str, permission: Permission, user_id: Optional[str] = None):
@@ -93,6 +102,44 @@ class PermissionChecker:
         
         return has_permission
     
+    def check_permissions(self, user: User, permissions: List[Permission],
+                          resource: Optional[str] = None,
+                          context: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Check if user has all of the specified permissions.
+        
+        Equivalent to calling ``check_permission`` for each permission and
+        stopping at the first denial, but resolves the user's effective
+        permissions once instead of walking their roles per permission.
+        
+        Args:
+            user: User to check permissions for.
+            permissions: Permissions that must all be granted.
+            resource: Optional resource being accessed.
+            context: Optional context for the permission check.
+            
+        Returns:
+            True if user has every permission, False otherwise.
+        """
+        if not permissions:
+            return True
+        
+        if not user.is_active or user.is_locked:
+            # Delegate so the denial is logged with the usual reason
+            return self.check_permission(user, permissions[0], resource, context)
+        
+        effective = _effective_permissions(frozenset(user.roles))
+        
+        for permission in permissions:
+            granted = permission in effective
+            if granted and context:
+                granted = self._apply_context_rules(user, permission, context)
+            self._log_permission_event(user, permission, granted, resource)
+            if not granted:
+                return False
+        
+        return True
+    
     def check_session_permission(self, session_token: str, permission: Permission,
                                resource: Optional[str] = None,
                                context: Optional[Dict[str, Any]] = None,
@@ -1,12 +1,13 @@
 """
 打印服务模块 - 支持本地和网络打印机发现、批量打印、队列管理
 """
+import concurrent.futures
 import logging
 import queue
 import threading
 import time
 from typing import List, Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 import win32print
 import xlwings as xw
 
@@ -22,25 +23,38 @@ class PrintService:
     支持打印机发现、批量打印、队列管理和错误恢复
     """
     
+    DEFAULT_PRINTER_TTL = 30.0  # 默认打印机查询结果的缓存时间（秒）
+    SPOOL_BATCH_SIZE = 16       # 批量打印时一次交给同一个Excel实例的最大任务数
+    
     def __init__(self):
-        self.print_queue = queue.Queue()
         self.available_printers = []
-        self.is_printing = False
-        self.print_thread = None
         self.logger = logging.getLogger(__name__)
         
         # 关闭标志，用于优雅停止所有操作
         self.shutdown_flag = False
         
-        # 异步打印线程池
+        # 异步打印线程池：边转换边打印和批量打印共用，整个服务生命周期内复用
         self.print_thread_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="PrintWorker")
         
+        # 批量打印专用单线程执行器：各批按提交顺序逐批打印，保证打印顺序
+        self._batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="BatchPrintWorker")
+        
+        # 已提交但尚未完成的打印任务
+        self._pending_futures = set()
+        self._futures_lock = threading.Lock()
+        
+        # 批量打印队列：界面线程只负责入队，由分发线程按批提交到线程池
+        self._queue = queue.Queue()
+        self._dispatcher_thread = None
+        self._dispatcher_lock = threading.Lock()
+        
         # 打印统计
         self.print_stats = {
             'total_submitted': 0,
             'total_completed': 0,
             'total_failed': 0
         }
+        self._stats_lock = threading.Lock()  # 保护打印统计和任务计数器
         
         # 打印间隔控制
         self.printer_task_counters = {}  # 每台打印机的任务计数器
@@ -49,6 +63,9 @@ class PrintService:
         self.interval_config = None      # 间隔配置，由外部设置
         self._config_lock = threading.Lock()  # 配置锁
         
+        # 默认打印机缓存：(打印机名称, 查询时间)
+        self._default_printer_cache = None
+        
         # 初始化发现打印机
         self.refresh_printers()
     
@@ -93,13 +110,20 @@ class PrintService:
     
     def get_default_printer(self) -> Optional[str]:
         """
-        获取系统默认打印机
+        获取系统默认打印机，结果缓存 DEFAULT_PRINTER_TTL 秒
         
         Returns:
             Optional[str]: 默认打印机名称，如果没有则返回None
         """
+        cached = self._default_printer_cache
+        now = time.monotonic()
+        if cached is not None and now - cached[1] < self.DEFAULT_PRINTER_TTL:
+            return cached[0]
+        
         try:
-            return win32print.GetDefaultPrinter()
+            printer_name = win32print.GetDefaultPrinter()
+            self._default_printer_cache = (printer_name, now)
+            return printer_name
         except Exception as e:
             self.logger.warning(f"获取默认打印机失败: {e}")
             return None
@@ -127,7 +151,7 @@ class PrintService:
             self.logger.warning(f"检查打印机 {printer_name} 状态失败: {e}")
             return False
     
-    def print_excel_file(self, file_path: str, printer_name: str, copies: int = 1) -> bool:
+    def print_excel_file(self, file_path: str, printer_name: str, copies: int = 1, app=None) -> bool:
         """
         打印Excel文件
         
@@ -135,11 +159,12 @@ class PrintService:
             file_path (str): Excel文件路径
             printer_name (str): 打印机名称
             copies (int): 打印份数
+            app: 复用的xlwings App实例（批量打印时传入），为None时临时创建
             
         Returns:
             bool: 打印是否成功
         """
-        app = None
+        own_app = app is None
         wb = None
         
         try:
@@ -148,7 +173,8 @@ class PrintService:
                 raise PrinterError(f"打印机 {printer_name} 不可用")
             
             # 使用xlwings打开文件并打印
-            app = xw.App(visible=False)
+            if own_app:
+                app = xw.App(visible=False)
             wb = app.books.open(file_path)
             
             # 设置打印参数
@@ -167,10 +193,10 @@ class PrintService:
             return False
             
         finally:
-            # 清理资源
+            # 清理资源（复用的Excel实例由调用方关闭）
             if wb:
                 wb.close()
-            if app:
+            if own_app and app:
                 app.quit()
     
     def async_print(self, file_path: str, printer_name: str, copies: int = 1):
@@ -185,27 +211,29 @@ class PrintService:
         Returns:
             concurrent.futures.Future: 异步任务对象
         """
-        self.print_stats['total_submitted'] += 1
-        
         print_job = {
             'file_path': file_path,
             'printer_name': printer_name,
             'copies': copies,
             'timestamp': time.time(),
-            'job_id': self.print_stats['total_submitted']
+            'job_id': self._next_job_id()
         }
         
         # 提交到线程池异步执行
         future = self.print_thread_pool.submit(self._execute_async_print, print_job)
+        with self._futures_lock:
+            self._pending_futures.add(future)
+        future.add_done_callback(self._discard_future)
         self.logger.info(f"已提交异步打印任务 [{print_job['job_id']}]: {file_path} -> {printer_name}")
         return future
     
-    def _execute_async_print(self, print_job):
+    def _execute_async_print(self, print_job, app=None):
         """
         执行异步打印任务的内部方法
         
         Args:
             print_job (dict): 打印任务信息
+            app: 复用的xlwings App实例，为None时每次打印临时创建
             
         Returns:
             bool: 打印是否成功
@@ -236,47 +264,60 @@ class PrintService:
             success = self.robust_print(
                 print_job['file_path'],
                 print_job['printer_name'], 
-                print_job['copies']
+                print_job['copies'],
+                app=app
             )
             
             if success:
-                self.print_stats['total_completed'] += 1
-                
-                # 增加打印机任务计数器（仅在成功时）
-                if printer_name not in self.printer_task_counters:
-                    self.printer_task_counters[printer_name] = 0
-                self.printer_task_counters[printer_name] += 1
+                with self._stats_lock:
+                    self.print_stats['total_completed'] += 1
+                    completed = self.print_stats['total_completed']
+                    submitted = self.print_stats['total_submitted']
+                    
+                    # 增加打印机任务计数器（仅在成功时）
+                    task_count = self.printer_task_counters.get(printer_name, 0) + 1
+                    self.printer_task_counters[printer_name] = task_count
                 
-                self.logger.info(f"异步打印完成 [{job_id}] ({self.print_stats['total_completed']}/{self.print_stats['total_submitted']}): {print_job['file_path']}")
-                self.logger.info(f"打印机 {printer_name} 当前任务计数: {self.printer_task_counters[printer_name]}")
+                self.logger.info(f"异步打印完成 [{job_id}] ({completed}/{submitted}): {print_job['file_path']}")
+                self.logger.info(f"打印机 {printer_name} 当前任务计数: {task_count}")
                 
                 # 检查是否需要触发休息
                 if self._should_trigger_rest(printer_name):
                     self._start_printer_rest(printer_name)
                 
             else:
-                self.print_stats['total_failed'] += 1
+                with self._stats_lock:
+                    self.print_stats['total_failed'] += 1
                 self.logger.error(f"异步打印失败 [{job_id}]: {print_job['file_path']}")
                 
             return success
             
         except Exception as e:
-            self.print_stats['total_failed'] += 1
+            with self._stats_lock:
+                self.print_stats['total_failed'] += 1
             self.logger.error(f"异步打印异常 [{job_id}]: {print_job['file_path']} - {e}")
             return False
     
+    def _next_job_id(self) -> int:
+        """登记一个新提交的任务并返回其任务编号"""
+        with self._stats_lock:
+            self.print_stats['total_submitted'] += 1
+            return self.print_stats['total_submitted']
+    
+    def _discard_future(self, future: Future):
+        """打印任务结束后从待完成集合中移除"""
+        with self._futures_lock:
+            self._pending_futures.discard(future)
+    
     def get_pending_print_count(self) -> int:
         """
         获取待打印任务数量
         
         Returns:
-            int: 待处理的打印任务数量
+            int: 已提交但尚未完成的打印任务数量
         """
-        try:
-            # 获取线程池中活跃线程数量
-            return len([t for t in self.print_thread_pool._threads if t.is_alive()]) if hasattr(self.print_thread_pool, '_threads') else 0
-        except:
-            return 0
+        with self._futures_lock:
+            return len(self._pending_futures)
     
     def get_print_stats(self) -> Dict[str, int]:
         """
@@ -285,7 +326,8 @@ class PrintService:
         Returns:
             Dict[str, int]: 包含提交、完成、失败数量的统计信息
         """
-        return self.print_stats.copy()
+        with self._stats_lock:
+            return self.print_stats.copy()
     
     def set_interval_config(self, config: Dict[str, Any]):
         """
@@ -370,7 +412,8 @@ class PrintService:
         self.printer_rest_start_times[printer_name] = time.time()
         
         # 立即重置任务计数器
-        self.printer_task_counters[printer_name] = 0
+        with self._stats_lock:
+            self.printer_task_counters[printer_name] = 0
         
         with self._config_lock:
             interval_seconds = self.interval_config.get('interval_seconds', 50) if self.interval_config else 50
@@ -389,7 +432,8 @@ class PrintService:
         """
         if printer_name in self.printer_rest_states and self.printer_rest_states[printer_name]:
             self.printer_rest_states[printer_name] = False
-            self.printer_task_counters[printer_name] = 0
+            with self._stats_lock:
+                self.printer_task_counters[printer_name] = 0
             self.logger.info(f"用户手动跳过打印机 {printer_name} 的休息时间")
             return True
         return False
@@ -432,6 +476,7 @@ class PrintService:
             timeout (Optional[float]): 超时时间（秒），None表示无限等待
         """
         try:
+            self._batch_executor.shutdown(wait=True)
             self.print_thread_pool.shutdown(wait=True, timeout=timeout)
             self.logger.info("所有异步打印任务已完成")
         except Exception as e:
@@ -450,19 +495,23 @@ class PrintService:
             # 设置关闭标志，阻止新任务开始
             self.shutdown_flag = True
             
-            # 停止批量打印
-            self.stop_batch_printing()
+            # 停止批量打印分发线程，取消仍在队列中的任务
+            self._queue.put(None)
             
-            # 关闭线程池，强制终止所有任务
-            self.print_thread_pool.shutdown(wait=False)
+            # 关闭线程池，取消尚未开始的任务（包括仍在批量队列中的任务）
+            self.print_thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._batch_executor.shutdown(wait=False, cancel_futures=True)
+            with self._futures_lock:
+                pending = list(self._pending_futures)
+            for future in pending:
+                future.cancel()
             
             # 等待一段时间让任务自然结束
             if timeout:
-                import concurrent.futures
                 try:
                     # 等待所有futures完成或超时
                     concurrent.futures.wait(
-                        [future for future in getattr(self.print_thread_pool, '_futures', [])],
+                        pending,
                         timeout=timeout,
                         return_when=concurrent.futures.ALL_COMPLETED
                     )
@@ -478,10 +527,12 @@ class PrintService:
             # 强制关闭，不等待
             try:
                 self.print_thread_pool.shutdown(wait=False)
+                self._batch_executor.shutdown(wait=False)
             except:
                 pass
 
-    def robust_print(self, file_path: str, printer_name: str, copies: int = 1, max_retries: int = 3) -> bool:
+    def robust_print(self, file_path: str, printer_name: str, copies: int = 1, max_retries: int = 3,
+                     app=None) -> bool:
         """
         稳定的打印功能，支持重试机制
         
@@ -490,6 +541,7 @@ class PrintService:
             printer_name (str): 打印机名称
             copies (int): 打印份数
             max_retries (int): 最大重试次数
+            app: 复用的xlwings App实例，仅用于首次尝试；重试时使用新实例
             
         Returns:
             bool: 打印是否成功
@@ -501,7 +553,7 @@ class PrintService:
                     self.logger.info(f"服务已关闭，停止打印重试: {file_path}")
                     return False
                 
-                if self.print_excel_file(file_path, printer_name, copies):
+                if self.print_excel_file(file_path, printer_name, copies, app if attempt == 0 else None):
                     return True
                     
                 if attempt < max_retries - 1:
@@ -515,91 +567,142 @@ class PrintService:
         
         raise PrinterError(f"打印文件 {file_path} 到 {printer_name} 失败，已重试 {max_retries} 次")
     
-    def add_print_job(self, file_path: str, printer_name: str, copies: int = 1):
+    def add_print_job(self, file_path: str, printer_name: str, copies: int = 1) -> Future:
+        """
+        添加批量打印任务，提交到常驻的打印线程池
+        
+        Args:
+            file_path (str): 文件路径
+            printer_name (str): 打印机名称
+            copies (int): 打印份数
+            
+        Returns:
+            concurrent.futures.Future: 打印任务对象，结果为是否打印成功
+        """
+        return self.async_print(file_path, printer_name, copies)
+    
+    def queue_print_job(self, file_path: str, printer_name: str, copies: int = 1) -> Future:
         """
-        添加打印任务到队列
+        将批量打印任务放入队列后立即返回，由分发线程按批提交
         
         Args:
             file_path (str): 文件路径
             printer_name (str): 打印机名称
             copies (int): 打印份数
+            
+        Returns:
+            concurrent.futures.Future: 打印任务对象，结果为是否打印成功
         """
-        job = {
+        print_job = {
             'file_path': file_path,
             'printer_name': printer_name,
             'copies': copies,
-            'timestamp': time.time()
+            'timestamp': time.time(),
+            'job_id': self._next_job_id()
         }
-        self.print_queue.put(job)
-        self.logger.info(f"添加打印任务: {file_path} -> {printer_name}")
+        
+        future = Future()
+        with self._futures_lock:
+            self._pending_futures.add(future)
+        future.add_done_callback(self._discard_future)
+        
+        self._ensure_dispatcher()
+        self._queue.put((print_job, future))
+        return future
+    
+    def _ensure_dispatcher(self):
+        """按需启动批量打印分发线程"""
+        with self._dispatcher_lock:
+            if self._dispatcher_thread is None or not self._dispatcher_thread.is_alive():
+                self._dispatcher_thread = threading.Thread(
+                    target=self._dispatch_print_queue, name="PrintDispatcher", daemon=True
+                )
+                self._dispatcher_thread.start()
     
-    def start_batch_printing(self):
+    def _dispatch_print_queue(self):
         """
-        启动批量打印处理线程
+        分发线程：等待一个任务后再取出当前已排队的任务（最多SPOOL_BATCH_SIZE个），
+        整批交给批量打印执行器；收到None时退出
         """
-        if self.is_printing:
-            self.logger.warning("批量打印已在进行中")
-            return
-        
-        self.is_printing = True
-        self.print_thread = threading.Thread(target=self._process_print_queue, daemon=True)
-        self.print_thread.start()
-        self.logger.info("批量打印线程已启动")
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.SPOOL_BATCH_SIZE:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            
+            stop = None in batch
+            jobs = [item for item in batch if item is not None]
+            if jobs:
+                self._spool_batch(jobs)
+            if stop:
+                return
     
-    def stop_batch_printing(self):
+    def _spool_batch(self, jobs):
         """
-        停止批量打印
+        将一批打印任务提交到批量打印执行器，各批按提交顺序依次执行
+        
+        Args:
+            jobs (list): (打印任务信息, Future) 列表
         """
-        self.is_printing = False
-        if self.print_thread and self.print_thread.is_alive():
-            self.print_thread.join(timeout=5)
-        self.logger.info("批量打印已停止")
+        if self.shutdown_flag:
+            for _, future in jobs:
+                future.cancel()
+            return
+        
+        try:
+            self._batch_executor.submit(self._execute_print_batch, jobs)
+            self.logger.info(f"已提交批量打印 {len(jobs)} 个任务")
+        except RuntimeError as e:
+            # 线程池已关闭
+            self.logger.warning(f"提交批量打印失败: {e}")
+            for _, future in jobs:
+                future.cancel()
     
-    def _process_print_queue(self):
+    def _execute_print_batch(self, jobs):
         """
-        处理打印队列的内部方法
+        在同一个Excel实例中依次打印一批文件，避免每个文件都启动一次Excel
+        
+        Args:
+            jobs (list): (打印任务信息, Future) 列表
         """
-        while self.is_printing or not self.print_queue.empty():
-            try:
-                # 获取打印任务，超时1秒
-                job = self.print_queue.get(timeout=1)
-                
-                self.logger.info(f"开始处理打印任务: {job['file_path']}")
-                
-                success = self.robust_print(
-                    job['file_path'],
-                    job['printer_name'],
-                    job['copies']
-                )
-                
-                if success:
-                    self.logger.info(f"打印任务完成: {job['file_path']}")
-                else:
-                    self.logger.error(f"打印任务失败: {job['file_path']}")
-                
-                self.print_queue.task_done()
-                
-            except queue.Empty:
-                # 队列为空，继续等待
-                continue
-            except Exception as e:
-                self.logger.error(f"处理打印队列异常: {e}")
+        app = None
+        try:
+            for print_job, future in jobs:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    if app is None and not self.shutdown_flag:
+                        app = xw.App(visible=False)
+                    future.set_result(self._execute_async_print(print_job, app))
+                except Exception as e:
+                    future.set_exception(e)
+        finally:
+            if app:
+                try:
+                    app.quit()
+                except Exception as e:
+                    self.logger.warning(f"关闭批量打印Excel实例失败: {e}")
     
     def get_queue_size(self) -> int:
         """
         获取当前队列大小
         
         Returns:
-            int: 队列中等待的任务数量
+            int: 已提交但尚未开始执行的任务数量
         """
-        return self.print_queue.qsize()
+        with self._futures_lock:
+            return sum(1 for future in self._pending_futures if not future.running())
     
     def clear_queue(self):
         """
-        清空打印队列
+        清空打印队列（取消尚未开始执行的任务）
         """
-        with self.print_queue.mutex:
-            self.print_queue.queue.clear()
+        with self._futures_lock:
+            pending = list(self._pending_futures)
+        for future in pending:
+            future.cancel()
         self.logger.info("打印队列已清空")
 
 
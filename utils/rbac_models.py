@@ -63,6 +63,10 @@ class Role(Enum):
     AUDITOR = "auditor"
 
 
+# Roles ordered from least to most privileged
+ROLE_HIERARCHY = (Role.VIEWER, Role.AUDITOR, Role.OPERATOR, Role.ADMIN)
+
+
 class SessionStatus(Enum):
     """Session lifecycle status."""
     ACTIVE = auto()
@@ -148,6 +152,8 @@ class User:
     created_at: datetime = field(default_factory=datetime.utcnow)
     updated_at: datetime = field(default_factory=datetime.utcnow)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Highest privilege role, kept in sync by add_role/remove_role
+    max_role: Role = field(default=Role.VIEWER, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """Post-initialization validation and setup."""
@@ -158,6 +164,14 @@ class User:
         # Set password expiration to 90 days from creation if not set
         if not self.password_expires_at:
             self.password_expires_at = self.created_at + timedelta(days=90)
+        self._update_max_role()
+    
+    def _update_max_role(self) -> None:
+        """Recompute the highest privilege role from the assigned roles."""
+        self.max_role = Role.VIEWER
+        for role in ROLE_HIERARCHY:
+            if role in self.roles:
+                self.max_role = role
     
     def has_role(self, role: Role) -> bool:
         """Check if user has the specified role."""
@@ -166,11 +180,13 @@ class User:
     def add_role(self, role: Role) -> None:
         """Add a role to the user."""
         self.roles.add(role)
+        self._update_max_role()
         self.updated_at = datetime.utcnow()
     
     def remove_role(self, role: Role) -> None:
         """Remove a role from the user."""
         self.roles.discard(role)
+        self._update_max_role()
         self.updated_at = datetime.utcnow()
     
     def has_permission(self, permission: Permission) -> bool:
@@ -328,7 +344,7 @@ class Session:
         return results
 
 
-@dataclass
+@dataclass(slots=True)
 class AuthEvent:
     """Authentication and authorization event for audit logging."""
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
@@ -393,12 +409,16 @@ class SecurityConfig:
     session_timeout_hours: int = 8
     activity_timeout_hours: int = 2
     max_concurrent_sessions: int = 3
+    session_cache_ttl_seconds: int = 10  # 0 disables the validated-session cache
+    session_cache_size: int = 10000
     
     # JWT configuration
     jwt_algorithm: str = "RS256"
     jwt_access_token_expires_minutes: int = 15
     jwt_refresh_token_expires_days: int = 7
     jwt_key_rotation_hours: int = 24
+    jwt_cache_ttl_seconds: int = 0  # 0 disables the verified-claims cache
+    jwt_cache_size: int = 10000
     
     # Rate limiting (requests per hour by role)
     rate_limit_admin: int = 1000
@@ -411,6 +431,7 @@ class SecurityConfig:
     enable_session_fixation_protection: bool = True
     enable_rate_limiting: bool = True
     enable_audit_logging: bool = True
+    audit_sampling_rate: float = 1.0  # fraction of successful accesses audited
     
     def get_rate_limit_for_role(self, role: Role) -> int:
         """Get rate limit for a specific role."""
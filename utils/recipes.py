@@ -3,6 +3,7 @@ import pandas as pd
 import xlwings as xw
 import sys
 import os
+from collections import OrderedDict
 
 # 添加父目录到Python路径
 parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -18,6 +19,40 @@ from core.generator import (
 
 # --- 应用层：功能配方 ---
 
+# 目录数据缓存: {绝对路径: (修改时间, 文件大小, DataFrame)}，按最近使用排序
+# 配方在常驻的生成进程中执行，连续运行时同一目录文件只解析一次；
+# 与模板缓存一样最多保留8个，避免不同路径的数据常驻内存
+_CATALOG_CACHE_SIZE = 8
+_catalog_cache = OrderedDict()
+
+
+def _get_catalog_df(path):
+    """
+    加载目录数据，文件未修改时直接返回缓存的DataFrame。
+
+    配方只对数据做筛选（生成新的DataFrame），不会修改缓存中的对象。
+    """
+    try:
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+    except (OSError, TypeError, ValueError):
+        return load_data(path)
+
+    cached = _catalog_cache.get(key)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        _catalog_cache.move_to_end(key)
+        logging.info(f"使用已缓存的目录数据: {os.path.basename(key)}")
+        return cached[2]
+
+    data = load_data(path)
+    if data is not None:
+        _catalog_cache[key] = (stat.st_mtime_ns, stat.st_size, data)
+        _catalog_cache.move_to_end(key)
+        while len(_catalog_cache) > _CATALOG_CACHE_SIZE:
+            _catalog_cache.popitem(last=False)
+    return data
+
+
 
 def create_qy_full_index(
     jn_catalog_path,
@@ -35,8 +70,8 @@ def create_qy_full_index(
     配方：生成传统文书全引目录。
     """
     logging.info("--- 开始生成传统文书全引目录 ---")
-    jn_data = load_data(jn_catalog_path)
-    aj_data = load_data(aj_catalog_path)
+    jn_data = _get_catalog_df(jn_catalog_path)
+    aj_data = _get_catalog_df(aj_catalog_path)
     template_stream = prepare_template(template_path)
 
     if jn_data is None or template_stream is None:
@@ -130,7 +165,7 @@ def create_aj_index(
 ):
     """配方：生成案卷目录。"""
     logging.info("--- 开始生成案卷目录 ---")
-    data = load_data(catalog_path)
+    data = _get_catalog_df(catalog_path)
     template_stream = prepare_template(template_path)
 
     if data is None or template_stream is None:
@@ -210,7 +245,7 @@ def create_jn_or_jh_index(
 ):
     """配方：生成卷内目录 或 简化目录。"""
     logging.info(f"--- 开始生成 {recipe_name} ---")
-    data = load_data(catalog_path)
+    data = _get_catalog_df(catalog_path)
     template_stream = prepare_template(template_path)
 
     if data is None or template_stream is None:
@@ -541,25 +541,32 @@ class SecurityManager:
     
     def _log_audit_event(self, event: AuthEvent) -> None:
         """Log audit event to database."""
+        self._log_audit_events([event])
+    
+    def _log_audit_events(self, events: List[AuthEvent]) -> None:
+        """Log a batch of audit events to the database in one transaction."""
         import json
         
-        metadata_json = json.dumps(event.metadata)
+        rows = [
+            (
+                event.id, event.event_type.value, event.user_id, event.username, event.session_id,
+                event.ip_address, event.user_agent, event.resource,
+                event.permission.value if event.permission else None,
+                event.success, event.error_message, event.timestamp.isoformat(), event.trace_id,
+                json.dumps(event.metadata), event.hash_chain
+            )
+            for event in events
+        ]
         
         with sqlite3.connect(str(self.db_path)) as conn:
-            conn.execute("""
+            conn.executemany("""
                 INSERT INTO audit_events (
                     id, event_type, user_id, username, session_id,
                     ip_address, user_agent, resource, permission,
                     success, error_message, timestamp, trace_id,
                     metadata, hash_chain
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                event.id, event.event_type.value, event.user_id, event.username, event.session_id,
-                event.ip_address, event.user_agent, event.resource,
-                event.permission.value if event.permission else None,
-                event.success, event.error_message, event.timestamp.isoformat(), event.trace_id,
-                metadata_json, event.hash_chain
-            ))
+            """, rows)
             conn.commit()
 
 